@@ -1,13 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from .routers import deal_picker, debt_stack, capex_phasing, leasing_mix
+from fastapi.responses import JSONResponse
+from .routers import deal_picker, debt_stack, capex_phasing, leasing_mix, artifacts
+from .responses import FAST_JSON, FastJSONResponse
+from .services.optimizers import deal_frontier, leasing_batch
+from .services.files.artifacts import ARTIFACTS, OutputFiles
 import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ARTIFACTS.start_sweeper()
+    yield
+    capex_phasing.CAPEX_JOBS.shutdown(); deal_frontier.shutdown(); leasing_batch.shutdown(); ARTIFACTS.shutdown()
+
 app = FastAPI(
     title="Beechford Estate Office - Smart Plans API",
     version="1.0.0",
-    description="Institutional-grade optimization for real estate portfolio management"
+    description="Institutional-grade optimization for real estate portfolio management",
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse,
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -48,10 +61,12 @@ app.include_router(deal_picker.router)
 app.include_router(debt_stack.router)
 app.include_router(capex_phasing.router)
 app.include_router(leasing_mix.router)
+app.include_router(artifacts.router)
 
 # Create files directories if they don't exist
 os.makedirs("./files/outputs", exist_ok=True)
 os.makedirs("./files/templates", exist_ok=True)
 
-# Mount static files
+# Mount static files (content-addressed outputs first: ETag + immutable caching, usage stats)
+app.mount("/files/outputs", OutputFiles(directory="files/outputs"), name="outputs")
 app.mount("/files", StaticFiles(directory="files"), name="files")
@@ -0,0 +1,25 @@
+import json, os
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+try: import orjson
+except ImportError: orjson = None
+try: import msgspec
+except ImportError: msgspec = None
+# Opt-in (FAST_JSON=1): FastJSONResponse becomes the app default and routers skip jsonable_encoder
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+def json_default(o):
+    if isinstance(o, np.ndarray): return o.tolist()
+    if isinstance(o, np.generic): return o.item()
+    if hasattr(o, "model_dump"): return o.model_dump()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+def dumps(content) -> bytes:
+    if orjson is not None: return orjson.dumps(content, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    if msgspec is not None: return msgspec.json.encode(content, enc_hook=json_default)
+    return json.dumps(content, default=json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+class FastJSONResponse(JSONResponse):
+    """orjson/msgspec-rendered JSON (stdlib fallback) that encodes NumPy arrays and scalars natively."""
+    def render(self, content) -> bytes: return dumps(content)
+def respond(out, headers: dict = None):
+    if FAST_JSON: return FastJSONResponse(out, headers=headers)
+    return JSONResponse(jsonable_encoder(out), headers=headers) if headers else out
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, HTTPException
+from ..services.files.artifacts import ARTIFACTS
+router = APIRouter(prefix="/artifacts", tags=["Artifacts"])
+@router.get("/stats")
+def artifact_stats(): return ARTIFACTS.stats()
+@router.get("/{name}")
+def artifact_status(name: str):
+    """Readiness of one download (the file name from a response's "downloads" URL): queued, running, ready or failed."""
+    s = ARTIFACTS.status(name)
+    if s is None: raise HTTPException(status_code=404, detail="Artifact not found")
+    return s
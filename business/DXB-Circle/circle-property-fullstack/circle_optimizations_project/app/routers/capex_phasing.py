@@ -1,9 +1,45 @@
-from fastapi import APIRouter, HTTPException
+import os
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi.responses import JSONResponse
+from ..responses import respond
+from ..services.files.artifacts import ARTIFACTS, schedule_artifacts
 from ..schemas.capex import CapexRequest
+from ..services.jobs import JobQueue, QueueFull, make_store
 from ..services.optimizers.capex_milp import solve_capex_milp
+from ..services.optimizers.common import SOLVE_CACHE
 router = APIRouter(prefix="/capex-phasing", tags=["Capex Phasing"])
+DEFAULT_TIME_LIMIT_S = float(os.getenv("CAPEX_TIME_LIMIT_S", "60")); MAX_TIME_LIMIT_S = float(os.getenv("CAPEX_MAX_TIME_LIMIT_S", "600"))
+CAPEX_JOBS = JobQueue(lambda payload, **kw: ARTIFACTS.submit("capex", solve_capex_milp(CapexRequest(**payload), **kw)), store=make_store(os.getenv("CAPEX_JOBS_DB")),
+                      max_workers=int(os.getenv("CAPEX_JOB_WORKERS", "2")), max_queue=int(os.getenv("CAPEX_JOB_QUEUE", "16")), ttl_s=float(os.getenv("CAPEX_JOB_TTL_S", "3600")), name="capex-job")
+def _time_limit(value: Optional[float]) -> float: return min(float(value or DEFAULT_TIME_LIMIT_S), MAX_TIME_LIMIT_S)
+def _job_or_404(job_id: str) -> dict:
+    job = CAPEX_JOBS.get(job_id)
+    if job is None: raise HTTPException(status_code=404, detail="Job not found")
+    return job
 @router.post("/optimize")
-def optimize(req: CapexRequest):
-    out = solve_capex_milp(req)
+def optimize(req: CapexRequest, background: BackgroundTasks, time_limit_s: Optional[float] = Query(None, gt=0), refresh: bool = Query(False, description="Skip the solve cache and re-solve")):
+    limit = _time_limit(time_limit_s); out, cache = SOLVE_CACHE.solve("capex", req, lambda: solve_capex_milp(req, time_limit_s=limit), refresh=refresh, time_limit_s=limit)
     if "error" in out: raise HTTPException(status_code=422, detail=out)
-    return out
+    schedule_artifacts(background, "capex", out); return respond(out, headers=cache)
+@router.get("/cache")
+def cache_stats(): return SOLVE_CACHE.stats("capex")
+# --- Background jobs: submit / poll / cancel / result ---
+@router.post("/jobs", status_code=202)
+def submit_job(req: CapexRequest, time_limit_s: Optional[float] = Query(None, gt=0)):
+    try: return CAPEX_JOBS.submit(req.model_dump(), time_limit_s=_time_limit(time_limit_s))
+    except QueueFull as e: raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+@router.get("/jobs/stats")
+def job_stats(): return CAPEX_JOBS.stats()
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str): return JobQueue.public(_job_or_404(job_id))
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    _job_or_404(job_id); return JobQueue.public(CAPEX_JOBS.cancel(job_id))
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = _job_or_404(job_id)
+    if job["status"] == "done": return respond(job["result"])
+    if job["status"] == "failed" and job.get("result"): raise HTTPException(status_code=422, detail=job["result"])
+    if job["status"] == "failed": raise HTTPException(status_code=500, detail=job.get("error") or "Job failed")
+    return JSONResponse(status_code=409, content={"detail": f"Job is {job['status']}", "status": job["status"], "progress": job.get("progress")})
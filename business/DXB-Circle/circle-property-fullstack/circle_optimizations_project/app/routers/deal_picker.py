@@ -1,9 +1,36 @@
-from fastapi import APIRouter, HTTPException
-from ..schemas.deal_picker import DealPickerRequest
-from ..services.optimizers.deal_picker_lp import solve_deal_picker_lp
+import os
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from ..responses import respond
+import numpy as np
+from ..services.files.artifacts import schedule_artifacts
+from ..schemas.deal_picker import DealPickerRequest, DealWhatIfRequest, DealFrontierRequest
+from ..services.optimizers.deal_picker_lp import solve_deal_picker_lp, cached_model, what_if_table
+from ..services.optimizers.deal_frontier import deal_frontier
+from ..services.optimizers.common import SOLVE_CACHE
 router = APIRouter(prefix="/deal-picker", tags=["Deal Picker"])
+MAX_TIME_LIMIT_S = float(os.getenv("DEAL_MAX_TIME_LIMIT_S", "300"))
 @router.post("/optimize")
-def optimize(req: DealPickerRequest):
-    out = solve_deal_picker_lp(req)
+def optimize(req: DealPickerRequest, background: BackgroundTasks, time_limit_s: Optional[float] = Query(None, gt=0), mip_gap: Optional[float] = Query(None, ge=0, le=1),
+             heuristic: bool = Query(False, description="MILP cases only: return the LP-rounding answer without branch and bound"), refresh: bool = Query(False, description="Skip the solve cache and re-solve")):
+    limit = min(time_limit_s, MAX_TIME_LIMIT_S) if time_limit_s else None
+    out, cache = SOLVE_CACHE.solve("deal_picker", req, lambda: solve_deal_picker_lp(req, time_limit_s=limit, mip_gap=mip_gap, heuristic_only=heuristic), refresh=refresh, time_limit_s=limit, mip_gap=mip_gap, heuristic=heuristic)
     if "error" in out: raise HTTPException(status_code=422, detail=out)
-    return out
+    schedule_artifacts(background, "deal_picker", out); return respond(out, headers=cache)
+@router.get("/cache")
+def cache_stats(): return SOLVE_CACHE.stats("deal_picker")
+@router.post("/what-if")
+def what_if(req: DealWhatIfRequest, time_limit_s: Optional[float] = Query(None, gt=0), mip_gap: Optional[float] = Query(None, ge=0, le=1), heuristic: bool = Query(False)):
+    """Re-solve deltas against a model built by /optimize (model_id from its response) without re-posting the deals; solve options as for /optimize."""
+    model = cached_model(req.model_id)
+    if model is None: raise HTTPException(status_code=404, detail={"error": "Unknown or evicted model_id; call /deal-picker/optimize again"})
+    limit = min(time_limit_s, MAX_TIME_LIMIT_S) if time_limit_s else None
+    return respond({"model_id": model.model_id, "what_if": what_if_table(model, [d.model_dump() for d in req.deltas], time_limit_s=limit, mip_gap=mip_gap, heuristic_only=heuristic)})
+@router.post("/frontier")
+def frontier(req: DealFrontierRequest):
+    """Risk/yield frontier (sweep risk_penalty_per_point) or budget curve; allocations are deduplicated across points."""
+    sw = req.sweep
+    if sw.values is None and sw.stop is None: raise HTTPException(status_code=422, detail={"error": "Sweep needs either values or start/stop"})
+    values = sw.values or np.linspace(sw.start, sw.stop, sw.points).tolist()
+    if sw.parameter == "budget" and min(values) <= 0: raise HTTPException(status_code=422, detail={"error": "Budget sweep values must be > 0"})
+    return respond(deal_frontier(req, sw.parameter, values))
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from ..responses import respond
+from ..services.files.artifacts import schedule_artifacts
 from ..schemas.debt_stack import DebtStackRequest
+from ..services.optimizers.common import SOLVE_CACHE
 from ..services.optimizers.debt_stack_lp import solve_debt_stack_lp
 router = APIRouter(prefix="/debt-stack", tags=["Debt Stack"])
 @router.post("/optimize")
-def optimize(req: DebtStackRequest):
-    out = solve_debt_stack_lp(req)
+def optimize(req: DebtStackRequest, background: BackgroundTasks, refresh: bool = Query(False, description="Skip the solve cache and re-solve")):
+    out, cache = SOLVE_CACHE.solve("debt_stack", req, lambda: solve_debt_stack_lp(req), refresh=refresh)
     if "error" in out: raise HTTPException(status_code=422, detail=out)
-    return out
+    schedule_artifacts(background, "debt_stack", out); return respond(out, headers=cache)
+@router.get("/cache")
+def cache_stats(): return SOLVE_CACHE.stats("debt_stack")
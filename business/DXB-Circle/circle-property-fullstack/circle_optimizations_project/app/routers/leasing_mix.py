@@ -1,9 +1,38 @@
-from fastapi import APIRouter, HTTPException
-from ..schemas.leasing import LeasingRequest
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from ..responses import dumps, respond
+from ..services.files.artifacts import ARTIFACTS, schedule_artifacts
+from ..schemas.leasing import LeasingRequest, LeasingPlanRequest, LeasingBatchRequest
+from ..services.optimizers.common import SOLVE_CACHE
+from ..services.optimizers.leasing_batch import iter_leasing_batch
 from ..services.optimizers.leasing_lp import solve_leasing_lp
+from ..services.optimizers.leasing_plan import solve_leasing_plan
 router = APIRouter(prefix="/leasing-mix", tags=["Leasing Mix"])
 @router.post("/optimize")
-def optimize(req: LeasingRequest):
-    out = solve_leasing_lp(req)
+def optimize(req: LeasingRequest, background: BackgroundTasks, refresh: bool = Query(False, description="Skip the solve cache and re-solve")):
+    out, cache = SOLVE_CACHE.solve("leasing_mix", req, lambda: solve_leasing_lp(req), refresh=refresh)
     if "error" in out: raise HTTPException(status_code=422, detail=out)
-    return out
+    schedule_artifacts(background, "leasing", out); return respond(out, headers=cache)
+@router.post("/plan")
+def plan(req: LeasingPlanRequest, background: BackgroundTasks, refresh: bool = Query(False, description="Skip the solve cache and re-solve")):
+    """Monthly offer plan for one or many buildings (one sparse LP) plus a Monte Carlo of take-up."""
+    out, cache = SOLVE_CACHE.solve("leasing_mix", req, lambda: solve_leasing_plan(req), refresh=refresh, endpoint="plan")
+    if "error" in out: raise HTTPException(status_code=422, detail=out)
+    schedule_artifacts(background, "leasing_plan", out); return respond(out, headers=cache)
+def _with_artifacts(lines):
+    """Pass batch lines through, queueing each solved building's offer plan for writing (one file per building's request)."""
+    for line in lines:
+        if line.get("status") == "ok": ARTIFACTS.submit("leasing", line["result"])
+        yield line
+@router.post("/batch")
+def batch(req: LeasingBatchRequest, stream: bool = True):
+    """
+    Solve many buildings at once. Streams NDJSON: one line per building as it finishes (any order, keyed by index and
+    building_id), then a {"summary": ...} line with portfolio KPIs and solve times. stream=false returns one JSON body.
+    """
+    lines = _with_artifacts(iter_leasing_batch(req.items, what_if=req.what_if))
+    if stream: return StreamingResponse((dumps(l) + b"\n" for l in lines), media_type="application/x-ndjson")
+    results = list(lines); summary = results.pop()["summary"]
+    return respond({"results": sorted(results, key=lambda l: l["index"]), "summary": summary})
+@router.get("/cache")
+def cache_stats(): return SOLVE_CACHE.stats("leasing_mix")
@@ -1,12 +1,25 @@
 from typing import Dict, List, Optional
-from pydantic import BaseModel, Field, conint, confloat
+from pydantic import BaseModel, Field, conint, conlist, confloat
 from .common import ConstraintsReport, Downloads, WhatIf
+class DealWhatIfDelta(BaseModel):
+    label: Optional[str] = None; budget_delta: float = 0.0; sector_caps: Dict[str, confloat(ge=0, le=1)] = {}; city_caps: Dict[str, confloat(ge=0, le=1)] = {}
+    vacancy_haircut: Optional[confloat(ge=0, le=1)] = None; deal_cost_rate: Optional[confloat(ge=0, le=1)] = None
 class Deal(BaseModel): deal_id: str; ask_price: confloat(gt=0); expected_noi: confloat(ge=0); sector: str; city: str; risk_score: confloat(ge=0, le=5) = 3; must_buy: bool = False
 class DealPickerRequest(BaseModel):
     budget: confloat(gt=0); objective: str = Field(pattern="^(cash_yield|risk_adjusted)$"); risk_penalty_per_point: confloat(ge=0) = 0.0
     max_assets: Optional[conint(ge=1)] = None; max_alloc_per_sector: Dict[str, confloat(ge=0, le=1)] = {}; max_alloc_per_city: Dict[str, confloat(ge=0, le=1)] = {}
     allow_fractional_allocations: bool = True; assumptions: Dict[str, confloat(ge=0)] = {}; deals: List[Deal]
+    what_if: Optional[List[DealWhatIfDelta]] = None  # None -> the default "+1,000,000 AED budget" row; [] -> no what-if solves
+class DealWhatIfRequest(BaseModel): model_id: str; deltas: conlist(DealWhatIfDelta, min_length=1, max_length=64)
+class DealWhatIfRow(WhatIf):
+    budget: Optional[float] = None; feasible: bool = True; objective: Optional[float] = None; delta_objective: Optional[float] = None; estimated_delta_objective: Optional[float] = None
+    capital_used: Optional[float] = None; expected_noi: Optional[float] = None; cash_yield: Optional[float] = None; num_assets_selected: Optional[int] = None
+    delta_expected_noi: Optional[float] = None; delta_capital_used: Optional[float] = None
+class FrontierSweep(BaseModel):
+    parameter: str = Field("risk_penalty", pattern="^(risk_penalty|budget)$"); start: confloat(ge=0) = 0.0; stop: Optional[confloat(ge=0)] = None; points: conint(ge=1, le=5000) = 50
+    values: Optional[conlist(confloat(ge=0), min_length=1, max_length=5000)] = None  # explicit grid; overrides start/stop/points
+class DealFrontierRequest(DealPickerRequest): sweep: FrontierSweep
 class AssetAllocation(BaseModel): deal_id: str; weight: confloat(ge=0, le=1); capital: confloat(ge=0); expected_noi: confloat(ge=0)
 class PortfolioSummary(BaseModel): capital_used: confloat(ge=0); cash_yield: confloat(ge=0); risk_adjusted_yield: confloat(ge=0); num_assets_selected: int
 class DealPickerResponse(BaseModel):
-    portfolio_summary: PortfolioSummary; asset_allocations: List[AssetAllocation]; constraints_report: ConstraintsReport; what_if: List[WhatIf] = []; downloads: Downloads
+    portfolio_summary: PortfolioSummary; asset_allocations: List[AssetAllocation]; constraints_report: ConstraintsReport; what_if: List[DealWhatIfRow] = []; model_id: Optional[str] = None; solve_stats: Optional[Dict[str, Optional[float | int | str]]] = None; downloads: Downloads
@@ -1,10 +1,19 @@
-from typing import List
-from pydantic import BaseModel, confloat, conint
+from typing import Dict, List, Optional
+from pydantic import BaseModel, conlist, confloat, conint
 from .common import ConstraintsReport, Downloads, WhatIf
 class Inventory(BaseModel): units_total: conint(ge=0); vacant_now: conint(ge=0)
-class LeasePackage(BaseModel): name: str; rent: confloat(ge=0); inc_cost: confloat(ge=0); expected_takeup: confloat(ge=0, le=1)
+class LeasePackage(BaseModel): name: str; rent: confloat(ge=0); inc_cost: confloat(ge=0); expected_takeup: confloat(ge=0, le=1); tenor_months: Optional[conint(gt=0, le=240)] = None
 class LeasingConstraints(BaseModel): max_share_per_package: confloat(ge=0, le=1); min_wault_months: confloat(ge=0)
 class LeasingRequest(BaseModel): inventory: Inventory; occupancy_target: confloat(ge=0, le=1); incentive_budget: confloat(ge=0); packages: List[LeasePackage]; constraints: LeasingConstraints
 class MixItem(BaseModel): package: str; units: conint(ge=0); share: confloat(ge=0, le=1); wault_contrib: confloat(ge=0)
 class LeasingKPIs(BaseModel): wault_months: confloat(ge=0); expected_12m_ncf: confloat(ge=0); incentive_spend: confloat(ge=0); occupancy: confloat(ge=0, le=1)
 class LeasingResponse(BaseModel): mix: List[MixItem]; kpis: LeasingKPIs; constraints_report: ConstraintsReport; what_if: List[WhatIf] = []; downloads: Downloads
+class BuildingPlan(BaseModel):
+    building_id: str; inventory: Inventory; occupancy_target: confloat(ge=0, le=1); incentive_budget: confloat(ge=0); packages: conlist(LeasePackage, min_length=1); constraints: LeasingConstraints
+    monthly_expiries: List[conint(ge=0)] = []  # units rolling vacant in each month of the horizon
+class LeasingPlanRequest(BaseModel):
+    # expected_takeup is read as the monthly probability that an offered unit signs
+    horizon_months: conint(ge=1, le=36) = 12; buildings: conlist(BuildingPlan, min_length=1); portfolio_incentive_budget: Optional[confloat(ge=0)] = None
+    simulations: conint(ge=0, le=100000) = 2000; seed: conint(ge=0) = 0
+class LeasingBatchItem(LeasingRequest): building_id: Optional[str] = None
+class LeasingBatchRequest(BaseModel): items: conlist(LeasingBatchItem, min_length=1); what_if: bool = False
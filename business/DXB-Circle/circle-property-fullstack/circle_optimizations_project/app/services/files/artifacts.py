@@ -0,0 +1,167 @@
+import hashlib, os, re, tempfile, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+from .paths import ensure_base
+from .csv_writer import write_csv
+from .xlsx_writer import write_allocations_plan_xlsx, write_capex_gantt_xlsx, write_debt_amort_xlsx, write_leasing_offer_xlsx
+from .pdf_writer import write_term_sheet_pdf
+ARTIFACT_WORKERS = int(os.getenv("ARTIFACT_WORKERS", "1")); ARTIFACTS_ENABLED = os.getenv("ARTIFACTS_ENABLED", "1") != "0"
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(1 << 30))); ARTIFACT_MAX_FILES = int(os.getenv("ARTIFACT_MAX_FILES", "10000"))
+ARTIFACT_MAX_AGE_S = float(os.getenv("ARTIFACT_MAX_AGE_S", str(7 * 86400))); ARTIFACT_SWEEP_S = float(os.getenv("ARTIFACT_SWEEP_S", "300"))
+ARTIFACT_NAME = re.compile(r"_([0-9a-f]{32})\.[a-z]+$")  # <prefix>_<canonical request hash>.<ext>, see common.artifact_url
+# the name hashes the request, not the bytes (a writer change rewrites the same name): revalidate against the content ETag
+CACHE_CONTROL = "public, no-cache"
+# artifact_url prefix -> optimizer kind, for files found on disk at start-up (leasing_plan shares the leasing prefix)
+ARTIFACT_KINDS = {"deal_picker_plan": "deal_picker", "deal_picker_allocs": "deal_picker", "debt_stack_term_sheet": "debt_stack", "debt_amort": "debt_stack",
+                  "capex_gantt": "capex", "capex_schedule": "capex", "leasing_offer_plan": "leasing"}
+def atomic_write(path: str, write: Callable[[str], object]) -> int:
+    """write(tmp) into a hidden temp file next to path, then os.replace it into place: readers see the old file or the whole new one, never a partial write."""
+    d, name = os.path.split(path); fd, tmp = tempfile.mkstemp(dir=d, prefix=f".{name}.", suffix=".tmp"); os.close(fd)
+    try: write(tmp); os.chmod(tmp, 0o644); os.replace(tmp, path); return os.path.getsize(path)  # mkstemp creates 0600
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+def content_etag(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    return f'"{h.hexdigest()}"'
+def artifact_kind(name: str) -> Optional[str]:
+    m = ARTIFACT_NAME.search(name); return ARTIFACT_KINDS.get(name[:m.start()]) if m else None
+def _term_sheet_bullets(out: dict) -> list:
+    s = out["stack_summary"]; b = [f"Total debt: AED {s['total_debt']:,.0f}", f"LTV: {s['ltv']:.1%}", f"Weighted cost: {s['weighted_cost']:.2%}", f"Min DSCR: {s['min_dscr']:.2f}x"]
+    b += [f"{t['name']}: AED {t['amount']:,.0f}" + (f" @ {t['rate']:.2%}" if t.get("rate") is not None else "") for t in out["tranche_allocations"] if t["amount"] > 1e-6]
+    return b + [f"Hedge {h['type']}: notional AED {h['notional']:,.0f}" for h in out.get("hedges", [])]
+def _plan_mix(out: dict) -> list: return [{**m, "package": f"{b['building_id']} · {m['package']}"} for b in out["buildings"] for m in b["mix"]]
+def _capex_rows(out: dict) -> list: return [{"month": r["month"], "project_id": p["project_id"], "spend": p["spend"]} for r in out["schedule"] for p in r["projects"]]
+# optimizer kind -> downloads key -> writer(path, result)
+WRITERS: Dict[str, Dict[str, Callable]] = {
+    "deal_picker": {"xlsx_plan": lambda path, out: write_allocations_plan_xlsx(path, out["portfolio_summary"], out["asset_allocations"]),
+                    "csv_allocations": lambda path, out: write_csv(path, out["asset_allocations"])},
+    "debt_stack": {"pdf_term_sheet": lambda path, out: write_term_sheet_pdf(path, "Debt Stack Term Sheet", _term_sheet_bullets(out)),
+                   "xlsx_amort": lambda path, out: write_debt_amort_xlsx(path, out["tranche_allocations"])},
+    "capex": {"xlsx_gantt": lambda path, out: write_capex_gantt_xlsx(path, out["schedule"]), "csv_schedule": lambda path, out: write_csv(path, _capex_rows(out))},
+    "leasing": {"xlsx_offer_plan": lambda path, out: write_leasing_offer_xlsx(path, out["mix"], out["kpis"])},
+    "leasing_plan": {"xlsx_offer_plan": lambda path, out: write_leasing_offer_xlsx(path, _plan_mix(out), out["portfolio_kpis"])},
+}
+class ArtifactStore:
+    """
+    Deduplicated files/outputs. Download names carry a hash of the canonical request, so a repeated request maps
+    to a file that is already there (or being written) and is not written again. register() records new artifacts as
+    queued (a status poll right after the response already sees them), start() writes them on a small thread pool.
+    The in-memory index (status queued -> running -> ready | failed, bytes, hits, last access) is seeded from the
+    directory at start-up; sweep() evicts by age, then least-recently-used until under the file-count and byte budgets.
+    """
+    def __init__(self, max_workers: int = 1, max_bytes: int = ARTIFACT_MAX_BYTES, max_files: int = ARTIFACT_MAX_FILES, max_age_s: float = ARTIFACT_MAX_AGE_S):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact"); self._lock = threading.Lock()
+        self.max_bytes, self.max_files, self.max_age_s = max_bytes, max_files, max_age_s
+        self._index: "OrderedDict[str, dict]" = OrderedDict()  # least recently used first
+        self._counters = {"writes": 0, "deduplicated": 0, "downloads": 0, "evicted": 0, "evicted_bytes": 0, "failed": 0}
+        self._sweeper: Optional[threading.Thread] = None; self._stop = threading.Event(); self.reindex()
+    def reindex(self):
+        base = ensure_base(); files = []
+        for p in base.iterdir():
+            if p.is_file() and not p.name.startswith("."): st = p.stat(); files.append((max(st.st_atime, st.st_mtime), p.name, st))
+        with self._lock:
+            for last, name, st in sorted(files):
+                if name not in self._index: self._index[name] = {"name": name, "url": f"/files/outputs/{name}", "kind": artifact_kind(name), "artifact": None, "status": "ready", "bytes": st.st_size, "created_at": st.st_mtime, "last_access": last, "hits": 0}
+    def _set(self, key: str, **fields):
+        with self._lock: cur = self._index.pop(key, {}); self._index[key] = {**cur, **fields}
+    def register(self, kind: str, out: dict) -> list:
+        if not ARTIFACTS_ENABLED or "error" in out: return []
+        base, tasks, now = ensure_base(), [], time.time()
+        for key, url in (out.get("downloads") or {}).items():
+            write = WRITERS.get(kind, {}).get(key)
+            if not url or write is None: continue
+            name = os.path.basename(url)
+            with self._lock:
+                cur = self._index.get(name)
+                if cur is not None and (cur["status"] in ("queued", "running") or (cur["status"] == "ready" and (base / name).is_file())):
+                    self._index.move_to_end(name); cur["last_access"] = now; cur["requests"] = cur.get("requests", 1) + 1; self._counters["deduplicated"] += 1; continue
+            tasks.append((name, str(base / name), write, out))
+            self._set(name, name=name, url=url, kind=kind, artifact=key, status="queued", bytes=None, etag=None, error=None, created_at=now, last_access=now, finished_at=None, hits=0, requests=1)
+        return tasks
+    def start(self, tasks: list):
+        for t in tasks: self._pool.submit(self._run, *t)
+    def submit(self, kind: str, out: dict) -> dict:
+        """register + start in one go (used where there is no response to wait for, e.g. background jobs). Returns out."""
+        self.start(self.register(kind, out)); return out
+    def _run(self, name: str, path: str, write: Callable, out: dict):
+        t0 = time.time(); self._set(name, status="running", started_at=t0)
+        try: size = atomic_write(path, lambda tmp: write(tmp, out)); self._set(name, status="ready", bytes=size, etag=content_etag(path), finished_at=time.time(), write_time_s=round(time.time() - t0, 4)); self._count("writes")
+        except Exception as e: self._set(name, status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time()); self._count("failed")
+    def _count(self, k: str, n: int = 1):
+        with self._lock: self._counters[k] += n
+    def hit(self, name: str):
+        """A download was served: bump its hit count and make it most recently used."""
+        with self._lock:
+            cur = self._index.get(name); self._counters["downloads"] += 1
+            if cur is not None: self._index.move_to_end(name); cur["hits"] = cur.get("hits", 0) + 1; cur["last_access"] = time.time()
+    def etag(self, name: str, path: str) -> str:
+        """Content ETag recorded when the file was written; hashed on first request for files found by reindex()."""
+        with self._lock: tag = (self._index.get(name) or {}).get("etag")
+        if tag is None:
+            tag = content_etag(path)
+            with self._lock:
+                if name in self._index: self._index[name]["etag"] = tag
+        return tag
+    def status(self, name: str) -> Optional[dict]:
+        with self._lock: s = self._index.get(os.path.basename(name))
+        return dict(s) if s is not None else None
+    def sweep(self, now: float = None) -> dict:
+        """Drop stale temp files, then evict ready/failed entries older than max_age_s, then LRU until under max_files and max_bytes."""
+        now = now or time.time(); base = ensure_base(); victims = []
+        for p in base.glob(".*.tmp"):
+            try:
+                if now - p.stat().st_mtime > 3600: p.unlink()
+            except OSError: pass
+        with self._lock:
+            idle = [(n, e) for n, e in self._index.items() if e["status"] in ("ready", "failed")]  # LRU order; in-flight writes are never evicted
+            files, total = len(self._index), sum(e.get("bytes") or 0 for e in self._index.values())
+            for n, e in idle:
+                if now - e.get("last_access", 0) > self.max_age_s or files > self.max_files or total > self.max_bytes:
+                    victims.append(n); files -= 1; total -= e.get("bytes") or 0; del self._index[n]
+        freed = 0
+        for n in victims:
+            try: freed += (base / n).stat().st_size; (base / n).unlink()
+            except OSError: pass
+        self._count("evicted", len(victims)); self._count("evicted_bytes", freed)
+        return {"evicted": len(victims), "freed_bytes": freed}
+    def start_sweeper(self, interval_s: float = ARTIFACT_SWEEP_S):
+        if self._sweeper is not None or interval_s <= 0: return
+        def loop():
+            while not self._stop.wait(interval_s):
+                try: self.sweep()
+                except Exception: pass  # keep sweeping; a bad pass must not kill the thread
+        self._stop.clear(); self._sweeper = threading.Thread(target=loop, name="artifact-sweeper", daemon=True); self._sweeper.start()
+    def stats(self) -> dict:
+        counts, by_kind, total, top = {}, {}, 0, []
+        with self._lock:
+            for e in self._index.values():
+                counts[e["status"]] = counts.get(e["status"], 0) + 1; total += e.get("bytes") or 0
+                k = by_kind.setdefault(e.get("kind", "unknown"), {"files": 0, "bytes": 0, "hits": 0}); k["files"] += 1; k["bytes"] += e.get("bytes") or 0; k["hits"] += e.get("hits", 0)
+            top = sorted(({"name": e["name"], "hits": e.get("hits", 0), "requests": e.get("requests", 1)} for e in self._index.values()), key=lambda r: -r["hits"])[:10]
+            counters = dict(self._counters)
+        return {"enabled": ARTIFACTS_ENABLED, "files": sum(counts.values()), "bytes": total, "artifacts": counts, "by_kind": by_kind, **counters,
+                "limits": {"max_bytes": self.max_bytes, "max_files": self.max_files, "max_age_s": self.max_age_s}, "most_downloaded": top}
+    def shutdown(self):
+        self._stop.set(); self._sweeper = None; self._pool.shutdown(wait=False, cancel_futures=True)
+ARTIFACTS = ArtifactStore(ARTIFACT_WORKERS)
+def schedule_artifacts(background, kind: str, out: dict):
+    """Register out's downloads now and start writing them once the response has been sent (FastAPI BackgroundTasks)."""
+    tasks = ARTIFACTS.register(kind, out)
+    if tasks: background.add_task(ARTIFACTS.start, tasks)
+class OutputFiles(StaticFiles):
+    """files/outputs with ETag = hash of the file content and a revalidating Cache-Control for artifact names; every GET counts as a hit."""
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        name = os.path.basename(full_path); response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if ARTIFACT_NAME.search(name): response.headers["etag"] = ARTIFACTS.etag(name, str(full_path)); response.headers["cache-control"] = CACHE_CONTROL
+        ARTIFACTS.hit(name)
+        if self.is_not_modified(response.headers, Headers(scope=scope)): return NotModifiedResponse(response.headers)
+        return response
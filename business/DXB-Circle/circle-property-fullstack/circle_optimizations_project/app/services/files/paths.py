@@ -1,8 +1,6 @@
 from pathlib import Path
-from datetime import datetime
-import pytz
-TZ = pytz.timezone("Asia/Dubai")
 BASE = Path("files/outputs").resolve()
 def ensure_base() -> Path: BASE.mkdir(parents=True, exist_ok=True); return BASE
-def stamped(name: str, ext: str) -> str:
-    ensure_base(); ts = datetime.now(TZ).strftime("%Y-%m-%d_%H%M%S"); path = BASE / f"{name}_{ts}.{ext}"; return str(path)
+def addressed(name: str, key: str, ext: str) -> str:
+    """Filesystem path of a content-addressed artifact (see common.artifact_url for its URL)."""
+    ensure_base(); return str(BASE / f"{name}_{key}.{ext}")
@@ -0,0 +1,107 @@
+import json, sqlite3, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+ACTIVE = ("queued", "running", "cancelling"); FINISHED = ("done", "failed", "cancelled")
+class QueueFull(RuntimeError): """Every worker is busy and the pending queue is full."""
+class JobCancelled(RuntimeError): """Raised inside a job (via its progress hook) once cancel was requested."""
+class MemoryJobStore:
+    """In-process job records (lost on restart)."""
+    def __init__(self): self._jobs: Dict[str, dict] = {}; self._lock = threading.Lock()
+    def put(self, job: dict):
+        with self._lock: self._jobs[job["job_id"]] = dict(job)
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock: j = self._jobs.get(job_id); return dict(j) if j else None
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs: self._jobs[job_id].update(fields, updated_at=time.time())
+    def all(self):
+        with self._lock: return [dict(j) for j in self._jobs.values()]
+    def delete(self, job_id: str):
+        with self._lock: self._jobs.pop(job_id, None)
+class SQLiteJobStore:
+    """Job records persisted to SQLite so status/results survive restarts; unfinished jobs come back as failed."""
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False); self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, status TEXT, updated_at REAL, doc TEXT)")
+            for job_id, doc in self._db.execute(f"SELECT job_id, doc FROM jobs WHERE status IN ({','.join('?'*len(ACTIVE))})", ACTIVE).fetchall():
+                j = json.loads(doc); j.update(status="failed", error="Interrupted by server restart", finished_at=time.time()); self._write(j)
+    def _write(self, j: dict): self._db.execute("INSERT OR REPLACE INTO jobs VALUES (?,?,?,?)", (j["job_id"], j["status"], j.get("updated_at", time.time()), json.dumps(j)))
+    def put(self, job: dict):
+        with self._lock, self._db: self._write(job)
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock: row = self._db.execute("SELECT doc FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    def update(self, job_id: str, **fields):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT doc FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            if row: j = json.loads(row[0]); j.update(fields, updated_at=time.time()); self._write(j)
+    def all(self):
+        with self._lock: return [json.loads(r[0]) for r in self._db.execute("SELECT doc FROM jobs").fetchall()]
+    def delete(self, job_id: str):
+        with self._lock, self._db: self._db.execute("DELETE FROM jobs WHERE job_id=?", (job_id,))
+def make_store(db_path: Optional[str] = None): return SQLiteJobStore(db_path) if db_path else MemoryJobStore()
+class JobQueue:
+    """
+    Bounded background runner for long solves. fn(payload, progress=..., **opts) returns the optimizer dict;
+    progress(**fields) records phase/incumbent info, accepts solver=<pywraplp.Solver> so cancel can interrupt it,
+    and raises JobCancelled once cancellation was requested. Results carrying "error" finish as failed.
+    """
+    def __init__(self, fn: Callable[..., dict], store=None, max_workers: int = 2, max_queue: int = 16, ttl_s: float = 3600.0, name: str = "jobs"):
+        self.fn, self.store, self.max_workers, self.max_queue, self.ttl_s = fn, store or MemoryJobStore(), max_workers, max_queue, ttl_s
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock(); self._futures, self._solvers, self._cancel = {}, {}, set()
+    def active(self) -> int:
+        with self._lock: return sum(1 for f in self._futures.values() if not f.done())
+    def submit(self, payload: dict, **opts) -> dict:
+        self.purge_expired()
+        now = time.time(); job = {"job_id": uuid.uuid4().hex, "status": "queued", "created_at": now, "updated_at": now, "started_at": None, "finished_at": None, "options": opts, "progress": {}, "error": None, "result": None}
+        with self._lock:
+            if sum(1 for f in self._futures.values() if not f.done()) >= self.max_workers + self.max_queue: raise QueueFull("Job queue is full; retry later")
+            self.store.put(job); self._futures[job["job_id"]] = self._pool.submit(self._run, job["job_id"], payload, opts)
+        return self.public(job)
+    def _run(self, job_id: str, payload: dict, opts: dict):
+        if job_id in self._cancel: return self._finish(job_id, status="cancelled")
+        t0 = time.time(); self.store.update(job_id, status="running", started_at=t0)
+        def progress(solver=None, **fields):
+            if solver is not None:
+                with self._lock: self._solvers[job_id] = solver
+            if job_id in self._cancel: raise JobCancelled()
+            if fields: cur = (self.store.get(job_id) or {}).get("progress") or {}; self.store.update(job_id, progress={**cur, **fields, "elapsed_s": round(time.time() - t0, 3)})
+        try:
+            out = self.fn(payload, progress=progress, **opts)
+            if isinstance(out, dict) and "error" in out: self._finish(job_id, status="failed", error=out["error"], result=out)
+            else: self._finish(job_id, status="done", result=out)
+        except JobCancelled: self._finish(job_id, status="cancelled")
+        except Exception as e: self._finish(job_id, status="failed", error=str(e))
+    def _finish(self, job_id: str, **fields):
+        # under the queue lock so a concurrent cancel() never overwrites a final status
+        with self._lock:
+            if job_id in self._cancel: fields = {"status": "cancelled"}
+            self.store.update(job_id, finished_at=time.time(), **fields); self._solvers.pop(job_id, None); self._cancel.discard(job_id)
+    def get(self, job_id: str) -> Optional[dict]: return self.store.get(job_id)
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED: return job
+        with self._lock:
+            fut, solver = self._futures.get(job_id), self._solvers.get(job_id)
+            if fut is not None and fut.cancel(): self.store.update(job_id, status="cancelled", finished_at=time.time()); return self.store.get(job_id)
+            if (self.store.get(job_id) or {}).get("status") in FINISHED: return self.store.get(job_id)
+            self._cancel.add(job_id); self.store.update(job_id, status="cancelling")
+        if solver is not None:
+            try: solver.InterruptSolve()  # best effort; the result is discarded either way
+            except Exception: pass
+        return self.store.get(job_id)
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_s
+        for j in self.store.all():
+            if j["status"] in FINISHED and (j.get("finished_at") or 0) < cutoff:
+                self.store.delete(j["job_id"])
+                with self._lock: self._futures.pop(j["job_id"], None)
+    def stats(self) -> dict:
+        counts = {}
+        for j in self.store.all(): counts[j["status"]] = counts.get(j["status"], 0) + 1
+        return {"max_workers": self.max_workers, "max_queue": self.max_queue, "active": self.active(), "jobs": counts}
+    @staticmethod
+    def public(job: dict) -> dict: return {k: v for k, v in job.items() if k != "result"}
+    def shutdown(self): self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,33 +1,52 @@
+import time
 from ortools.linear_solver import pywraplp
-from .common import now_stamp
-def solve_capex_milp(req) -> dict:
+from .common import canonical_hash, artifact_url
+def solve_capex_milp(req, time_limit_s=None, progress=None) -> dict:
+    """time_limit_s caps the CBC solve (best incumbent is returned if one exists); progress(**fields) receives phase/incumbent updates."""
+    report = progress or (lambda **kw: None)
     H = int(req.horizon_months); projs = req.projects; cash = list(map(float, req.monthly_cash_cap)); Pmax = int(req.contractor_capacity.max_parallel_projects)
     solver = pywraplp.Solver.CreateSolver("CBC")
     if solver is None: return {"error": "MILP solver unavailable", "fix_suggestions": [{"change": "Install OR-Tools CBC", "impact": "Required"}]}
-    s, y, BIGM = {}, {}, (max([p.max_spend for p in projs]) if projs else 1e6)
-    for j,p in enumerate(projs):
-        for t in range(1,H+1):
-            s[j,t] = solver.NumVar(0.0, BIGM, f"s_{j}_{t}")
-            y[j,t] = solver.IntVar(0, 1, f"y_{j}_{t}")
-    for j,p in enumerate(projs):
-        for t in range(1,H+1):
-            if t < p.earliest_month or t > p.latest_month: solver.Add(s[j,t]==0); solver.Add(y[j,t]==0)
-            else: solver.Add(s[j,t] <= BIGM * y[j,t])
-        total = solver.Sum([s[j,t] for t in range(1,H+1)]); solver.Add(total >= p.min_spend); solver.Add(total <= p.max_spend)
-    for t in range(1,H+1):
-        solver.Add(solver.Sum([s[j,t] for j,_ in enumerate(projs)]) <= cash[t-1])
-        solver.Add(solver.Sum([y[j,t] for j,_ in enumerate(projs)]) <= Pmax)
-    obj = solver.Sum([p.uplift_rate * solver.Sum([s[j,t] for t in range(1,H+1)]) for j,p in enumerate(projs)]); solver.Maximize(obj)
-    status = solver.Solve()
+    report(solver=solver, phase="building"); t_build = time.perf_counter()
+    s = build_capex_model(solver, H, projs, cash, Pmax); build_time_s = time.perf_counter() - t_build
+    if time_limit_s: solver.SetTimeLimit(int(float(time_limit_s) * 1000))
+    report(phase="solving", variables=solver.NumVariables(), constraints=solver.NumConstraints(), time_limit_s=time_limit_s, build_time_s=round(build_time_s, 4))
+    t_solve = time.perf_counter(); status = solver.Solve()
+    stats = solve_stats(solver, status, time_limit_s); stats.update(build_time_s=round(build_time_s, 4), solve_time_s=round(time.perf_counter() - t_solve, 4), variables=solver.NumVariables(), constraints=solver.NumConstraints()); report(phase="extracting", **stats)
+    if status == pywraplp.Solver.NOT_SOLVED and time_limit_s and stats["solve_time_s"] >= float(time_limit_s) * 0.99:
+        return {"error": "Time limit reached before a feasible plan was found", "solve_stats": stats, "fix_suggestions": [{"change": "Increase the solver time limit", "impact": "+ feasibility"},{"change": "Shorten the horizon or drop projects", "impact": "- model size"}]}
     if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
         return {"error": "Model infeasible","fix_suggestions":[{"change":"Increase monthly cash caps","impact":"+ feasibility"},{"change":"Lower project min spend","impact":"+ feasibility"},{"change":"Increase max parallel projects","impact":"+ feasibility"}]}
-    schedule, uplift = [], 0.0
-    for t in range(1,H+1):
-        month_spend = 0.0; breakdown = []
-        for j,p in enumerate(projs):
-            v = s[j,t].solution_value()
-            if v > 1e-6: breakdown.append({"project_id": p.project_id, "spend": float(v)}); month_spend += v
-        schedule.append({"month": t, "spend": float(month_spend), "projects": breakdown})
-    for j,p in enumerate(projs): uplift += p.uplift_rate * sum(s[j,t].solution_value() for t in range(1,H+1))
-    return {"schedule": schedule,"expected_annual_noi_uplift": float(uplift),"constraints_report": {"binding": [], "shadow_prices": []},
-            "downloads": {"xlsx_gantt": now_stamp("capex_gantt", "xlsx"), "csv_schedule": now_stamp("capex_schedule", "csv")}}
+    spend = {t: [] for t in range(1,H+1)}; uplift = 0.0
+    for (j,t), var in s.items():
+        v = var.solution_value()
+        if v > 1e-6: spend[t].append({"project_id": projs[j].project_id, "spend": float(v)})
+        uplift += projs[j].uplift_rate * v
+    schedule = [{"month": t, "spend": float(sum(b["spend"] for b in spend[t])), "projects": spend[t]} for t in range(1,H+1)]
+    return {"schedule": schedule,"expected_annual_noi_uplift": float(uplift),"constraints_report": {"binding": [], "shadow_prices": []},"solve_stats": stats,
+            "downloads": {"xlsx_gantt": artifact_url("capex_gantt", "xlsx", key := canonical_hash(req, time_limit_s=time_limit_s)), "csv_schedule": artifact_url("capex_schedule", "csv", key)}}
+def build_capex_model(solver, H, projs, cash, Pmax) -> dict:
+    """
+    Sparse build: s/y variables exist only inside each project's [earliest_month, latest_month] window (clipped to the horizon),
+    and rows are filled coefficient by coefficient through the Constraint/Objective API instead of LinearExpr operators.
+    Returns {(j, t): s_var}. Each s is bounded by the project's own max_spend, which also serves as its big-M.
+    """
+    inf = solver.infinity(); obj = solver.Objective(); s = {}
+    cash_rows = [solver.Constraint(-inf, cash[t-1], f"cash_{t}") for t in range(1,H+1)]
+    crew_rows = [solver.Constraint(-inf, Pmax, f"parallel_{t}") for t in range(1,H+1)]
+    for j,p in enumerate(projs):
+        M, rate = float(p.max_spend), float(p.uplift_rate); total = solver.Constraint(float(p.min_spend), M, f"total_{j}")
+        for t in range(max(1, p.earliest_month), min(H, p.latest_month) + 1):
+            sv, yv = solver.NumVar(0.0, M, f"s_{j}_{t}"), solver.IntVar(0, 1, f"y_{j}_{t}")
+            link = solver.Constraint(-inf, 0.0, f"link_{j}_{t}"); link.SetCoefficient(sv, 1.0); link.SetCoefficient(yv, -M)
+            total.SetCoefficient(sv, 1.0); cash_rows[t-1].SetCoefficient(sv, 1.0); crew_rows[t-1].SetCoefficient(yv, 1.0); obj.SetCoefficient(sv, rate)
+            s[j,t] = sv
+    obj.SetMaximization()
+    return s
+def solve_stats(solver, status, time_limit_s=None) -> dict:
+    """Incumbent objective, best bound and relative gap; status "feasible" means the time limit stopped CBC early."""
+    names = {pywraplp.Solver.OPTIMAL: "optimal", pywraplp.Solver.FEASIBLE: "feasible", pywraplp.Solver.INFEASIBLE: "infeasible", pywraplp.Solver.UNBOUNDED: "unbounded", pywraplp.Solver.ABNORMAL: "abnormal", pywraplp.Solver.NOT_SOLVED: "not_solved"}
+    out = {"status": names.get(status, str(status)), "wall_time_s": round(solver.wall_time() / 1000.0, 3), "time_limit_s": time_limit_s, "nodes": int(solver.nodes()), "objective": None, "best_bound": None, "gap": None}
+    if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        obj, bound = solver.Objective().Value(), solver.Objective().BestBound(); out.update(objective=float(obj), best_bound=float(bound), gap=float(abs(bound - obj) / max(1e-9, abs(obj))))
+    return out
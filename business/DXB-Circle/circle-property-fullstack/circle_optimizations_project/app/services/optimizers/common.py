@@ -1,11 +1,111 @@
-from typing import Dict
-from datetime import datetime
-import pytz
-TZ = pytz.timezone("Asia/Dubai")
-def now_stamp(prefix: str, ext: str) -> str:
-    dt = datetime.now(TZ).strftime("%Y-%m-%d_%H%M%S")
-    return f"/files/outputs/{prefix}_{dt}.{ext}"
+import hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+import scipy.sparse as sp
+def canonical_hash(req, **extra) -> str:
+    """Hash of a validated request (plus any solve options that change the answer): equal payloads hash equal whatever their key order or number formatting."""
+    doc = req.model_dump(mode="json") if hasattr(req, "model_dump") else req
+    return hashlib.blake2b(json.dumps([doc, extra], sort_keys=True, separators=(",", ":"), default=str).encode(), digest_size=16).hexdigest()
+def artifact_url(prefix: str, ext: str, key: str) -> str:
+    """Content-addressed download URL: the same request always maps to the same file, so identical plans are written once."""
+    return f"/files/outputs/{prefix}_{key}.{ext}"
 def binding_constraints(slacks: Dict[str, float], tol: float = 1e-6):
     return [{"name": k, "slack": float(v)} for k, v in slacks.items() if v <= tol]
 def shadow_prices(duals: Dict[str, float], unit: str):
     return [{"constraint": k, "unit": unit, "marginal_value": float(v)} for k, v in duals.items()]
+def group_cap_rows(labels, caps: Dict[str, float], weights):
+    """
+    One sparse (CSR) row per cap key that occurs in labels: row r carries `weights` on the items labelled with the r-th key.
+    Labels are mapped to rows in a single pass instead of building one dense mask per cap. Returns (matrix, keys).
+    """
+    present = set(labels); keys = [k for k in caps if k in present]; index = {k: r for r, k in enumerate(keys)}
+    rows = np.fromiter((index.get(l, -1) for l in labels), dtype=np.int64, count=len(labels)); cols = np.nonzero(rows >= 0)[0]
+    return sp.csr_matrix((np.asarray(weights, dtype=float)[cols], (rows[cols], cols)), shape=(len(keys), len(labels))), keys
+def lp_slacks_duals(res, names, bound_caps=()):
+    """
+    Slack and dual per named A_ub row (HiGHS ineqlin.residual / marginals), plus caps folded into variable upper bounds,
+    given as (name, var_index, cap_value, is_active_bound) and read from res.upper.
+    """
+    slacks, duals = {}, {}
+    if getattr(res, "ineqlin", None) is not None:
+        for i, nm in enumerate(names): slacks[nm] = float(res.ineqlin.residual[i]); duals[nm] = float(res.ineqlin.marginals[i])
+    upper = getattr(res, "upper", None)
+    for nm, k, cap, active in bound_caps:
+        slacks[nm] = float(cap - res.x[k]); duals[nm] = float(upper.marginals[k]) if (active and upper is not None) else 0.0
+    return slacks, duals
+SOLVE_CACHE_SIZE = int(os.getenv("SOLVE_CACHE_SIZE", "128")); SOLVE_CACHE_TTL_S = float(os.getenv("SOLVE_CACHE_TTL_S", "86400")); SOLVE_CACHE_DB = os.getenv("SOLVE_CACHE_DB")
+SOLVE_CACHE_DB_MAX = int(os.getenv("SOLVE_CACHE_DB_MAX", "5000")); SOLVE_CACHE_WAIT_S = float(os.getenv("SOLVE_CACHE_WAIT_S", "600"))
+def _json_default(o):
+    if isinstance(o, (np.ndarray, np.generic)): return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+class SolveCache:
+    """
+    Optimizer results keyed by canonical_hash(namespace, validated request, solve options). A bounded in-memory LRU in
+    front of an optional SQLite table (db_path) that survives restarts; entries older than ttl_s are ignored. Results
+    carrying "error" are never stored. Concurrent identical requests are coalesced: one solves, the others wait for it
+    and read its entry. Hit/miss counters are kept per namespace (one per router).
+    """
+    def __init__(self, size: int = 128, ttl_s: float = 0.0, db_path: Optional[str] = None, db_max: int = 5000):
+        self.size, self.ttl_s, self.db_max = size, ttl_s, db_max; self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Tuple[float, dict, str]]" = OrderedDict(); self._inflight: Dict[str, threading.Event] = {}; self._stats: Dict[str, dict] = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False) if db_path else None
+        if self._db is not None:
+            with self._lock, self._db: self._db.execute("CREATE TABLE IF NOT EXISTS solves (key TEXT PRIMARY KEY, namespace TEXT, created_at REAL, doc TEXT)")
+    def _count(self, ns: str, field: str):
+        with self._lock:
+            st = self._stats.setdefault(ns, {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "stores": 0}); st[field] += 1
+    def _fresh(self, created_at: float) -> bool: return self.ttl_s <= 0 or time.time() - created_at <= self.ttl_s
+    def get(self, key: str) -> Optional[Tuple[float, dict, str]]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and self._fresh(hit[0]): self._mem.move_to_end(key); return hit[0], hit[1], "memory"
+            if self._db is None: return None
+            row = self._db.execute("SELECT created_at, doc, namespace FROM solves WHERE key=?", (key,)).fetchone()
+        if row is None or not self._fresh(row[0]): return None
+        out = json.loads(row[1]); self._remember(key, row[0], out, row[2]); return row[0], out, "disk"
+    def _remember(self, key: str, created_at: float, out: dict, ns: str):
+        with self._lock:
+            self._mem[key] = (created_at, out, ns); self._mem.move_to_end(key)
+            while len(self._mem) > self.size: self._mem.popitem(last=False)
+    def put(self, ns: str, key: str, out: dict):
+        now = time.time(); self._remember(key, now, out, ns); self._count(ns, "stores")
+        if self._db is None: return
+        doc = json.dumps(out, default=_json_default, separators=(",", ":"))
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO solves VALUES (?,?,?,?)", (key, ns, now, doc))
+            excess = self._db.execute("SELECT COUNT(*) FROM solves").fetchone()[0] - self.db_max
+            if excess > 0: self._db.execute("DELETE FROM solves WHERE key IN (SELECT key FROM solves ORDER BY created_at LIMIT ?)", (excess,))
+    def solve(self, ns: str, req, fn: Callable[[], dict], refresh: bool = False, **opts) -> Tuple[dict, dict]:
+        """(result, response headers). refresh=True skips the lookup and overwrites the entry with a new solve."""
+        key = canonical_hash(req, namespace=ns, **opts)
+        while True:
+            hit = None if refresh else self.get(key)
+            if hit is not None:
+                created_at, out, tier = hit; self._count(ns, "hits"); self._count(ns, f"{tier}_hits")
+                return out, {"X-Cache": "HIT", "X-Cache-Key": key, "ETag": f'"{key}"', "Age": str(int(time.time() - created_at))}
+            with self._lock:
+                ev = self._inflight.get(key)
+                if ev is None: ev = self._inflight[key] = threading.Event(); break
+            self._count(ns, "coalesced"); ev.wait(SOLVE_CACHE_WAIT_S); refresh = False  # leader done: read its entry (or solve ourselves if it failed)
+        try:
+            out = fn(); self._count(ns, "misses")
+            if "error" not in out: self.put(ns, key, out)
+        finally:
+            with self._lock: self._inflight.pop(key, None)
+            ev.set()
+        return out, {"X-Cache": "MISS", "X-Cache-Key": key, "ETag": f'"{key}"'}
+    def stats(self, ns: str) -> dict:
+        with self._lock:
+            st = dict(self._stats.get(ns) or {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "stores": 0})
+            st["memory_entries"] = sum(1 for e in self._mem.values() if e[2] == ns); st["in_flight"] = len(self._inflight)
+            st["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM solves WHERE namespace=?", (ns,)).fetchone()[0] if self._db is not None else None
+        looked = st["hits"] + st["misses"]
+        return {"namespace": ns, **st, "hit_rate": st["hits"] / looked if looked else None, "size": self.size, "ttl_s": self.ttl_s, "disk": self._db is not None}
+    def clear(self, ns: str = None):
+        """Drop every entry, or only one namespace's."""
+        with self._lock:
+            for k in [k for k, e in self._mem.items() if ns is None or e[2] == ns]: del self._mem[k]
+            if self._db is not None:
+                with self._db: self._db.execute("DELETE FROM solves" + (" WHERE namespace=?" if ns else ""), (ns,) if ns else ())
+SOLVE_CACHE = SolveCache(SOLVE_CACHE_SIZE, SOLVE_CACHE_TTL_S, SOLVE_CACHE_DB, SOLVE_CACHE_DB_MAX)
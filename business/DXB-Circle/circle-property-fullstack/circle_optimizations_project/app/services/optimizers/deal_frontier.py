@@ -0,0 +1,71 @@
+import hashlib, multiprocessing, os, threading, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.optimize import linprog
+from .deal_picker_lp import get_model
+FRONTIER_WORKERS = int(os.getenv("FRONTIER_WORKERS", str(os.cpu_count() or 1))); FRONTIER_MIN_PARALLEL = int(os.getenv("FRONTIER_MIN_PARALLEL", "64"))
+_POOL = None; _POOL_LOCK = threading.Lock()
+def _pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None: _POOL = ProcessPoolExecutor(max_workers=FRONTIER_WORKERS, mp_context=multiprocessing.get_context("spawn"))  # no fork: the API process has threads (artifact writer, sweeper)
+        return _POOL
+def shutdown():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None: _POOL.shutdown(wait=False, cancel_futures=True); _POOL = None
+def _c(m: dict, penalty: float): return -(m["noi"] - penalty * m["risk"] * m["ask"])
+def _lp(m: dict, c, b):
+    res = linprog(c, A_ub=m["A_ub"], b_ub=b, bounds=m["bounds"], method="highs")
+    return (res.x, float(res.fun)) if res.status == 0 else (None, None)
+def _penalty_chunk(m: dict, values: list) -> list:
+    """
+    Penalty sweep over sorted values. c is linear in the penalty, so the set of penalties at which a vertex is optimal
+    is an interval: when both ends of a stretch return the same allocation every point between reuses it unsolved.
+    Returns (x, objective, solved) per value.
+    """
+    out = [None] * len(values)
+    def solve(i):
+        if out[i] is None: x, f = _lp(m, _c(m, values[i]), m["b"]); out[i] = (x, f, True)
+        return out[i][0]
+    def same(a, b): return a is not None and b is not None and np.allclose(a, b, atol=1e-9)
+    def fill(lo, hi):
+        if hi - lo <= 1: return
+        xl, xh = solve(lo), solve(hi)
+        if same(xl, xh):
+            for k in range(lo + 1, hi): out[k] = (xl, float(_c(m, values[k]) @ xl), False)
+        else: mid = (lo + hi) // 2; solve(mid); fill(lo, mid); fill(mid, hi)
+    solve(0); solve(len(values) - 1); fill(0, len(values) - 1)
+    return out
+def _budget_chunk(m: dict, values: list) -> list:
+    c = _c(m, m["penalty"]); return [(*_lp(m, c, m["b_const"] + v * m["b_coef"]), True) for v in values]
+def _run_chunk(m: dict, kind: str, values: list) -> list: return (_penalty_chunk if kind == "risk_penalty" else _budget_chunk)(m, values)
+def _chunks(values: list, n: int): k = -(-len(values) // n); return [values[i:i + k] for i in range(0, len(values), k)]
+def deal_frontier(req, parameter: str, values, workers: int = None) -> dict:
+    """
+    Sweep risk_penalty_per_point (risk/yield frontier) or budget over values on the cached deal model. For requests
+    with max_assets or whole-deal allocations the sweep runs on the LP relaxation (stats.relaxation = true).
+    The matrix is shipped once per contiguous chunk; each worker sweeps its stretch in order. Points that share an
+    allocation reference one entry in "allocations".
+    """
+    t0 = time.perf_counter(); model = get_model(req); p = model.params(); values = sorted(float(v) for v in values)
+    penalty = float(req.risk_penalty_per_point or 0.0) if req.objective == "risk_adjusted" else 0.0
+    A, b = model.relaxation(p); b_coef = np.zeros(len(b)); b_coef[:model.A_ub.shape[0]] = model.rhs({**p, "budget": 1.0})  # count row does not scale with budget
+    m = {"ask": model.ask, "noi": model.effective_noi(p["vacancy_haircut"]), "risk": model.risk, "A_ub": A, "b": b, "b_coef": b_coef, "b_const": b - p["budget"] * b_coef, "penalty": penalty, "bounds": model.bounds()}
+    workers = max(1, min(workers or FRONTIER_WORKERS, len(values)))
+    if workers == 1 or len(values) < FRONTIER_MIN_PARALLEL: workers, sols = 1, _run_chunk(m, parameter, values)
+    else: sols = [s for part in _pool().map(_run_chunk, [m] * workers, [parameter] * workers, _chunks(values, workers)) for s in part]
+    points, allocations = [], {}
+    for v, (x, f, solved) in zip(values, sols):
+        if x is None: points.append({"value": v, "feasible": False}); continue
+        key = np.round(x, 9); aid = hashlib.blake2b(key.tobytes(), digest_size=8).hexdigest(); capital = x * model.ask
+        if aid not in allocations:
+            allocations[aid] = [{"deal_id": d.deal_id, "weight": float(x[i]), "capital": float(capital[i])} for i, d in enumerate(model.deals) if x[i] > 1e-9]
+        used = float(capital.sum()); noi = float(x @ m["noi"])
+        points.append({"value": v, "feasible": True, "allocation_id": aid, "objective": -f, "capital_used": used, "expected_noi": noi,
+                       "cash_yield": noi / used if used > 0 else 0.0, "avg_risk_score": float(capital @ model.risk / used) if used > 0 else 0.0,
+                       "num_assets_selected": int((x > 1e-6).sum()), "solved": solved})
+    wall = time.perf_counter() - t0; solves = sum(1 for s in sols if s[2])
+    return {"parameter": parameter, "model_id": model.model_id, "points": points, "allocations": allocations,
+            "stats": {"points": len(values), "solves": solves, "reused": len(values) - solves, "distinct_allocations": len(allocations), "workers": workers, "relaxation": model.mip,
+                      "wall_time_s": round(wall, 4), "points_per_s": round(len(values) / wall, 1) if wall > 0 else None}}
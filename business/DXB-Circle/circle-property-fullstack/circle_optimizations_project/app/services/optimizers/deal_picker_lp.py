@@ -1,32 +1,181 @@
-import numpy as np
-from scipy.optimize import linprog
-from .common import now_stamp, binding_constraints, shadow_prices
-def solve_deal_picker_lp(req) -> dict:
-    deals = req.deals; n = len(deals)
-    ask = np.array([d.ask_price for d in deals], dtype=float)
-    noi = np.array([d.expected_noi for d in deals], dtype=float)
-    risk = np.array([getattr(d, "risk_score", 0.0) for d in deals], dtype=float)
-    cost_rate = float(req.assumptions.get("deal_cost_rate", 0.0))
-    vac_haircut = float(req.assumptions.get("vacancy_haircut", 0.0))
-    effective_noi = noi * (1.0 - vac_haircut)
-    c = -(effective_noi - float(req.risk_penalty_per_point or 0.0) * risk * ask) if req.objective == "risk_adjusted" else -effective_noi
-    A, b, names = [], [], []
-    A.append(ask); b.append(float(req.budget) * (1.0 - cost_rate)); names.append("Budget")
-    for sector, cap in (req.max_alloc_per_sector or {}).items():
-        mask = np.array([1.0 if d.sector == sector else 0.0 for d in deals])
-        if mask.sum() > 0: A.append(mask * ask); b.append(float(req.budget) * cap); names.append(f"Max {sector} Allocation {int(cap*100)}%")
-    for city, cap in (req.max_alloc_per_city or {}).items():
-        mask = np.array([1.0 if d.city == city else 0.0 for d in deals])
-        if mask.sum() > 0: A.append(mask * ask); b.append(float(req.budget) * cap); names.append(f"Max {city} Allocation {int(cap*100)}%")
-    res = linprog(c, A_ub=np.vstack(A), b_ub=np.array(b), bounds=[(0.0,1.0)]*n, method="highs")
-    if res.status != 0: return {"error":"Model infeasible","fix_suggestions":[{"change":"Increase budget","impact":"+ feasibility"},{"change":"Relax caps","impact":"+ feasibility"}]}
-    x = res.x; capital = (x * ask); capital_used = float(capital.sum()); exp_noi = (x * effective_noi).sum(); cash_yield = float(exp_noi / capital_used) if capital_used > 0 else 0.0
-    slacks, duals = {}, {}
-    if res.ineqlin is not None:
-        for i, nm in enumerate(names): slacks[nm] = float(res.ineqlin.slack[i]); duals[nm] = float(res.ineqlin.marginals[i])
-    allocations = [{"deal_id": d.deal_id, "weight": float(capital[i] / max(1e-9, float(req.budget))), "capital": float(capital[i]), "expected_noi": float(x[i]*effective_noi[i])} for i,d in enumerate(deals) if x[i]>1e-9]
+import hashlib, json, os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np, scipy.sparse as sp
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+from .common import canonical_hash, artifact_url, binding_constraints, shadow_prices, group_cap_rows, lp_slacks_duals
+INFEASIBLE = {"error":"Model infeasible","fix_suggestions":[{"change":"Increase budget","impact":"+ feasibility"},{"change":"Relax caps","impact":"+ feasibility"}]}
+DEFAULT_WHAT_IF = [{"label": "Increase budget +1,000,000 AED", "budget_delta": 1_000_000.0}]
+MODEL_CACHE_SIZE = int(os.getenv("DEAL_MODEL_CACHE_SIZE", "32")); WHAT_IF_WORKERS = int(os.getenv("WHAT_IF_WORKERS", str(min(4, os.cpu_count() or 1))))
+DEFAULT_TIME_LIMIT_S = float(os.getenv("DEAL_TIME_LIMIT_S", "30")); DEFAULT_MIP_GAP = float(os.getenv("DEAL_MIP_GAP", "1e-4"))
+_MODELS: "OrderedDict[str, DealModel]" = OrderedDict(); _MODELS_LOCK = threading.Lock(); _POOL = None
+class DealModel:
+    """
+    Built deal_picker model: data vectors and the sparse A_ub, reused by what-if re-solves (only c and b_ub change per delta).
+    must_buy fixes a deal's share at 1. max_assets or allow_fractional_allocations=False make it a MILP (HiGHS via scipy milp).
+    """
+    __slots__ = ("model_id", "req", "deals", "ask", "noi", "risk", "rows", "A_ub", "names", "lb", "mip")
+    def __init__(self, req, model_id=None):
+        self.model_id, self.req, self.deals = model_id or model_fingerprint(req), req, req.deals
+        self.ask = np.array([d.ask_price for d in self.deals], dtype=float); self.noi = np.array([d.expected_noi for d in self.deals], dtype=float)
+        self.risk = np.array([getattr(d, "risk_score", 0.0) for d in self.deals], dtype=float)
+        self.lb = np.array([1.0 if getattr(d, "must_buy", False) else 0.0 for d in self.deals]); self.mip = req.max_assets is not None or not req.allow_fractional_allocations
+        self.A_ub, self.rows = deal_constraints(req, self.deals, self.ask); self.names = row_names(self.rows, req.max_alloc_per_sector or {}, req.max_alloc_per_city or {})
+    def params(self) -> dict:
+        a = self.req.assumptions
+        return {"budget": float(self.req.budget), "deal_cost_rate": float(a.get("deal_cost_rate", 0.0)), "vacancy_haircut": float(a.get("vacancy_haircut", 0.0)),
+                "sector": dict(self.req.max_alloc_per_sector or {}), "city": dict(self.req.max_alloc_per_city or {})}
+    def effective_noi(self, haircut: float): return self.noi * (1.0 - haircut)
+    def objective(self, haircut: float):
+        eff = self.effective_noi(haircut)
+        return -(eff - float(self.req.risk_penalty_per_point or 0.0) * self.risk * self.ask) if self.req.objective == "risk_adjusted" else -eff
+    def rhs(self, p: dict):
+        return np.array([p["budget"] * (1.0 - p["deal_cost_rate"]) if kind == "budget" else p["budget"] * p[kind][key] for kind, key in self.rows])
+    def relaxation(self, p: dict):
+        """(A, b) of the MILP's LP relaxation: y = x, so max_assets relaxes to a sum(x) <= max_assets row."""
+        if self.req.max_assets is None: return self.A_ub, self.rhs(p)
+        return sp.vstack([self.A_ub, sp.csr_matrix(np.ones((1, len(self.deals))))], format="csr"), np.append(self.rhs(p), self.req.max_assets)
+    def solve_relaxation(self, p: dict):
+        A, b = self.relaxation(p); return linprog(self.objective(p["vacancy_haircut"]), A_ub=A, b_ub=b, bounds=self.bounds(), method="highs")
+    def bounds(self, ub=None): return np.column_stack((self.lb, np.ones(len(self.deals)) if ub is None else ub))
+    def solve_lp(self, p: dict, ub=None): return linprog(self.objective(p["vacancy_haircut"]), A_ub=self.A_ub, b_ub=self.rhs(p), bounds=self.bounds(ub), method="highs")
+    def solve(self, p: dict, time_limit_s: float = None, mip_gap: float = None, heuristic_only: bool = False):
+        return solve_mip(self, p, time_limit_s or DEFAULT_TIME_LIMIT_S, DEFAULT_MIP_GAP if mip_gap is None else mip_gap, heuristic_only) if self.mip else self.solve_lp(p)
+def model_fingerprint(req) -> str:
+    canon = json.dumps(req.model_dump(exclude={"what_if"}), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canon.encode(), digest_size=16).hexdigest()
+def get_model(req) -> DealModel:
+    """Built model for req from the LRU cache (keyed by request fingerprint), building it on a miss."""
+    key = model_fingerprint(req)
+    with _MODELS_LOCK:
+        m = _MODELS.get(key)
+        if m is not None: _MODELS.move_to_end(key); return m
+    m = DealModel(req, key)
+    with _MODELS_LOCK:
+        _MODELS[key] = m
+        while len(_MODELS) > MODEL_CACHE_SIZE: _MODELS.popitem(last=False)
+    return m
+def cached_model(model_id: str):
+    with _MODELS_LOCK: return _MODELS.get(model_id)
+def _artifact_key(model: DealModel, time_limit_s, mip_gap, heuristic_only) -> str:
+    # model_id already fingerprints everything the downloads depend on; solve options only matter for MILPs
+    return canonical_hash({"model_id": model.model_id}, **({"time_limit_s": time_limit_s, "mip_gap": mip_gap, "heuristic_only": heuristic_only} if model.mip else {}))
+def solve_deal_picker_lp(req, time_limit_s: float = None, mip_gap: float = None, heuristic_only: bool = False) -> dict:
+    t0 = time.perf_counter(); model = get_model(req); p = model.params(); res = model.solve(p, time_limit_s, mip_gap, heuristic_only)
+    if res.status != 0: return dict(INFEASIBLE)
+    stats = res.stats if model.mip else {"method": "lp", "status": "optimal", "solve_time_s": round(time.perf_counter() - t0, 4), "objective": float(-res.fun)}
+    x = res.x; ask, effective_noi = model.ask, model.effective_noi(p["vacancy_haircut"]); capital = (x * ask); capital_used = float(capital.sum()); exp_noi = (x * effective_noi).sum(); cash_yield = float(exp_noi / capital_used) if capital_used > 0 else 0.0
+    # no duals for a MILP: report slacks at the incumbent and leave shadow prices empty
+    slacks, duals = lp_slacks_duals(res, model.names) if not model.mip else (dict(zip(model.names, (model.rhs(p) - model.A_ub @ x).tolist())), {})
+    allocations = [{"deal_id": d.deal_id, "weight": float(capital[i] / max(1e-9, float(req.budget))), "capital": float(capital[i]), "expected_noi": float(x[i]*effective_noi[i])} for i,d in enumerate(model.deals) if x[i]>1e-9]
+    deltas = DEFAULT_WHAT_IF if getattr(req, "what_if", None) is None else [d.model_dump() if hasattr(d, "model_dump") else d for d in req.what_if]
     return {"portfolio_summary":{"capital_used": capital_used,"cash_yield": cash_yield,"risk_adjusted_yield": cash_yield,"num_assets_selected": int((x>1e-6).sum())},
             "asset_allocations": allocations,
             "constraints_report":{"binding": binding_constraints(slacks),"shadow_prices": shadow_prices(duals, unit="AED")},
-            "what_if":[{"change":"Increase budget +1,000,000 AED","delta_cash_yield":"+~0.2%"}],
-            "downloads":{"xlsx_plan": now_stamp("deal_picker_plan", "xlsx"),"csv_allocations": now_stamp("deal_picker_allocs", "csv")}}
+            "what_if": what_if_table(model, deltas, base=res, time_limit_s=time_limit_s, mip_gap=mip_gap, heuristic_only=heuristic_only), "model_id": model.model_id, "solve_stats": stats,
+            "downloads":{"xlsx_plan": artifact_url("deal_picker_plan", "xlsx", key := _artifact_key(model, time_limit_s, mip_gap, heuristic_only)),"csv_allocations": artifact_url("deal_picker_allocs", "csv", key)}}
+def deal_constraints(req, deals, ask):
+    """Sparse A_ub: the budget row plus one CSR row per sector/city cap, deals grouped by label in one pass each. Rows are tagged (kind, key)."""
+    mats, rows = [sp.csr_matrix(ask.reshape(1, -1))], [("budget", None)]
+    for kind, caps in (("sector", req.max_alloc_per_sector or {}), ("city", req.max_alloc_per_city or {})):
+        M, keys = group_cap_rows([getattr(d, kind) for d in deals], caps, ask); mats.append(M); rows += [(kind, k) for k in keys]
+    return sp.vstack(mats, format="csr"), rows
+def row_names(rows, sector_caps, city_caps):
+    caps = {"sector": sector_caps, "city": city_caps}
+    return ["Budget" if kind == "budget" else f"Max {key} Allocation {int(caps[kind][key]*100)}%" for kind, key in rows]
+# --- What-if: parameter deltas re-solved on the cached matrices ---
+def apply_delta(base: dict, delta: dict) -> dict:
+    p = {**base, "sector": {**base["sector"], **(delta.get("sector_caps") or {})}, "city": {**base["city"], **(delta.get("city_caps") or {})}}
+    p["budget"] = base["budget"] + float(delta.get("budget_delta") or 0.0)
+    for k in ("vacancy_haircut", "deal_cost_rate"):
+        if delta.get(k) is not None: p[k] = float(delta[k])
+    return p
+def delta_label(delta: dict) -> str:
+    if delta.get("label"): return delta["label"]
+    parts = [f"budget {float(delta['budget_delta']):+,.0f} AED"] if delta.get("budget_delta") else []
+    parts += [f"{k} cap {v:.0%}" for kind in ("sector_caps", "city_caps") for k, v in (delta.get(kind) or {}).items()]
+    parts += [f"{k.replace('_', ' ')} {float(delta[k]):.1%}" for k in ("vacancy_haircut", "deal_cost_rate") if delta.get(k) is not None]
+    return ", ".join(parts) or "no change"
+def _portfolio(model: DealModel, x, haircut: float) -> dict:
+    capital = float((x * model.ask).sum()); noi = float((x * model.effective_noi(haircut)).sum())
+    return {"capital_used": capital, "expected_noi": noi, "cash_yield": noi / capital if capital > 0 else 0.0, "num_assets_selected": int((x > 1e-6).sum())}
+def _what_if_row(model: DealModel, base_p: dict, base_res, base_pf: dict, delta: dict, opts: dict) -> dict:
+    p = apply_delta(base_p, delta); row = {"change": delta_label(delta), "budget": p["budget"]}
+    # first-order estimate from the base duals: dObj ~ -(marginals . db) - x . dc  (linprog minimises c.x)
+    new_keys = [(kind, k) for kind in ("sector", "city") for k in p[kind] if k not in base_p[kind]]
+    db, dc = model.rhs(p) - model.rhs(base_p), model.objective(p["vacancy_haircut"]) - model.objective(base_p["vacancy_haircut"])
+    row["estimated_delta_objective"] = None if new_keys or model.mip else float(-(base_res.ineqlin.marginals @ db) - base_res.x @ dc)
+    if new_keys:  # a cap on a new sector/city needs extra rows: rebuild once for this delta
+        upd = {"max_alloc_per_sector": p["sector"], "max_alloc_per_city": p["city"]}; res = DealModel(model.req.model_copy(update=upd), model.model_id).solve(p, **opts)
+    else: res = model.solve(p, **opts)
+    if res.status != 0: return {**row, "feasible": False, "delta_cash_yield": None}
+    pf = _portfolio(model, res.x, p["vacancy_haircut"])
+    return {**row, "feasible": True, "objective": float(-res.fun), "delta_objective": float(base_res.fun - res.fun), **pf,
+            "delta_expected_noi": pf["expected_noi"] - base_pf["expected_noi"], "delta_capital_used": pf["capital_used"] - base_pf["capital_used"],
+            "delta_cash_yield": f"{pf['cash_yield'] - base_pf['cash_yield']:+.2%}"}
+def what_if_table(model: DealModel, deltas, base=None, time_limit_s: float = None, mip_gap: float = None, heuristic_only: bool = False) -> list:
+    """
+    One row per delta (re-solved in parallel, HiGHS on the shared A_ub) with the dual-based first-order estimate alongside.
+    Every re-solve uses the base solve's options (time_limit_s, mip_gap, heuristic_only), so MILP rows compare like with like.
+    """
+    global _POOL
+    if not deltas: return []
+    opts = {"time_limit_s": time_limit_s, "mip_gap": mip_gap, "heuristic_only": heuristic_only}
+    base_p = model.params(); base = base if base is not None else model.solve(base_p, **opts)
+    if base.status != 0: return [{"change": delta_label(d), "feasible": False, "delta_cash_yield": None} for d in deltas]
+    base_pf = _portfolio(model, base.x, base_p["vacancy_haircut"])
+    if len(deltas) == 1 or WHAT_IF_WORKERS <= 1: return [_what_if_row(model, base_p, base, base_pf, d, opts) for d in deltas]
+    with _MODELS_LOCK:
+        if _POOL is None: _POOL = ThreadPoolExecutor(max_workers=WHAT_IF_WORKERS, thread_name_prefix="what-if")
+    return list(_POOL.map(lambda d: _what_if_row(model, base_p, base, base_pf, d, opts), deltas))
+# --- MILP path: max_assets / whole-deal allocations ---
+def mip_arrays(model: DealModel, p: dict):
+    """
+    Whole deals: x binary, with a count row when max_assets is set. Fractional shares with max_assets: [x, y] with
+    x <= y, sum(y) <= max_assets and y binary (must_buy forces y = 1). Returns c, A, b_u, integrality, lb, ub.
+    """
+    n, K = len(model.deals), model.req.max_assets; c, A, b = model.objective(p["vacancy_haircut"]), model.A_ub, model.rhs(p)
+    if not model.req.allow_fractional_allocations:
+        if K is not None: A, b = sp.vstack([A, sp.csr_matrix(np.ones((1, n)))], format="csr"), np.append(b, K)
+        return c, A, b, np.ones(n), model.lb, np.ones(n)
+    I = sp.identity(n, format="csr"); A = sp.bmat([[A, None], [I, -I], [None, sp.csr_matrix(np.ones((1, n)))]], format="csr")
+    return np.concatenate([c, np.zeros(n)]), A, np.concatenate([b, np.zeros(n), [K]]), np.concatenate([np.zeros(n), np.ones(n)]), np.concatenate([model.lb, model.lb]), np.ones(2 * n)
+def lp_rounding(model: DealModel, p: dict, relax):
+    """
+    Fast first answer from the LP relaxation. Whole deals: must_buy first, then greedy by relaxed share (ties by NOI
+    per AED) while every A_ub row and max_assets still hold. Fractional: keep the top max_assets relaxed deals and
+    re-solve the LP on them. Returns x or None.
+    """
+    n, K = len(model.deals), model.req.max_assets or len(model.deals); c = model.objective(p["vacancy_haircut"]); must = model.lb > 0
+    order = [i for i in np.lexsort((c / model.ask, -relax.x, ~must)) if must[i] or relax.x[i] > 1e-9 or c[i] < 0]
+    if model.req.allow_fractional_allocations:
+        keep = order[:max(K, int(must.sum()))]; ub = np.zeros(n); ub[keep] = 1.0; res = model.solve_lp(p, ub)
+        return res.x if res.status == 0 else None
+    A, b = model.A_ub.tocsc(), model.rhs(p) + 1e-6; x = must.astype(float); used = A @ x  # stays sparse: only deal i's nonzero rows are checked
+    if (used > b).any() or must.sum() > K: return None
+    for i in order:
+        if x[i] or x.sum() >= K or c[i] >= 0: continue
+        rows, vals = A.indices[A.indptr[i]:A.indptr[i + 1]], A.data[A.indptr[i]:A.indptr[i + 1]]
+        if (used[rows] + vals <= b[rows]).all(): x[i] = 1.0; used[rows] += vals
+    return x
+def solve_mip(model: DealModel, p: dict, time_limit_s: float, mip_gap: float, heuristic_only: bool = False):
+    """LP relaxation -> rounding heuristic -> HiGHS branch and bound within time_limit_s; keeps the better incumbent. Same shape as a linprog result plus .stats."""
+    t0 = time.perf_counter(); n = len(model.deals); relax = model.solve_relaxation(p)
+    stats = {"method": "lp_rounding" if heuristic_only else "milp", "status": "infeasible", "time_limit_s": time_limit_s, "mip_gap_target": mip_gap, "lp_bound": None,
+             "heuristic_objective": None, "heuristic_time_s": None, "objective": None, "best_bound": None, "gap": None, "nodes": 0, "solve_time_s": None}
+    if relax.status != 0: stats["solve_time_s"] = round(time.perf_counter() - t0, 4); return SimpleNamespace(status=2, x=None, fun=None, stats=stats)
+    c = model.objective(p["vacancy_haircut"]); best = lp_rounding(model, p, relax); stats.update(lp_bound=float(-relax.fun), heuristic_time_s=round(time.perf_counter() - t0, 4))
+    if best is not None: stats.update(heuristic_objective=float(-(c @ best)), objective=float(-(c @ best)), best_bound=float(-relax.fun), status="heuristic")
+    if not heuristic_only:
+        cc, A, bu, integrality, lb, ub = mip_arrays(model, p); stats.update(variables=len(cc), constraints=A.shape[0])
+        res = milp(cc, constraints=LinearConstraint(A, -np.inf, bu), integrality=integrality, bounds=Bounds(lb, ub),
+                   options={"time_limit": max(0.01, time_limit_s - (time.perf_counter() - t0)), "mip_rel_gap": mip_gap, "disp": False})
+        stats["nodes"] = int(getattr(res, "mip_node_count", 0) or 0)
+        if res.x is not None:
+            x = res.x[:n] if model.req.allow_fractional_allocations else np.round(res.x[:n])
+            if best is None or c @ x <= c @ best: best = x; stats.update(objective=float(-(c @ x)), status="optimal" if res.status == 0 else "feasible")
+        if getattr(res, "mip_dual_bound", None) is not None and np.isfinite(res.mip_dual_bound): stats["best_bound"] = float(-res.mip_dual_bound)
+    if best is not None and stats["best_bound"] is not None: stats["gap"] = float(abs(stats["best_bound"] - stats["objective"]) / max(1e-9, abs(stats["objective"])))
+    stats["solve_time_s"] = round(time.perf_counter() - t0, 4)
+    return SimpleNamespace(status=0 if best is not None else 2, x=best, fun=None if best is None else float(c @ best), stats=stats)
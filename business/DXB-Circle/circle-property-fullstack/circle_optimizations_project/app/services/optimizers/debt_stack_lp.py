@@ -1,30 +1,42 @@
-import numpy as np
+import numpy as np, scipy.sparse as sp
 from scipy.optimize import linprog
-from .common import now_stamp, binding_constraints, shadow_prices
+from .common import canonical_hash, artifact_url, binding_constraints, shadow_prices, lp_slacks_duals
+from .debt_stack_stochastic import solve_debt_stack_stochastic
+INFEASIBLE = {"error":"Model infeasible","fix_suggestions":[{"change":"Lower min DSCR","impact":"+ feasibility"},{"change":"Increase equity","impact":"+ feasibility"},{"change":"Relax tranche caps","impact":"+ feasibility"}]}
 def solve_debt_stack_lp(req) -> dict:
-    tr = req.tranches; K = len(tr)
-    def eff_rate(t): 
-        if t.rate_type == "fixed": return float(getattr(t, "rate", 0.0))
-        base = 0.0
-        for sc in (req.rate_scenarios or []): base += sc.weight * sc.sofr
-        return float(base + (t.spread or 0.0))
+    # rate scenarios, Monte Carlo SOFR, a hedge menu or amortizing debt service -> scenario engine (DSCR in every scenario/year, hedges, io_months)
+    if req.rate_scenarios or req.monte_carlo is not None or req.hedge_menu or req.debt_service == "amortizing": return solve_debt_stack_stochastic(req)
+    return solve_debt_stack_deterministic(req)
+def solve_debt_stack_deterministic(req) -> dict:
+    """
+    Single-rate stack: floating tranches at the weighted rate_scenarios SOFR + spread (capped at cap_rate), interest-only
+    debt service. Same funding, LTV and DSCR rows as the scenario engine, so one flat scenario gives the same answer there.
+    """
+    tr = req.tranches; K = len(tr); named = req.rate_scenarios or []; w = sum(sc.weight for sc in named)
+    sofr = sum(sc.weight * sc.sofr for sc in named) / w if w > 0 else (sum(sc.sofr for sc in named) / len(named) if named else 0.0)
+    def eff_rate(t):
+        if t.rate_type == "fixed": return float(t.rate or 0.0)
+        r = sofr + float(t.spread or 0.0)
+        return min(r, float(t.cap_rate)) if t.cap_rate is not None else r
     r = np.array([eff_rate(t) for t in tr], dtype=float)
     P = float(req.purchase_price); Ecap = float(req.equity_cap); max_ltv = float(req.targets.max_ltv); min_dscr = float(req.targets.min_dscr); min_fixed_share = float(req.targets.min_fixed_share or 0.0)
-    NOI_min = min(list(map(float, req.noi_schedule.get("noi", [])))) if req.noi_schedule.get("noi", []) else 0.0
+    noi = [v for v in map(float, req.noi_schedule.get("noi", [])) if v > 0]; NOI_min = min(noi) if noi else 0.0  # years without NOI carry no DSCR covenant
     c = r.copy(); A, b, names = [], [], []
-    debt_cap = min(max_ltv * P, max(P - Ecap, 0.0)); A.append(np.ones(K)); b.append(debt_cap); names.append("Debt cap (min of LTV & Equity)")
-    if min_dscr > 0 and NOI_min > 0: A.append(r); b.append(NOI_min / min_dscr); names.append(f"Min DSCR {min_dscr}")
-    for k, t in enumerate(tr): row = np.zeros(K); row[k]=1.0; A.append(row); b.append(t.max_share * P); names.append(f"{t.name} share cap {int(t.max_share*100)}%")
+    A.append(-np.ones(K)); b.append(-max(P - Ecap, 0.0)); names.append("Funding gap (price - equity cap)")
+    A.append(np.ones(K)); b.append(max_ltv * P); names.append(f"Max LTV {int(max_ltv*100)}%")
     fixed_mask = np.array([1.0 if t.rate_type == "fixed" else 0.0 for t in tr])
     if min_fixed_share > 0: A.append(-(fixed_mask - min_fixed_share * np.ones(K))); b.append(0.0); names.append(f"Min fixed share {int(min_fixed_share*100)}%")
-    res = linprog(c, A_ub=np.vstack(A), b_ub=np.array(b), bounds=[(0.0,None)]*K, method="highs")
-    if res.status != 0: return {"error":"Model infeasible","fix_suggestions":[{"change":"Lower min DSCR","impact":"+ feasibility"},{"change":"Increase equity","impact":"+ feasibility"},{"change":"Relax tranche caps","impact":"+ feasibility"}]}
-    d = res.x; total_debt = float(d.sum()); weighted_cost = float((d * r).sum() / total_debt) if total_debt > 0 else 0.0; min_dscr_real = float((NOI_min / max(1e-9, (d * r).sum()))) if NOI_min > 0 else 0.0
-    slacks, duals = {}, {}
-    if res.ineqlin is not None:
-        for i, nm in enumerate(names): slacks[nm] = float(res.ineqlin.slack[i]); duals[nm] = float(res.ineqlin.marginals[i])
-    tranche_allocs = [{"name": t.name,"amount": float(d[k]),"rate": float(r[k]) if t.rate_type == "fixed" else None,"index": getattr(t, "index", None),"spread": getattr(t, "spread", None),"io_months": int(getattr(t, "io_months", 0))} for k,t in enumerate(tr)]
+    if NOI_min > 0: A.append(r); b.append(NOI_min / min_dscr); names.append(f"Min DSCR {min_dscr}")
+    # tranche share caps are single-variable rows -> upper bounds
+    caps = np.array([t.max_share * P for t in tr], dtype=float)
+    res = linprog(c, A_ub=sp.csr_matrix(np.vstack(A)), b_ub=np.array(b), bounds=np.column_stack([np.zeros(K), caps]), method="highs")
+    if res.status != 0: return dict(INFEASIBLE)
+    d = res.x; total_debt = float(d.sum()); ds = float((d * r).sum()); weighted_cost = ds / total_debt if total_debt > 0 else 0.0
+    min_dscr_real = NOI_min / ds if NOI_min > 0 and ds > 1e-9 else 0.0
+    slacks, duals = lp_slacks_duals(res, names, [(f"{t.name} share cap {int(t.max_share*100)}%", k, caps[k], True) for k, t in enumerate(tr)])
+    tranche_allocs = [{"name": t.name, "amount": float(d[k]), "rate": float(t.rate) if t.rate_type == "fixed" and t.rate is not None else None, "index": getattr(t, "index", None),
+                       "spread": getattr(t, "spread", None), "io_months": int(t.io_months or 0), "effective_rate_base": float(r[k])} for k, t in enumerate(tr)]
     return {"stack_summary":{"ltv": float(total_debt / P) if P > 0 else 0.0,"total_debt": total_debt,"weighted_cost": weighted_cost,"min_dscr": min_dscr_real},
             "tranche_allocations": tranche_allocs,"hedges": [],
             "constraints_report":{"binding": binding_constraints(slacks),"shadow_prices": shadow_prices(duals, unit="AED")},
-            "downloads":{"pdf_term_sheet": now_stamp("debt_stack_term_sheet", "pdf"),"xlsx_amort": now_stamp("debt_amort", "xlsx")}}
+            "downloads":{"pdf_term_sheet": artifact_url("debt_stack_term_sheet", "pdf", key := canonical_hash(req)),"xlsx_amort": artifact_url("debt_amort", "xlsx", key)}}
@@ -0,0 +1,165 @@
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np, scipy.sparse as sp
+from scipy.optimize import linprog
+from .common import canonical_hash, artifact_url, binding_constraints, shadow_prices, lp_slacks_duals
+SCENARIO_WORKERS = int(os.getenv("SCENARIO_WORKERS", str(min(4, os.cpu_count() or 1))))
+PATH_CHUNK = 4096; ROWGEN_BATCH = int(os.getenv("DEBT_ROWGEN_BATCH", "2000"))
+INFEASIBLE = {"error": "Model infeasible", "fix_suggestions": [{"change": "Lower min DSCR", "impact": "+ feasibility"}, {"change": "Increase equity", "impact": "+ feasibility"},
+                                                               {"change": "Relax tranche caps", "impact": "+ feasibility"}, {"change": "Add rate hedges", "impact": "+ feasibility"}]}
+# --- Scenario generation ---
+def sofr_paths(mc, years: int, sofr0: float, workers: int = None):
+    """
+    (n_paths, years) annual SOFR paths from a floored Ornstein-Uhlenbeck walk. Paths are generated in fixed chunks
+    with SeedSequence-spawned streams on a thread pool (NumPy releases the GIL while filling), so the result
+    depends on the seed only, never on the worker count.
+    """
+    n = int(mc.n_paths); r0 = float(sofr0 if mc.sofr0 is None else mc.sofr0); mu = r0 if mc.long_run_mean is None else float(mc.long_run_mean)
+    out = np.empty((n, years)); bounds = [(lo, min(n, lo + PATH_CHUNK)) for lo in range(0, n, PATH_CHUNK)]
+    seqs = np.random.SeedSequence(mc.seed).spawn(len(bounds))
+    def fill(i):
+        lo, hi = bounds[i]; eps = np.random.default_rng(seqs[i]).standard_normal((hi - lo, years)); r = np.full(hi - lo, r0)
+        for t in range(years): r = np.maximum(mc.floor, r + mc.kappa * (mu - r) + mc.sigma * eps[:, t]); out[lo:hi, t] = r
+    workers = workers or SCENARIO_WORKERS
+    if workers <= 1 or len(bounds) == 1:
+        for i in range(len(bounds)): fill(i)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as ex: list(ex.map(fill, range(len(bounds))))
+    return out
+def build_scenarios(req, years: int):
+    """
+    (sofr[S, T], prob[S], stress[S]). Without Monte Carlo the named rate_scenarios are the distribution (flat paths,
+    weights normalised). With Monte Carlo the sampled paths carry equal weight and the named scenarios are appended
+    as zero-weight stress paths that are always enforced.
+    """
+    named = req.rate_scenarios or []; w = np.array([s.weight for s in named], dtype=float)
+    flat = np.array([[s.sofr] * years for s in named], dtype=float).reshape(len(named), years)
+    if len(named) and w.sum() > 0: avg = float((w * flat[:, 0]).sum() / w.sum())
+    else: avg = float(flat[:, 0].mean()) if len(named) else 0.0
+    if req.monte_carlo is None:
+        if not len(named): return np.zeros((1, years)), np.ones(1), np.zeros(1, dtype=bool)
+        prob = w / w.sum() if w.sum() > 0 else np.full(len(named), 1.0 / len(named))
+        return flat, prob, np.zeros(len(named), dtype=bool)
+    paths = sofr_paths(req.monte_carlo, years, avg); n = len(paths)
+    prob = np.concatenate([np.full(n, 1.0 / n), np.zeros(len(named))]); stress = np.concatenate([np.zeros(n, dtype=bool), np.ones(len(named), dtype=bool)])
+    return np.vstack([paths, flat]), prob, stress
+# --- Per-unit coefficients: every array is (vars, S, T) ---
+def _cover(months: float, years: int): return np.clip((months - 12.0 * np.arange(years)) / 12.0, 0.0, 1.0)
+def tranche_coefs(tr, sofr, amort_years: int, debt_service: str = "interest_only"):
+    """
+    Interest cost and debt service per AED drawn; floating = SOFR + spread (capped at cap_rate). debt_service
+    "interest_only" (the deterministic engine's definition): debt service = interest. "amortizing": interest-only for
+    io_months, then a level annuity over amort_years.
+    """
+    S, T = sofr.shape; cost, ds = np.empty((len(tr), S, T)), np.empty((len(tr), S, T))
+    for k, t in enumerate(tr):
+        r = np.full((S, T), float(t.rate or 0.0)) if t.rate_type == "fixed" else sofr + float(t.spread or 0.0)
+        if t.rate_type != "fixed" and t.cap_rate is not None: r = np.minimum(r, float(t.cap_rate))
+        cost[k] = r
+        if debt_service == "interest_only": ds[k] = r; continue
+        n = float(amort_years); mc = np.divide(r, 1.0 - (1.0 + r) ** -n, out=np.full_like(r, 1.0 / n), where=r > 1e-12)
+        io = _cover(float(t.io_months or 0), T); ds[k] = io * r + (1.0 - io) * mc
+    return cost, ds
+def hedge_coefs(menu, sofr):
+    """Net annual cost per AED of notional while the hedge runs: a cap amortises its upfront premium over its tenor and pays max(SOFR - strike, 0); a swap pays fixed - SOFR."""
+    S, T = sofr.shape; used, coef = [], []
+    for h in menu:
+        cover = _cover(float(h.tenor_months), T)
+        if h.type == "cap" and h.strike is not None:
+            premium = (h.premium_rate or 0.0) / (h.tenor_months / 12.0); coef.append(cover * (premium - np.maximum(sofr - h.strike, 0.0)))
+        elif h.type == "swap" and h.fixed_rate is not None: coef.append(cover * (h.fixed_rate - sofr))
+        else: continue
+        used.append(h)
+    return used, np.array(coef).reshape(len(used), S, T)
+def _cvar(values, weights, alpha: float) -> float:
+    """CVaR_alpha (Rockafellar-Uryasev, so an atom straddling alpha counts fractionally): VaR + E[(L - VaR)+] / (1 - alpha)."""
+    w = weights / weights.sum(); order = np.argsort(values)
+    var = values[order][min(len(values) - 1, np.searchsorted(np.cumsum(w[order]), alpha - 1e-12))]
+    return float(var + w @ np.maximum(values - var, 0.0) / (1.0 - alpha))
+# --- Model ---
+def solve_debt_stack_stochastic(req) -> dict:
+    """
+    Tranche amounts d and hedge notionals h minimising expected annual financing cost, with DSCR enforced in every
+    (scenario, year) under worst_case or as CVaR_alpha of the DSCR shortfall (Rockafellar-Uryasev: eta + u_s rows).
+    Funding must cover purchase_price - equity_cap within max LTV; hedge notional is limited to floating debt.
+    Debt service follows req.debt_service, so one flat scenario reproduces solve_debt_stack_deterministic.
+    """
+    t0 = time.perf_counter(); tr = req.tranches; K = len(tr); P = float(req.purchase_price); E = float(req.equity_cap); tg = req.targets
+    noi = np.array(list(map(float, req.noi_schedule.get("noi", []))) or [0.0]); T = len(noi); ds_cap = noi / float(tg.min_dscr)
+    sofr, prob, stress = build_scenarios(req, T); S = len(prob); t_gen = time.perf_counter()
+    cost_t, ds_t = tranche_coefs(tr, sofr, req.amortization_years, req.debt_service); hedges, hcoef = hedge_coefs(req.hedge_menu, sofr); J = len(hedges)
+    cost_v, ds_v = np.concatenate([cost_t, hcoef]), np.concatenate([ds_t, hcoef])  # (K+J, S, T)
+    cvar = req.risk_measure == "cvar"; nx = K + J + (1 + S if cvar else 0)
+    c = np.zeros(nx); c[:K + J] = np.einsum("s,vst->v", prob, cost_v) / T
+    floating = np.array([t.rate_type != "fixed" for t in tr], dtype=float); fixed = 1.0 - floating
+    rows, b, names = [], [], []; live = noi > 0  # years without NOI carry no DSCR covenant
+    def row(coefs, rhs, name, tail=None):
+        r = np.zeros(nx); r[:K + J] = coefs
+        if tail is not None: r[K + J:] = tail
+        rows.append(r); b.append(rhs); names.append(name)
+    row(np.r_[-np.ones(K), np.zeros(J)], -max(P - E, 0.0), "Funding gap (price - equity cap)")
+    row(np.r_[np.ones(K), np.zeros(J)], float(tg.max_ltv) * P, f"Max LTV {int(tg.max_ltv*100)}%")
+    if tg.min_fixed_share > 0: row(np.r_[-(fixed - tg.min_fixed_share), np.zeros(J)], 0.0, f"Min fixed share {int(tg.min_fixed_share*100)}%")
+    if J: row(np.r_[-floating, np.ones(J)], 0.0, "Hedge notional <= floating debt")
+    names_cvar = f"CVaR{int(req.cvar_alpha*100)} DSCR shortfall <= 0"  # eta + sum_s p_s u_s / (1 - alpha) <= 0
+    if cvar and live.any(): row(np.zeros(K + J), 0.0, names_cvar, tail=np.r_[1.0, prob / (1.0 - req.cvar_alpha)])
+    head, b_head = sp.csr_matrix(np.vstack(rows)), np.array(b)
+    # candidate DSCR rows, one per (scenario, live year): DS_st <= NOI_t / min_dscr, or DS_st - eta - u_s <= NOI_t / min_dscr for CVaR scenarios
+    si, ti = np.nonzero(np.ones((S, int(live.sum())), dtype=bool))
+    R = ds_v[:, :, live].transpose(1, 2, 0)[si, ti]; R_cap = ds_cap[live][ti]; soft = cvar & ~stress[si]
+    def dscr_rows(idx):
+        n = len(idx); k = np.nonzero(soft[idx])[0]
+        cols = np.r_[np.zeros(len(k), dtype=int), 1 + si[idx][k]]  # -eta and -u_s, in the columns after the K + J amounts
+        extra = sp.csr_matrix((-np.ones(2 * len(k)), (np.r_[k, k], cols)), shape=(n, nx - K - J))
+        return sp.hstack([sp.csr_matrix(R[idx]), extra], format="csr")
+    # row generation: start from the stress paths plus each year's lowest/highest-SOFR path, add the most violated rows until none are left
+    start = stress[si] | np.isin(si, np.unique(np.r_[sofr.argmax(axis=0), sofr.argmin(axis=0)]))
+    active = np.nonzero(start)[0]; tol = 1e-7 * max(1.0, float(R_cap.max()) if len(R_cap) else 1.0); iters = 0
+    caps = np.array([t.max_share * P for t in tr])
+    bnds = [(0.0, caps[k]) for k in range(K)] + [(0.0, None)] * J + ([(None, None)] + [(0.0, None)] * S if cvar else [])
+    t_build = time.perf_counter()
+    while True:
+        iters += 1; A = sp.vstack([head, dscr_rows(active)], format="csr")
+        res = linprog(c, A_ub=A, b_ub=np.r_[b_head, R_cap[active]], bounds=bnds, method="highs")
+        if res.status != 0 or not len(R): break  # the working set is a relaxation, so infeasible here means infeasible overall
+        viol = R @ res.x[:K + J] - R_cap
+        if cvar: viol -= np.where(soft, res.x[K + J] + res.x[K + J + 1 + si], 0.0)
+        viol[active] = -np.inf; new = np.nonzero(viol > tol)[0]
+        if not len(new): break
+        active = np.r_[active, new[np.argsort(-viol[new])[:ROWGEN_BATCH]]]
+    t_solve = time.perf_counter()
+    if res.status != 0: return dict(INFEASIBLE)
+    d, h = res.x[:K], res.x[K:K + J]; total_debt = float(d.sum())
+    # scenario evaluation of the chosen stack
+    x = res.x[:K + J]; DS = np.einsum("v,vst->st", x, ds_v); cost = np.einsum("v,vst->st", x, cost_v).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dscr = np.where(DS[:, live] > 1e-9, noi[live] / DS[:, live], np.inf) if live.any() else np.full((S, 1), np.inf)
+    worst = dscr.min(axis=1); pw = prob if prob.sum() > 0 else np.full(S, 1.0 / S)
+    exp_cost = float(pw @ cost); order = np.argsort(cost); cw = np.cumsum(pw[order]) / pw.sum()
+    slacks, duals = lp_slacks_duals(res, names, [(f"{t.name} share cap {int(t.max_share*100)}%", k, caps[k], True) for k, t in enumerate(tr)])
+    if cvar and live.any():  # eta is free, so report the realised CVaR of the shortfall (AED of debt service over NOI / min DSCR) as the slack
+        short = (DS[:, live] - ds_cap[live]).max(axis=1); slacks[names_cvar] = -_cvar(short[~stress], prob[~stress], req.cvar_alpha)
+    finite = worst[np.isfinite(worst)]; dscr_min = float(finite.min()) if len(finite) else None
+    tranche_allocs = []
+    for k, t in enumerate(tr):
+        rate = float(t.rate) if t.rate_type == "fixed" and t.rate is not None else None
+        tranche_allocs.append({"name": t.name, "amount": float(d[k]), "rate": rate, "index": getattr(t, "index", None), "spread": getattr(t, "spread", None),
+                               "io_months": int(t.io_months or 0), "effective_rate_base": float(pw @ cost_t[k].mean(axis=1))})
+    picks = []
+    for j, hg in enumerate(hedges):
+        if h[j] <= 1e-6: continue
+        premium = float(h[j] * (hg.premium_rate or 0.0)) if hg.type == "cap" else None
+        picks.append({"type": hg.type, "notional": float(h[j]), "strike": hg.strike, "premium": premium, "fixed_rate": hg.fixed_rate, "tenor_months": hg.tenor_months})
+    source = "monte_carlo" if req.monte_carlo else ("rate_scenarios" if req.rate_scenarios else "zero_sofr")
+    scenario_report = {"source": source, "risk_measure": req.risk_measure, "cvar_alpha": req.cvar_alpha if cvar else None, "debt_service": req.debt_service,
+                       "scenarios": S, "stress_scenarios": int(stress.sum()), "years": T, "dscr_worst": dscr_min,
+                       "dscr_p5": float(np.percentile(finite, 5)) if len(finite) else None, "breach_probability": float(pw[worst < float(tg.min_dscr) - 1e-9].sum()),
+                       "expected_annual_cost": exp_cost, "cost_p95": float(cost[order][np.searchsorted(cw, 0.95 - 1e-12)]), "cost_cvar": _cvar(cost, pw, req.cvar_alpha),
+                       "variables": nx, "constraints": A.shape[0], "nonzeros": int(A.nnz), "dscr_rows_total": len(R), "dscr_rows_active": len(active), "row_generation_rounds": iters,
+                       "generation_time_s": round(t_gen - t0, 4), "build_time_s": round(t_build - t_gen, 4), "solve_time_s": round(t_solve - t_build, 4),
+                       "ignored_hedges": [hg.type for hg in req.hedge_menu if hg not in hedges]}
+    summary = {"ltv": total_debt / P, "total_debt": total_debt, "weighted_cost": exp_cost / total_debt if total_debt > 0 else 0.0, "min_dscr": dscr_min or 0.0}
+    key = canonical_hash(req)
+    return {"stack_summary": summary, "tranche_allocations": tranche_allocs, "hedges": picks,
+            "constraints_report": {"binding": binding_constraints(slacks), "shadow_prices": shadow_prices(duals, unit="AED")}, "scenario_report": scenario_report,
+            "downloads": {"pdf_term_sheet": artifact_url("debt_stack_term_sheet", "pdf", key), "xlsx_amort": artifact_url("debt_amort", "xlsx", key)}}
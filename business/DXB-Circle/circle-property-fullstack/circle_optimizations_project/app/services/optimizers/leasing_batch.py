@@ -0,0 +1,64 @@
+import hashlib, json, multiprocessing, os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .leasing_lp import leasing_menu, solve_leasing_lp
+BATCH_WORKERS = int(os.getenv("LEASING_BATCH_WORKERS", str(os.cpu_count() or 1))); BATCH_MIN_PARALLEL = int(os.getenv("LEASING_BATCH_MIN_PARALLEL", "32")); BATCH_CHUNK = int(os.getenv("LEASING_BATCH_CHUNK", "16"))
+_POOL = None; _POOL_LOCK = threading.Lock()
+_MENUS: "OrderedDict[str, dict]" = OrderedDict(); _MENUS_LOCK = threading.Lock(); MENU_CACHE_SIZE = 256  # per-process LRU of menu matrices; the inline path runs on the threadpool
+def _pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None: _POOL = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))  # no fork: the API process has threads (artifact writer, sweeper)
+        return _POOL
+def shutdown():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None: _POOL.shutdown(wait=False, cancel_futures=True); _POOL = None
+def menu_key(req) -> str:
+    """Fingerprint of what leasing_menu() depends on: the package menu and min WAULT."""
+    canon = json.dumps([[p.model_dump() for p in req.packages], float(req.constraints.min_wault_months)], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canon.encode(), digest_size=12).hexdigest()
+def _menu(key: str, req) -> dict:
+    with _MENUS_LOCK:
+        m = _MENUS.get(key)
+        if m is not None: _MENUS.move_to_end(key); return m
+    m = leasing_menu(req.packages, float(req.constraints.min_wault_months))  # built outside the lock; a racing duplicate build is harmless
+    with _MENUS_LOCK:
+        _MENUS[key] = m; _MENUS.move_to_end(key)
+        while len(_MENUS) > MENU_CACHE_SIZE: _MENUS.popitem(last=False)
+    return m
+def _solve_one(index: int, key: str, req, what_if: bool) -> dict:
+    t0 = time.perf_counter(); out = solve_leasing_lp(req, what_if=what_if, menu=_menu(key, req)); dt = time.perf_counter() - t0
+    line = {"index": index, "building_id": getattr(req, "building_id", None) or str(index), "menu_id": key, "solve_time_s": round(dt, 5)}
+    return {**line, "status": "error", "error": out} if "error" in out else {**line, "status": "ok", "result": out}
+def _solve_chunk(key: str, items: list, what_if: bool) -> list:
+    from ...schemas.leasing import LeasingBatchItem
+    return [_solve_one(i, key, LeasingBatchItem(**d), what_if) for i, d in items]
+def iter_leasing_batch(items: list, what_if: bool = False, workers: int = None):
+    """
+    Yield one result line per building as it completes, then a final {"summary": ...} line. Buildings are grouped by
+    menu_key so each menu's matrices are built once per worker; groups are cut into chunks for the process pool
+    (batches under LEASING_BATCH_MIN_PARALLEL run inline).
+    """
+    t0 = time.perf_counter(); groups: "OrderedDict[str, list]" = OrderedDict()
+    for i, req in enumerate(items): groups.setdefault(menu_key(req), []).append((i, req))
+    workers = workers or BATCH_WORKERS; lines = []
+    if workers <= 1 or len(items) < BATCH_MIN_PARALLEL:
+        for key, grp in groups.items():
+            for i, req in grp: line = _solve_one(i, key, req, what_if); lines.append(line); yield line
+    else:
+        pool = _pool(); futs = [pool.submit(_solve_chunk, key, [(i, r.model_dump()) for i, r in grp[k:k + BATCH_CHUNK]], what_if) for key, grp in groups.items() for k in range(0, len(grp), BATCH_CHUNK)]
+        for f in as_completed(futs):
+            for line in f.result(): lines.append(line); yield line
+    yield {"summary": portfolio_summary(items, lines, len(groups), time.perf_counter() - t0, workers if len(items) >= BATCH_MIN_PARALLEL else 1)}
+def portfolio_summary(items: list, lines: list, menus: int, wall: float, workers: int) -> dict:
+    ok = [l for l in lines if l["status"] == "ok"]; times = sorted(l["solve_time_s"] for l in lines)
+    units = sum(int(items[l["index"]].inventory.units_total) for l in ok); placed = sum(sum(m["units"] for m in l["result"]["mix"]) for l in ok)
+    occupied = sum(l["result"]["kpis"]["occupancy"] * int(items[l["index"]].inventory.units_total) for l in ok)
+    wault_num = sum(l["result"]["kpis"]["wault_months"] * sum(m["units"] for m in l["result"]["mix"]) for l in ok)
+    q = lambda p: times[min(len(times) - 1, int(p * len(times)))] if times else None
+    return {"buildings": len(items), "solved": len(ok), "failed": [{"index": l["index"], "building_id": l["building_id"]} for l in lines if l["status"] != "ok"], "distinct_menus": menus,
+            "kpis": {"units_total": units, "occupancy": occupied / units if units else 0.0, "units_placed": placed, "wault_months": wault_num / placed if placed else 0.0,
+                     "expected_12m_ncf": sum(l["result"]["kpis"]["expected_12m_ncf"] for l in ok), "incentive_spend": sum(l["result"]["kpis"]["incentive_spend"] for l in ok)},
+            "timing": {"wall_time_s": round(wall, 4), "workers": workers, "solve_time_total_s": round(sum(times), 4), "solve_time_p50_s": q(0.5), "solve_time_p95_s": q(0.95), "solve_time_max_s": times[-1] if times else None,
+                       "slowest": [{"building_id": l["building_id"], "solve_time_s": l["solve_time_s"]} for l in sorted(lines, key=lambda l: -l["solve_time_s"])[:5]]}}
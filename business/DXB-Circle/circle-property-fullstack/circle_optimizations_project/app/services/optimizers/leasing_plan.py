@@ -0,0 +1,106 @@
+import time
+import numpy as np, scipy.sparse as sp
+from scipy.optimize import linprog
+from .common import canonical_hash, artifact_url, binding_constraints, shadow_prices, lp_slacks_duals
+from .leasing_lp import package_tenor
+INFEASIBLE = {"error":"Model infeasible","fix_suggestions":[{"change":"Increase incentive budget","impact":"+ feasibility"},{"change":"Lower min WAULT months","impact":"+ feasibility"},{"change":"Relax package share caps","impact":"+ feasibility"}]}
+def _building_arrays(bld, H: int) -> dict:
+    pk = bld.packages; L = np.array([package_tenor(p) for p in pk], dtype=float); q = np.array([p.expected_takeup for p in pk], dtype=float)
+    rent, inc = np.array([p.rent for p in pk], dtype=float), np.array([p.inc_cost for p in pk], dtype=float)
+    months_paid = np.minimum(L[:, None], H - np.arange(H)[None, :])  # (P, H): rent months inside the horizon for a lease signed in month t
+    exp = np.zeros(H); e = np.asarray(bld.monthly_expiries[:H], dtype=float); exp[:len(e)] = e
+    return {"P": len(pk), "U": float(bld.inventory.units_total), "vacant": float(bld.inventory.vacant_now), "L": L, "q": q, "rent": rent, "inc": inc, "value": rent[:, None] / 12.0 * months_paid - inc[:, None], "exp": exp}
+def build_plan_lp(req, data: list):
+    """
+    One sparse LP for every building. Per building: offers o[p,t] >= 0, vacancy v[0..H] and a target shortfall s >= 0.
+    Signings are expected_takeup * offers; v[t+1] = v[t] - signings[t] + expiries[t] + roll-offs of leases signed L_p months earlier.
+    Offers are limited to current vacancy; incentive budget, package share caps (on signings) and min WAULT hold per building,
+    and the end-of-horizon occupancy target is soft (penalised shortfall) so one short building does not sink the batch.
+    """
+    H = int(req.horizon_months); rows_eq, rows_ub = [], []; b_eq, b_ub, c, bounds, names, layout = [], [], [], [], [], []
+    n = 0; r_eq = 0; r_ub = 0; penalty = 10.0 * max(float(d["rent"].max()) if d["P"] else 0.0 for d in data) * max(1.0, H / 12.0) + 1.0
+    budget_cols, budget_vals = [], []
+    for bld, d in zip(req.buildings, data):
+        P = d["P"]; o = n + np.arange(P * H).reshape(P, H); v = n + P * H + np.arange(H + 1); s = n + P * H + H + 1; n = s + 1; layout.append((o, v, s))
+        c += list((-(d["q"][:, None] * d["value"])).ravel()) + [0.0] * (H + 1) + [penalty]
+        bounds += [(0.0, None)] * (P * H) + [(d["vacant"], d["vacant"])] + [(0.0, d["U"])] * H + [(0.0, None)]
+        # vacancy balance, one row per month
+        t = np.arange(H); rows_eq += [(r_eq + t, v[t + 1], np.ones(H)), (r_eq + t, v[t], -np.ones(H))]
+        for p in range(P):
+            rows_eq.append((r_eq + t, o[p], np.full(H, d["q"][p])))
+            back = t - int(d["L"][p]); ok = back >= 0
+            if ok.any(): rows_eq.append((r_eq + t[ok], o[p, back[ok]], np.full(int(ok.sum()), -d["q"][p])))
+        b_eq += list(d["exp"]); r_eq += H
+        # offers <= vacancy
+        rows_ub += [(r_ub + np.repeat(t, P), o.T.ravel(), np.ones(P * H)), (r_ub + t, v[:H], -np.ones(H))]; b_ub += [0.0] * H; names += [f"{bld.building_id}: offers <= vacancy m{k+1}" for k in range(H)]; r_ub += H
+        signed_inc = (d["q"] * d["inc"])[:, None].repeat(H, 1)
+        rows_ub.append((np.full(P * H, r_ub), o.ravel(), signed_inc.ravel())); b_ub.append(float(bld.incentive_budget)); names.append(f"{bld.building_id}: incentive budget"); r_ub += 1
+        budget_cols.append(o.ravel()); budget_vals.append(signed_inc.ravel())
+        cap = float(bld.constraints.max_share_per_package) * d["U"]
+        for p, pk in enumerate(bld.packages):
+            rows_ub.append((np.full(H, r_ub), o[p], np.full(H, d["q"][p]))); b_ub.append(cap); names.append(f"{bld.building_id}: max share {pk.name} {int(bld.constraints.max_share_per_package*100)}%"); r_ub += 1
+        wault = (float(bld.constraints.min_wault_months) - d["L"]) * d["q"]
+        rows_ub.append((np.full(P * H, r_ub), o.ravel(), wault.repeat(H))); b_ub.append(0.0); names.append(f"{bld.building_id}: min WAULT {bld.constraints.min_wault_months}m"); r_ub += 1
+        rows_ub += [(np.array([r_ub]), np.array([v[H]]), np.ones(1)), (np.array([r_ub]), np.array([s]), -np.ones(1))]
+        b_ub.append((1.0 - float(bld.occupancy_target)) * d["U"]); names.append(f"{bld.building_id}: occupancy target {int(bld.occupancy_target*100)}%"); r_ub += 1
+    if req.portfolio_incentive_budget is not None:
+        cols = np.concatenate(budget_cols); rows_ub.append((np.full(len(cols), r_ub), cols, np.concatenate(budget_vals))); b_ub.append(float(req.portfolio_incentive_budget)); names.append("Portfolio incentive budget"); r_ub += 1
+    def coo(parts, m):
+        r, cc, vv = (np.concatenate(x) for x in zip(*parts)); return sp.csr_matrix((vv, (r, cc)), shape=(m, n))
+    return np.array(c), coo(rows_ub, r_ub), np.array(b_ub), coo(rows_eq, r_eq), np.array(b_eq), bounds, names, layout
+def simulate_takeup(data: list, offers: list, H: int, n_sims: int, seed: int = 0) -> dict:
+    """
+    Monte Carlo of the offer plan: each month every building offers its planned units (scaled down when the simulated
+    vacancy is short), signings are Binomial(offers, expected_takeup), and leases roll off after their tenor.
+    Vectorised over simulations x buildings x packages; only (building, package) pairs with offers that month are sampled.
+    """
+    B, Pm = len(data), max(d["P"] for d in data); rng = np.random.default_rng(seed)
+    q, L, inc = np.zeros((B, Pm)), np.full((B, Pm), H + 1, dtype=int), np.zeros((B, Pm)); val, plan = np.zeros((B, Pm, H)), np.zeros((B, Pm, H))
+    for b, (d, o) in enumerate(zip(data, offers)): P = d["P"]; q[b, :P], L[b, :P], inc[b, :P], val[b, :P], plan[b, :P] = d["q"], d["L"], d["inc"], d["value"], np.round(o)
+    U, exp = np.array([d["U"] for d in data]), np.stack([d["exp"] for d in data])
+    vac = np.tile(np.array([d["vacant"] for d in data]), (n_sims, 1)); roll = np.zeros((H + 1, n_sims, B)); ncf = np.zeros((n_sims, B)); spend = np.zeros((n_sims, B))
+    for t in range(H):
+        want = plan[:, :, t]; bi, pi = np.nonzero(want > 0)
+        if len(bi):
+            tot = want.sum(axis=1); scale = np.minimum(1.0, np.divide(vac, tot, out=np.ones_like(vac), where=tot > 0))
+            signed = rng.binomial(np.floor(want[bi, pi] * scale[:, bi]).astype(np.int64), q[bi, pi])  # (N, nnz)
+            vac -= _scatter(signed, bi, n_sims, B); ncf += _scatter(signed * val[bi, pi, t], bi, n_sims, B); spend += _scatter(signed * inc[bi, pi], bi, n_sims, B)
+            back = t + L[bi, pi]
+            for k in np.unique(back[back < H]): m = back == k; roll[k] += _scatter(signed[:, m], bi[m], n_sims, B)
+        vac = np.minimum(U, vac + exp[:, t] + roll[t])
+    occ = np.divide(U - vac, U, out=np.zeros_like(vac), where=U > 0); port_occ = (U - vac).sum(axis=1) / max(1.0, U.sum()); port_ncf = ncf.sum(axis=1)
+    pct = lambda a: {"p5": float(np.percentile(a, 5)), "p50": float(np.percentile(a, 50)), "p95": float(np.percentile(a, 95)), "mean": float(a.mean())}
+    return {"simulations": n_sims, "portfolio_occupancy": pct(port_occ), "portfolio_ncf": pct(port_ncf), "portfolio_incentive_spend": pct(spend.sum(axis=1)),
+            "buildings": [{"occupancy": pct(occ[:, b]), "ncf": pct(ncf[:, b])} for b in range(B)], "_occ": occ}
+def _scatter(values, cols, n_sims: int, B: int):
+    """Sum the (N, k) columns of values into (N, B) by building index; cols is sorted (np.nonzero order), so one reduceat."""
+    out = np.zeros((n_sims, B))
+    if len(cols): starts = np.r_[0, np.nonzero(np.diff(cols))[0] + 1]; out[:, cols[starts]] = np.add.reduceat(values, starts, axis=1)
+    return out
+def solve_leasing_plan(req) -> dict:
+    t0 = time.perf_counter(); H = int(req.horizon_months); data = [_building_arrays(b, H) for b in req.buildings]
+    c, A_ub, b_ub, A_eq, b_eq, bounds, names, layout = build_plan_lp(req, data); t_build = time.perf_counter()
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method="highs"); t_solve = time.perf_counter()
+    if res.status != 0: return dict(INFEASIBLE)
+    x = res.x; slacks, duals = lp_slacks_duals(res, names); offers = [x[o] for o, _, _ in layout]
+    sim = simulate_takeup(data, offers, H, int(req.simulations), int(req.seed)) if req.simulations else None; t_sim = time.perf_counter()
+    buildings, tot = [], {"units": 0.0, "occupied_end": 0.0, "ncf": 0.0, "incentive_spend": 0.0, "signings": 0.0, "wault_num": 0.0}
+    for b, (bld, d, (o, v, s)) in enumerate(zip(req.buildings, data, layout)):
+        signed = d["q"][:, None] * x[o]; vac = x[v]; n_signed = float(signed.sum()); ncf = float((signed * d["value"]).sum()); spend = float(signed.sum(axis=1) @ d["inc"])
+        wault = float(signed.sum(axis=1) @ d["L"] / n_signed) if n_signed > 1e-9 else 0.0; occ_end = float((d["U"] - vac[H]) / d["U"]) if d["U"] > 0 else 0.0
+        row = {"building_id": bld.building_id, "schedule": [{"month": t + 1, "offers": {pk.name: float(x[o][p, t]) for p, pk in enumerate(bld.packages) if x[o][p, t] > 1e-9},
+                                                            "expected_signings": float(signed[:, t].sum()), "vacant_end": float(vac[t + 1])} for t in range(H)],
+               "mix": [{"package": pk.name, "units": float(signed[p].sum()), "share": float(signed[p].sum() / n_signed) if n_signed > 1e-9 else 0.0, "wault_contrib": float(d["L"][p])} for p, pk in enumerate(bld.packages) if signed[p].sum() > 1e-9],
+               "kpis": {"wault_months": wault, "expected_ncf": ncf, "incentive_spend": spend, "occupancy_end": occ_end, "occupancy_shortfall_units": float(x[s])}}
+        if sim: row["simulation"] = {**sim["buildings"][b], "p_target_met": float((sim["_occ"][:, b] >= bld.occupancy_target - 1e-9).mean())}
+        buildings.append(row)
+        for k, val in (("units", d["U"]), ("occupied_end", float(d["U"] - vac[H])), ("ncf", ncf), ("incentive_spend", spend), ("signings", n_signed), ("wault_num", wault * n_signed)): tot[k] += val
+    if sim: sim.pop("buildings"); sim.pop("_occ")
+    return {"horizon_months": H, "buildings": buildings,
+            "portfolio_kpis": {"buildings": len(buildings), "units": tot["units"], "occupancy_end": tot["occupied_end"] / tot["units"] if tot["units"] else 0.0, "expected_ncf": tot["ncf"],
+                               "incentive_spend": tot["incentive_spend"], "expected_signings": tot["signings"], "wault_months": tot["wault_num"] / tot["signings"] if tot["signings"] > 1e-9 else 0.0},
+            "simulation": sim,
+            "constraints_report": {"binding": binding_constraints(slacks), "shadow_prices": shadow_prices({k: v for k, v in duals.items() if abs(v) > 1e-12}, unit="AED")},
+            "solve_stats": {"variables": A_ub.shape[1], "constraints": A_ub.shape[0] + A_eq.shape[0], "nonzeros": int(A_ub.nnz + A_eq.nnz), "build_time_s": round(t_build - t0, 4),
+                            "solve_time_s": round(t_solve - t_build, 4), "simulation_time_s": round(t_sim - t_solve, 4)},
+            "downloads": {"xlsx_offer_plan": artifact_url("leasing_offer_plan", "xlsx", canonical_hash(req))}}
@@ -0,0 +1,25 @@
+"""Capex MILP build vs solve time. Run from the project root: python -m benchmarks.capex_build [--solve] [--projects 100 500 1000]"""
+import argparse, random, time
+from ortools.linear_solver import pywraplp
+from app.schemas.capex import CapexRequest
+from app.services.optimizers.capex_milp import build_capex_model, solve_capex_milp
+def make_request(n_projects: int, horizon: int = 60, seed: int = 7) -> CapexRequest:
+    rnd = random.Random(seed); projects = []
+    for j in range(n_projects):
+        e = rnd.randint(1, horizon - 6); l = min(horizon, e + rnd.randint(3, 18)); lo = rnd.uniform(50_000, 200_000)
+        projects.append({"project_id": f"P{j}", "earliest_month": e, "latest_month": l, "min_spend": lo, "max_spend": lo * rnd.uniform(1.2, 2.0), "uplift_rate": rnd.uniform(0.02, 0.12)})
+    return CapexRequest(horizon_months=horizon, monthly_cash_cap=[n_projects * 40_000.0] * horizon, contractor_capacity={"max_parallel_projects": max(2, n_projects // 4)}, projects=projects)
+def main():
+    ap = argparse.ArgumentParser(); ap.add_argument("--projects", type=int, nargs="+", default=[100, 500, 1000]); ap.add_argument("--horizon", type=int, default=60)
+    ap.add_argument("--solve", action="store_true", help="also run CBC (bounded by --time-limit)"); ap.add_argument("--time-limit", type=float, default=30.0); a = ap.parse_args()
+    print(f"{'projects':>8} {'vars':>8} {'rows':>8} {'build_s':>9} {'solve_s':>9} status")
+    for n in a.projects:
+        req = make_request(n, a.horizon)
+        if a.solve:
+            st = solve_capex_milp(req, time_limit_s=a.time_limit)["solve_stats"]
+            print(f"{n:>8} {st['variables']:>8} {st['constraints']:>8} {st['build_time_s']:>9.3f} {st['solve_time_s']:>9.3f} {st['status']}")
+        else:
+            solver = pywraplp.Solver.CreateSolver("CBC"); t0 = time.perf_counter()
+            build_capex_model(solver, req.horizon_months, req.projects, list(req.monthly_cash_cap), req.contractor_capacity.max_parallel_projects)
+            print(f"{n:>8} {solver.NumVariables():>8} {solver.NumConstraints():>8} {time.perf_counter() - t0:>9.3f} {'-':>9} built")
+if __name__ == "__main__": main()
@@ -0,0 +1,24 @@
+"""Deal-picker frontier throughput (points/s and LP solves/s). Run from the project root: python -m benchmarks.deal_frontier [--deals 200 1000] [--points 200] [--workers 1 4]"""
+import argparse, random, time
+import numpy as np
+from app.schemas.deal_picker import DealPickerRequest
+from app.services.optimizers.deal_frontier import deal_frontier, shutdown
+SECTORS, CITIES = ["Office", "Retail", "Residential", "Industrial", "Hospitality"], ["Dubai", "Abu Dhabi", "Sharjah", "Ajman"]
+def make_request(n_deals: int, seed: int = 11) -> DealPickerRequest:
+    rnd = random.Random(seed); deals = []
+    for j in range(n_deals):
+        ask = rnd.uniform(1e6, 2e7); deals.append({"deal_id": f"D{j}", "ask_price": ask, "expected_noi": ask * rnd.uniform(0.05, 0.1), "sector": rnd.choice(SECTORS), "city": rnd.choice(CITIES), "risk_score": rnd.uniform(0.5, 4.5)})
+    budget = sum(d["ask_price"] for d in deals) * 0.2
+    return DealPickerRequest(budget=budget, objective="risk_adjusted", deals=deals, max_alloc_per_sector={s: 0.35 for s in SECTORS}, max_alloc_per_city={c: 0.5 for c in CITIES}, what_if=[])
+def main():
+    ap = argparse.ArgumentParser(); ap.add_argument("--deals", type=int, nargs="+", default=[200, 1000]); ap.add_argument("--points", type=int, default=200)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4]); ap.add_argument("--max-penalty", type=float, default=0.02); a = ap.parse_args()
+    print(f"{'deals':>6} {'param':>12} {'workers':>7} {'points':>6} {'solves':>6} {'distinct':>8} {'wall_s':>8} {'points/s':>9} {'solves/s':>9}")
+    for n in a.deals:
+        req = make_request(n)
+        for param, values in (("risk_penalty", np.linspace(0, a.max_penalty, a.points)), ("budget", np.linspace(req.budget * 0.25, req.budget * 2, a.points))):
+            for w in a.workers:
+                t0 = time.perf_counter(); st = deal_frontier(req, param, values, workers=w)["stats"]; wall = time.perf_counter() - t0
+                print(f"{n:>6} {param:>12} {st['workers']:>7} {st['points']:>6} {st['solves']:>6} {st['distinct_allocations']:>8} {wall:>8.3f} {st['points']/wall:>9.1f} {st['solves']/wall:>9.1f}")
+    shutdown()
+if __name__ == "__main__": main()
@@ -0,0 +1,132 @@
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+client = TestClient(app)
+DEALS = [{"deal_id": "A", "ask_price": 2e6, "expected_noi": 150000, "sector": "Office", "city": "Dubai"}, {"deal_id": "B", "ask_price": 3e6, "expected_noi": 240000, "sector": "Retail", "city": "Dubai"},
+         {"deal_id": "C", "ask_price": 1e6, "expected_noi": 90000, "sector": "Office", "city": "Sharjah"}]
+
+
+def _artifact(url: str, timeout: float = 10.0) -> dict:
+    name = url.rsplit("/", 1)[-1]
+    t0 = time.time()
+    while True:
+        s = client.get(f"/artifacts/{name}").json()
+        if s["status"] in ("ready", "failed") or time.time() - t0 > timeout:
+            return s
+        time.sleep(0.02)
+
+
+def _write(text: str):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            return f.write(text)
+    return write
+
+
+def test_downloads_are_written_in_background_with_status():
+    from openpyxl import load_workbook
+    from app.services.files.paths import BASE
+    out = client.post("/deal-picker/optimize", json={"budget": 4e6, "objective": "cash_yield", "deals": DEALS}).json()
+    xlsx, csv_ = (_artifact(out["downloads"][k]) for k in ("xlsx_plan", "csv_allocations"))
+    assert xlsx["status"] == "ready"
+    assert csv_["status"] == "ready"
+    assert xlsx["bytes"] > 0
+    assert xlsx["url"] == out["downloads"]["xlsx_plan"]
+    ws = load_workbook(BASE / xlsx["name"], read_only=True)["Allocations"]
+    assert [c.value for c in next(ws.iter_rows())][:2] == ["deal_id", "weight"]
+    assert not list(BASE.glob(".*.tmp"))
+    assert client.get("/artifacts/nope.xlsx").status_code == 404
+
+
+def test_atomic_write_leaves_nothing_behind_on_failure(tmp_path):
+    from app.services.files.artifacts import atomic_write
+    target = tmp_path / "a.csv"
+    target.write_text("old")
+
+    def partial(tmp):
+        _write("partial")(tmp)
+        raise ZeroDivisionError
+    with pytest.raises(ZeroDivisionError):
+        atomic_write(str(target), partial)
+    assert target.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["a.csv"]
+    assert atomic_write(str(target), _write("new")) == 3
+    assert target.read_text() == "new"
+
+
+def test_xlsx_sheet_pulls_rows_lazily_after_the_width_sample(tmp_path):
+    from openpyxl import Workbook
+    from app.services.files import xlsx_writer
+    wb, appended, lead = Workbook(write_only=True), [], []
+    create_sheet = wb.create_sheet
+
+    def spying_create_sheet(title):
+        ws = create_sheet(title)
+        append = ws.append
+
+        def spy(row):
+            appended.append(row)
+            append(row)
+        ws.append = spy
+        return ws
+    wb.create_sheet = spying_create_sheet
+
+    def rows():
+        for i in range(xlsx_writer.WIDTH_SAMPLE_ROWS + 50):
+            lead.append(i - max(0, len(appended) - 1))  # rows pulled ahead of the ones written (minus the header)
+            yield [i, "x" * (i % 7)]
+    xlsx_writer._sheet(wb, "S", ["n", "label"], rows())
+    wb.save(tmp_path / "s.xlsx")
+    assert len(appended) == xlsx_writer.WIDTH_SAMPLE_ROWS + 51
+    assert max(lead) <= xlsx_writer.WIDTH_SAMPLE_ROWS
+
+
+def test_output_store_dedupes_caches_and_evicts():
+    from app.services.files.artifacts import ARTIFACTS, ArtifactStore
+    body = {"budget": 3e6, "objective": "cash_yield", "deals": DEALS}
+    first = client.post("/deal-picker/optimize", json=body).json()["downloads"]["xlsx_plan"]
+    assert _artifact(first)["status"] == "ready"
+    before = ARTIFACTS.stats()["deduplicated"]
+    again = client.post("/deal-picker/optimize", json={**body, "deals": [dict(reversed(list(d.items()))) for d in DEALS], "budget": 3000000}).json()["downloads"]["xlsx_plan"]
+    assert again == first
+    assert ARTIFACTS.stats()["deduplicated"] >= before + 1
+    r = client.get(first)
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "public, no-cache"
+    assert client.get(first, headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+    assert ARTIFACTS.status(first)["hits"] >= 2
+    store = ArtifactStore(max_bytes=12, max_files=100, max_age_s=3600)
+    store.shutdown()
+    now = time.time()
+    store._index.clear()
+    for name, status, age in (("old", "ready", 7200), ("lru", "ready", 60), ("busy", "running", 90), ("new", "ready", 1)):
+        store._index[name] = {"name": name, "status": status, "bytes": 6, "last_access": now - age}
+    assert store.sweep(now)["evicted"] == 2
+    assert list(store._index) == ["busy", "new"]
+
+
+def test_atomic_write_makes_files_world_readable(tmp_path):
+    from app.services.files.artifacts import atomic_write
+    target = tmp_path / "a.csv"
+    atomic_write(str(target), _write("new"))
+    assert target.stat().st_mode & 0o777 == 0o644
+
+
+def test_output_etag_hashes_the_file_content():
+    from app.services.files.artifacts import content_etag
+    from app.services.files.paths import BASE
+    url = client.post("/deal-picker/optimize", json={"budget": 2.2e6, "objective": "cash_yield", "deals": DEALS}).json()["downloads"]["csv_allocations"]
+    assert _artifact(url)["status"] == "ready"
+    assert client.get(url).headers["etag"] == content_etag(str(BASE / os.path.basename(url)))
+
+
+def test_reindex_infers_kind_from_the_file_name(tmp_path, monkeypatch):
+    from app.services.files import artifacts
+    (tmp_path / f"debt_amort_{'0' * 32}.xlsx").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    monkeypatch.setattr(artifacts, "ensure_base", lambda: tmp_path)
+    store = artifacts.ArtifactStore()
+    store.shutdown()
+    assert {n: e["kind"] for n, e in store._index.items()} == {f"debt_amort_{'0' * 32}.xlsx": "debt_stack", "notes.txt": None}
@@ -0,0 +1,38 @@
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.jobs import JobQueue, SQLiteJobStore
+client = TestClient(app)
+PLAN = {"horizon_months": 6, "monthly_cash_cap": [100.0]*6, "contractor_capacity": {"max_parallel_projects": 2},
+        "projects": [{"project_id": "P1", "earliest_month": 1, "latest_month": 4, "min_spend": 50, "max_spend": 150, "uplift_rate": 0.1},
+                     {"project_id": "P2", "earliest_month": 2, "latest_month": 6, "min_spend": 80, "max_spend": 200, "uplift_rate": 0.2}]}
+def _wait(job_id, timeout=20):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        job = client.get(f"/capex-phasing/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed", "cancelled"): return job
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+def test_capex_job_submit_poll_result():
+    r = client.post("/capex-phasing/jobs?time_limit_s=10", json=PLAN); assert r.status_code == 202
+    job = _wait(r.json()["job_id"]); assert job["status"] == "done" and job["progress"]["phase"] == "extracting"
+    res = client.get(f"/capex-phasing/jobs/{job['job_id']}/result").json()
+    assert res == client.post("/capex-phasing/optimize", json=PLAN).json() | {"downloads": res["downloads"], "solve_stats": res["solve_stats"]}
+    assert res["solve_stats"]["status"] == "optimal" and res["solve_stats"]["gap"] <= 1e-6
+def test_infeasible_job_result_is_422():
+    bad = PLAN | {"monthly_cash_cap": [1.0]*6}
+    job = _wait(client.post("/capex-phasing/jobs", json=bad).json()["job_id"]); assert job["status"] == "failed"
+    assert client.get(f"/capex-phasing/jobs/{job['job_id']}/result").status_code == 422
+def test_queue_bounds_cancel_and_sqlite(tmp_path):
+    def slow(payload, progress, **kw):
+        for _ in range(200): progress(phase="solving"); time.sleep(0.01)
+        return {"ok": True}
+    q = JobQueue(slow, store=SQLiteJobStore(str(tmp_path / "jobs.db")), max_workers=1, max_queue=1)
+    a, b = q.submit({}), q.submit({})
+    try: q.submit({}); assert False, "expected QueueFull"
+    except Exception as e: assert type(e).__name__ == "QueueFull"
+    assert q.cancel(b["job_id"])["status"] == "cancelled"
+    time.sleep(0.1); assert q.cancel(a["job_id"])["status"] == "cancelling"
+    q.shutdown(); time.sleep(0.1)
+    assert q.get(a["job_id"])["status"] == "cancelled"
+    assert SQLiteJobStore(str(tmp_path / "jobs.db")).get(a["job_id"])["status"] == "cancelled"
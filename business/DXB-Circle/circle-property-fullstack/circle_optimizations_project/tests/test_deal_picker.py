@@ -0,0 +1,105 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.optimizers.common import group_cap_rows
+client = TestClient(app)
+DEALS = [{"deal_id": "A", "ask_price": 2e6, "expected_noi": 150000, "sector": "Office", "city": "Dubai"}, {"deal_id": "B", "ask_price": 3e6, "expected_noi": 240000, "sector": "Retail", "city": "Dubai"},
+         {"deal_id": "C", "ask_price": 1e6, "expected_noi": 90000, "sector": "Office", "city": "Sharjah"}]
+
+
+def test_group_cap_rows_skips_absent_labels():
+    M, keys = group_cap_rows(["a", "b", "a"], {"a": 0.5, "zz": 0.1}, np.array([1.0, 2.0, 3.0]))
+    assert keys == ["a"]
+    assert M.toarray().tolist() == [[1.0, 0.0, 3.0]]
+
+
+def test_deal_picker_respects_sparse_caps():
+    r = client.post("/deal-picker/optimize", json={"budget": 4e6, "objective": "cash_yield", "deals": DEALS, "max_alloc_per_sector": {"Retail": 0.25}})
+    assert r.status_code == 200
+    out = r.json()
+    retail = sum(a["capital"] for a in out["asset_allocations"] if a["deal_id"] == "B")
+    assert retail <= 1e6 + 1e-6
+    assert abs(out["portfolio_summary"]["capital_used"] - 4e6) < 1e-3
+    assert any(b["name"].startswith("Max Retail") for b in out["constraints_report"]["binding"])
+
+
+def test_deal_picker_what_if_resolves_and_estimates():
+    body = {"budget": 4e6, "objective": "cash_yield", "deals": DEALS, "max_alloc_per_sector": {"Retail": 0.25},
+            "what_if": [{"budget_delta": 1e6}, {"sector_caps": {"Retail": 0.5}}, {"vacancy_haircut": 0.1}]}
+    out = client.post("/deal-picker/optimize", json=body).json()
+    rows = out["what_if"]
+    assert [r["feasible"] for r in rows] == [True, True, True]
+    assert rows[0]["change"] == "budget +1,000,000 AED"
+    assert rows[1]["estimated_delta_objective"] >= rows[1]["delta_objective"] > 0  # value is concave in b_ub: duals overstate large relaxations
+    assert abs(rows[2]["estimated_delta_objective"] - rows[2]["delta_objective"]) < 1e-6 * abs(rows[2]["delta_objective"])
+    again = client.post("/deal-picker/what-if", json={"model_id": out["model_id"], "deltas": body["what_if"]}).json()
+    assert [r["objective"] for r in again["what_if"]] == [r["objective"] for r in rows]
+    assert client.post("/deal-picker/what-if", json={"model_id": "missing", "deltas": [{"budget_delta": 1.0}]}).status_code == 404
+
+
+def test_deal_picker_frontier_reuses_allocations_exactly():
+    from scipy.optimize import linprog
+    from app.services.optimizers.deal_picker_lp import DealModel
+    from app.schemas.deal_picker import DealPickerRequest
+    deals = [{**d, "risk_score": r} for d, r in zip(DEALS, (1.0, 4.0, 2.5))]
+    body = {"budget": 4e6, "objective": "risk_adjusted", "deals": deals, "sweep": {"start": 0.0, "stop": 0.05, "points": 41}}
+    out = client.post("/deal-picker/frontier", json=body).json()
+    pts = out["points"]
+    assert len(pts) == 41
+    assert out["stats"]["reused"] > 0
+    assert set(p["allocation_id"] for p in pts) == set(out["allocations"])
+    for p in pts:
+        m = DealModel(DealPickerRequest(**{**body, "risk_penalty_per_point": p["value"]}))
+        cold = -linprog(m.objective(0.0), A_ub=m.A_ub, b_ub=m.rhs(m.params()), bounds=(0, 1), method="highs").fun
+        assert abs(cold - p["objective"]) < 1e-3
+    budget = client.post("/deal-picker/frontier", json={**body, "sweep": {"parameter": "budget", "values": [1e6, 2e6, 4e6]}}).json()
+    assert [round(p["capital_used"]) for p in budget["points"]] == [1000000, 2000000, 4000000]
+
+
+def test_deal_frontier_pool_spawns_workers():
+    from app.services.optimizers import deal_frontier
+    try:
+        assert deal_frontier._pool()._mp_context.get_start_method() == "spawn"
+    finally:
+        deal_frontier.shutdown()
+
+
+def test_deal_picker_milp_honours_must_buy_max_assets_and_whole_deals():
+    body = {"budget": 4e6, "objective": "cash_yield", "deals": [{**DEALS[0], "must_buy": True}, *DEALS[1:]], "allow_fractional_allocations": False, "max_assets": 2, "what_if": []}
+    out = client.post("/deal-picker/optimize?time_limit_s=5", json=body).json()
+    assert {a["deal_id"]: a["capital"] for a in out["asset_allocations"]} == {"A": 2e6, "C": 1e6}
+    assert out["solve_stats"]["status"] == "optimal"
+    assert out["solve_stats"]["gap"] < 1e-6
+    fast = client.post("/deal-picker/optimize?heuristic=true", json=body).json()["solve_stats"]
+    assert fast["method"] == "lp_rounding"
+    assert fast["objective"] <= out["solve_stats"]["objective"] + 1e-6
+    assert fast["nodes"] == 0
+    frac = client.post("/deal-picker/optimize", json={**body, "allow_fractional_allocations": True, "max_assets": 1}).json()
+    assert [a["deal_id"] for a in frac["asset_allocations"]] == ["A"]
+
+
+def _spy_solve_mip(monkeypatch) -> list:
+    from app.services.optimizers import deal_picker_lp
+    calls, solve_mip = [], deal_picker_lp.solve_mip
+
+    def spy(model, p, time_limit_s, mip_gap, heuristic_only=False):
+        calls.append((time_limit_s, mip_gap, heuristic_only))
+        return solve_mip(model, p, time_limit_s, mip_gap, heuristic_only)
+    monkeypatch.setattr(deal_picker_lp, "solve_mip", spy)
+    return calls
+
+
+def test_deal_picker_what_if_forwards_solve_options(monkeypatch):
+    calls = _spy_solve_mip(monkeypatch)
+    body = {"budget": 4e6, "objective": "cash_yield", "deals": DEALS, "allow_fractional_allocations": False, "max_assets": 2,
+            "what_if": [{"budget_delta": 1e6}, {"sector_caps": {"Retail": 0.5}}]}
+    client.post("/deal-picker/optimize?time_limit_s=7&mip_gap=0.01&heuristic=true&refresh=true", json=body)
+    assert calls == [(7.0, 0.01, True)] * 3  # base solve + one re-solve per delta
+
+
+def test_deal_picker_what_if_endpoint_forwards_solve_options(monkeypatch):
+    body = {"budget": 4e6, "objective": "cash_yield", "deals": DEALS, "allow_fractional_allocations": False, "max_assets": 2, "what_if": []}
+    model_id = client.post("/deal-picker/optimize?refresh=true", json=body).json()["model_id"]
+    calls = _spy_solve_mip(monkeypatch)
+    client.post("/deal-picker/what-if?time_limit_s=7&mip_gap=0.01&heuristic=true", json={"model_id": model_id, "deltas": [{"budget_delta": 1e6}]})
+    assert calls == [(7.0, 0.01, True)] * 2
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.schemas.debt_stack import DebtStackRequest, MonteCarloSofr
+from app.services.optimizers.debt_stack_lp import solve_debt_stack_deterministic
+from app.services.optimizers.debt_stack_stochastic import solve_debt_stack_stochastic, sofr_paths
+client = TestClient(app)
+DEBT = {"purchase_price": 25e6, "equity_cap": 9.5e6, "noi_schedule": {"noi": [1.5e6, 1.55e6, 1.6e6, 1.65e6, 1.7e6]}, "targets": {"max_ltv": 0.75, "min_dscr": 1.25},
+        "tranches": [{"name": "Senior", "rate_type": "fixed", "rate": 0.062, "max_share": 0.4, "io_months": 12}, {"name": "Floating", "rate_type": "floating", "spread": 0.015, "max_share": 0.6, "io_months": 24}],
+        "hedge_menu": [{"type": "cap", "tenor_months": 36, "strike": 0.055, "premium_rate": 0.012}, {"type": "swap", "tenor_months": 60, "fixed_rate": 0.047}],
+        "rate_scenarios": [{"name": "base", "sofr": 0.043, "weight": 0.7}, {"name": "low", "sofr": 0.03, "weight": 0.3}], "monte_carlo": {"n_paths": 3000, "sigma": 0.006, "seed": 1}, "debt_service": "amortizing"}
+DEBT_FLAT = {"purchase_price": 25e6, "equity_cap": 9.5e6, "noi_schedule": {"noi": [1.5e6, 1.55e6, 0.0, 1.65e6]}, "targets": {"max_ltv": 0.75, "min_dscr": 1.25, "min_fixed_share": 0.3},
+             "tranches": [{"name": "Senior", "rate_type": "fixed", "rate": 0.062, "max_share": 0.5}, {"name": "Floating", "rate_type": "floating", "spread": 0.015, "cap_rate": 0.06, "max_share": 0.6},
+                          {"name": "Mezz", "rate_type": "fixed", "rate": 0.09, "max_share": 0.2}],
+             "rate_scenarios": [{"name": "base", "sofr": 0.043, "weight": 0.7}]}
+
+
+def test_debt_stack_scenarios_hedge_to_hold_dscr_everywhere():
+    worst = client.post("/debt-stack/optimize", json=DEBT).json()
+    sr = worst["scenario_report"]
+    assert sr["scenarios"] == 3002
+    assert sr["stress_scenarios"] == 2
+    assert sr["dscr_worst"] >= 1.25 - 1e-6
+    assert sr["breach_probability"] == 0.0
+    assert worst["hedges"]
+    assert abs(worst["stack_summary"]["total_debt"] - 15.5e6) < 1e-3
+    cvar = client.post("/debt-stack/optimize", json={**DEBT, "risk_measure": "cvar", "cvar_alpha": 0.9}).json()
+    assert cvar["scenario_report"]["expected_annual_cost"] <= sr["expected_annual_cost"] + 1e-6
+    assert next(b for b in cvar["constraints_report"]["binding"] if b["name"].startswith("CVaR90"))["slack"] <= 1e-6
+
+
+def test_debt_stack_flat_scenario_matches_deterministic():
+    req = DebtStackRequest(**DEBT_FLAT)
+    det, sto = solve_debt_stack_deterministic(req), solve_debt_stack_stochastic(req)
+    assert np.allclose([t["amount"] for t in sto["tranche_allocations"]], [t["amount"] for t in det["tranche_allocations"]], atol=1e-3)
+    assert [t["effective_rate_base"] for t in sto["tranche_allocations"]] == pytest.approx([t["effective_rate_base"] for t in det["tranche_allocations"]])
+    assert sto["stack_summary"] == pytest.approx(det["stack_summary"], rel=1e-9)
+
+
+def test_debt_stack_amortizing_debt_service_is_opt_in():
+    body = {**DEBT_FLAT, "targets": {**DEBT_FLAT["targets"], "min_dscr": 1.0}}
+    io = solve_debt_stack_stochastic(DebtStackRequest(**body))
+    amort = solve_debt_stack_stochastic(DebtStackRequest(**{**body, "debt_service": "amortizing"}))
+    assert amort["stack_summary"]["min_dscr"] < io["stack_summary"]["min_dscr"]
+
+
+def test_sofr_paths_depend_on_seed_not_workers():
+    mc = MonteCarloSofr(n_paths=9000, seed=5)
+    a, b = sofr_paths(mc, 4, 0.04, workers=1), sofr_paths(mc, 4, 0.04, workers=3)
+    assert a.shape == (9000, 4)
+    assert np.array_equal(a, b)
+    assert (a >= 0).all()
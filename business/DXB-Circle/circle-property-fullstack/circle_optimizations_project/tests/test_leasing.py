@@ -0,0 +1,87 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+client = TestClient(app)
+PACKAGES = [{"name": "Standard", "rent": 80000, "inc_cost": 5000, "expected_takeup": 0.3, "tenor_months": 12}, {"name": "Premium", "rent": 85000, "inc_cost": 10000, "expected_takeup": 0.2, "tenor_months": 36}]
+BUILDING = {"building_id": "B1", "inventory": {"units_total": 200, "vacant_now": 40}, "occupancy_target": 0.9, "incentive_budget": 250000, "packages": PACKAGES, "constraints": {"max_share_per_package": 0.6, "min_wault_months": 18}}
+
+
+def test_leasing_plan_batches_buildings_and_simulates_takeup():
+    body = {"horizon_months": 12, "buildings": [BUILDING, {**BUILDING, "building_id": "B2", "monthly_expiries": [3] * 12}], "simulations": 3000, "seed": 1}
+    out = client.post("/leasing-mix/plan", json=body).json()
+    b1 = out["buildings"][0]
+    assert len(out["buildings"]) == 2
+    assert len(b1["schedule"]) == 12
+    assert b1["kpis"]["wault_months"] >= 18 - 1e-6
+    assert b1["kpis"]["occupancy_end"] >= 0.9 - 1e-6
+    assert b1["kpis"]["occupancy_shortfall_units"] < 1e-6
+    sim = b1["simulation"]
+    assert sim["occupancy"]["p5"] <= sim["occupancy"]["p50"] <= sim["occupancy"]["p95"]
+    assert 0 <= sim["p_target_met"] <= 1
+    assert abs(sim["occupancy"]["mean"] - b1["kpis"]["occupancy_end"]) < 0.05
+    assert out["simulation"]["simulations"] == 3000
+
+
+def test_leasing_tenor_field_and_real_what_if():
+    body = {"inventory": BUILDING["inventory"], "occupancy_target": 0.9, "incentive_budget": 200000, "packages": PACKAGES, "constraints": BUILDING["constraints"]}
+    out = client.post("/leasing-mix/optimize", json=body).json()
+    assert {m["package"]: m["wault_contrib"] for m in out["mix"]}.items() <= {"Standard": 12.0, "Premium": 36.0}.items()
+    assert out["what_if"][0]["change"] == "+20,000 incentives"
+    assert out["what_if"][0]["delta_expected_12m_ncf"].startswith(("+", "-"))
+
+
+def test_leasing_batch_streams_buildings_and_portfolio_summary():
+    one = {k: BUILDING[k] for k in ("inventory", "occupancy_target", "incentive_budget", "packages", "constraints")}
+    items = [{**one, "building_id": "A"}, {**one, "building_id": "B", "packages": PACKAGES[:1], "constraints": {"max_share_per_package": 1.0, "min_wault_months": 12}}, {**one, "building_id": "C", "incentive_budget": 0}]
+    r = client.post("/leasing-mix/batch", json={"items": items})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    summary = lines.pop()["summary"]
+    by_id = {line["building_id"]: line for line in lines}
+    single = client.post("/leasing-mix/optimize", json=one).json()
+    assert by_id["A"]["result"]["kpis"] == single["kpis"]
+    assert by_id["C"]["status"] == "error"
+    assert by_id["A"]["menu_id"] != by_id["B"]["menu_id"]
+    assert summary["solved"] == 2
+    assert summary["failed"] == [{"index": 2, "building_id": "C"}]
+    assert summary["distinct_menus"] == 2
+    parts = by_id["A"]["result"]["kpis"]["expected_12m_ncf"] + by_id["B"]["result"]["kpis"]["expected_12m_ncf"]
+    assert abs(summary["kpis"]["expected_12m_ncf"] - parts) < 1e-6
+    body = client.post("/leasing-mix/batch?stream=false", json={"items": items}).json()
+    assert [line["index"] for line in body["results"]] == [0, 1, 2]
+
+
+def test_leasing_batch_process_pool_matches_inline():
+    from app.schemas.leasing import LeasingBatchItem
+    from app.services.optimizers.leasing_batch import iter_leasing_batch
+    one = {k: BUILDING[k] for k in ("inventory", "occupancy_target", "incentive_budget", "packages", "constraints")}
+    items = [LeasingBatchItem(**{**one, "building_id": f"B{i}", "incentive_budget": 150000 + 1000 * i}) for i in range(40)]
+    inline = {line["building_id"]: line["result"]["kpis"] for line in iter_leasing_batch(items, workers=1) if "summary" not in line}
+    pooled = list(iter_leasing_batch(items, workers=2))
+    summary = pooled.pop()["summary"]
+    assert {line["building_id"]: line["result"]["kpis"] for line in pooled} == inline
+    assert summary["timing"]["workers"] == 2
+    assert summary["solved"] == 40
+
+
+def test_leasing_batch_pool_spawns_workers():
+    from app.services.optimizers import leasing_batch
+    try:
+        assert leasing_batch._pool()._mp_context.get_start_method() == "spawn"
+    finally:
+        leasing_batch.shutdown()
+
+
+def test_leasing_menu_cache_evicts_least_recently_used(monkeypatch):
+    from app.schemas.leasing import LeasingBatchItem
+    from app.services.optimizers import leasing_batch
+    monkeypatch.setattr(leasing_batch, "_MENUS", leasing_batch.OrderedDict())
+    monkeypatch.setattr(leasing_batch, "MENU_CACHE_SIZE", 2)
+    one = {k: BUILDING[k] for k in ("inventory", "occupancy_target", "incentive_budget", "packages", "constraints")}
+    reqs = {w: LeasingBatchItem(**{**one, "constraints": {**one["constraints"], "min_wault_months": w}}) for w in (12, 18, 24)}
+    keys = {w: leasing_batch.menu_key(r) for w, r in reqs.items()}
+    first = leasing_batch._menu(keys[12], reqs[12])
+    leasing_batch._menu(keys[18], reqs[18])
+    assert leasing_batch._menu(keys[12], reqs[12]) is first
+    leasing_batch._menu(keys[24], reqs[24])
+    assert list(leasing_batch._MENUS) == [keys[12], keys[24]]
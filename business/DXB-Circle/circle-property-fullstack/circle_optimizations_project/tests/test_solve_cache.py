@@ -0,0 +1,54 @@
+import threading
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.optimizers.common import SolveCache
+client = TestClient(app)
+DEALS = [{"deal_id": "A", "ask_price": 2e6, "expected_noi": 150000, "sector": "Office", "city": "Dubai"}, {"deal_id": "B", "ask_price": 3e6, "expected_noi": 240000, "sector": "Retail", "city": "Dubai"},
+         {"deal_id": "C", "ask_price": 1e6, "expected_noi": 90000, "sector": "Office", "city": "Sharjah"}]
+
+
+def test_solve_cache_headers_and_per_router_stats():
+    body = {"budget": 2.5e6, "objective": "cash_yield", "deals": DEALS}
+    before = client.get("/deal-picker/cache").json()
+    a = client.post("/deal-picker/optimize", json=body)
+    b = client.post("/deal-picker/optimize", json={**body, "deals": [dict(reversed(list(d.items()))) for d in DEALS]})
+    c = client.post("/deal-picker/optimize?refresh=true", json=body)
+    assert [r.headers["x-cache"] for r in (a, b, c)] == ["MISS", "HIT", "MISS"]
+    assert a.headers["etag"] == b.headers["etag"]
+    assert a.json() == b.json()
+    after = client.get("/deal-picker/cache").json()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 2
+    assert client.get("/debt-stack/cache").json()["namespace"] == "debt_stack"
+
+
+def test_solve_cache_sqlite_tier_survives_restart_and_skips_errors(tmp_path):
+    db = str(tmp_path / "solves.db")
+    calls = []
+
+    def fn(v):
+        def run():
+            calls.append(v)
+            time.sleep(0.05)
+            return {"v": v} if v >= 0 else {"error": "Model infeasible"}
+        return run
+    out, h = SolveCache(size=4, db_path=db).solve("ns", {"x": 1}, fn(1))
+    assert out == {"v": 1}
+    assert h["X-Cache"] == "MISS"
+    second = SolveCache(size=4, db_path=db)
+    out, h = second.solve("ns", {"x": 1}, fn(2))
+    assert out == {"v": 1}
+    assert h["X-Cache"] == "HIT"
+    assert second.stats("ns")["disk_hits"] == 1
+    second.solve("ns", {"x": -1}, fn(-1))
+    second.solve("ns", {"x": -1}, fn(-1))
+    assert calls == [1, -1, -1]
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(second.solve("ns", {"x": 3}, fn(3))[1]["X-Cache"])) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls.count(3) == 1
+    assert sorted(results) == ["HIT", "HIT", "HIT", "MISS"]
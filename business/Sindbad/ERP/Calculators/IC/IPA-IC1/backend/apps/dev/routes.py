@@ -1,14 +1,15 @@
 import os
 import traceback
 
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import JSONResponse
+
 from backend.core.calculations.equilibrium import (
     equilibrium_error_for_principal,
     solve_equilibrium_f_bisect,
     solve_equilibrium_principal,
 )
 from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
-from fastapi import APIRouter, Body, HTTPException
-from fastapi.responses import JSONResponse
 
 router = APIRouter()
 
@@ -19,7 +20,7 @@ router = APIRouter()
 async def calculate_public(body: Inputs):
     if os.getenv("DEV_ALLOW_PUBLIC_COMPUTE") != "1":
         raise HTTPException(status_code=404, detail="Not found")
-    return run_calc(body)
+    return run_calc(body).to_dict()
 
 
 @router.post("/calculate_public_equilibrium", include_in_schema=False)
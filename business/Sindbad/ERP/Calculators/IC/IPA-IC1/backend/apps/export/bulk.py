@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Literal, Optional, Set
+import uuid
+
+from pydantic import BaseModel, Field
+import xlsxwriter
+
+from backend.apps.export.utils_export import SCHEDULE_COLUMNS
+from backend.core.calculations.ipa_engine.engine import (
+    BatchInputs,
+    Inputs,
+    iter_schedule,
+    run_calc_batch,
+)
+
+BULK_BATCH_SIZE = 1000
+BULK_JOB_TTL_SECONDS = float(os.getenv("IPA_BULK_EXPORT_TTL_SECONDS", "3600"))
+BULK_EXPORT_DIR = os.getenv("IPA_BULK_EXPORT_DIR") or tempfile.gettempdir()
+XLSX_MAX_ROWS = 1_048_576
+# constant_memory keeps one temp file open per worksheet until close, so the
+# "sheets" layout needs a descriptor per contract; cap it well under ulimit -n
+BULK_MAX_SHEETS = int(os.getenv("IPA_BULK_EXPORT_MAX_SHEETS", "250"))
+
+SUMMARY_INPUT_COLUMNS = ("principal", "rate", "term_months", "balloon")
+SUMMARY_TOTAL_COLUMNS = (
+    "annuity",
+    "ipa_net",
+    "ipa_vat",
+    "asset_vat",
+    "vat_delta",
+    "outstanding_final",
+)
+SUMMARY_COLUMNS = ("id",) + SUMMARY_INPUT_COLUMNS + SUMMARY_TOTAL_COLUMNS
+
+
+class BulkContract(Inputs):
+    id: Optional[str] = None
+
+
+class BulkExportRequest(BaseModel):
+    contracts: List[BulkContract] = Field(..., min_length=1)
+    # "long": one Schedule sheet keyed by contract id; "sheets": a sheet per contract
+    layout: Literal["long", "sheets"] = "long"
+
+
+class BulkExportJob(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"] = "queued"
+    layout: str
+    contracts_total: int
+    contracts_done: int = 0
+    created_at: float
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    path: Optional[str] = Field(default=None, exclude=True)
+
+
+def check_sheet_count(contracts: int, layout: str) -> None:
+    if layout == "sheets" and contracts > BULK_MAX_SHEETS:
+        raise ValueError(
+            f'layout "sheets" allows at most {BULK_MAX_SHEETS} contracts per '
+            f'workbook (got {contracts}); use layout "long" or split the request'
+        )
+
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _sheet_name(contract_id: str, used: Set[str]) -> str:
+    base = _INVALID_SHEET_CHARS.sub("_", contract_id)[:31] or "Contract"
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        suffix = f"~{n}"
+        name = base[: 31 - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+
+def write_portfolio_xlsx(
+    contracts: List[BulkContract],
+    path: str,
+    layout: str = "long",
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> None:
+    """
+    Summary sheet (batched through run_calc_batch) plus full-term schedules,
+    written row by row with xlsxwriter constant_memory.
+    """
+    check_sheet_count(len(contracts), layout)
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+    head = wb.add_format({"bold": True})
+    num = wb.add_format({"num_format": "#,##0.00"})
+
+    summary = wb.add_worksheet("Summary")
+    summary.set_column(0, len(SUMMARY_COLUMNS) - 1, 16)
+    summary.write_row(0, 0, SUMMARY_COLUMNS, head)
+    s_row = 1
+
+    long_cols = ("id",) + SCHEDULE_COLUMNS
+    long_ws: Optional[Any] = None
+    long_row, long_part = 0, 0
+    used_names = {"summary"}
+
+    def new_long_sheet() -> Any:
+        nonlocal long_row, long_part
+        long_part += 1
+        name = "Schedule" if long_part == 1 else f"Schedule {long_part}"
+        used_names.add(name.lower())
+        ws = wb.add_worksheet(name)
+        ws.set_column(0, len(long_cols) - 1, 16)
+        ws.write_row(0, 0, long_cols, head)
+        long_row = 1
+        return ws
+
+    for start in range(0, len(contracts), BULK_BATCH_SIZE):
+        chunk = contracts[start : start + BULK_BATCH_SIZE]
+        ids = [c.id or f"#{start + j + 1}" for j, c in enumerate(chunk)]
+        columns = {f: [getattr(c, f) for c in chunk] for f in Inputs.model_fields}
+        totals = run_calc_batch(BatchInputs(ids=ids, **columns))
+        values = {k: totals[k].tolist() for k in SUMMARY_TOTAL_COLUMNS}
+
+        for j, (cid, contract) in enumerate(zip(ids, chunk)):
+            summary.write_string(s_row, 0, cid)
+            summary.write_row(
+                s_row, 1, [getattr(contract, k) for k in SUMMARY_INPUT_COLUMNS]
+            )
+            summary.write_row(
+                s_row,
+                1 + len(SUMMARY_INPUT_COLUMNS),
+                [round(values[k][j], 2) for k in SUMMARY_TOTAL_COLUMNS],
+                num,
+            )
+            s_row += 1
+
+            if layout == "sheets":
+                ws = wb.add_worksheet(_sheet_name(cid, used_names))
+                ws.set_column(0, len(SCHEDULE_COLUMNS) - 1, 16)
+                ws.write_row(0, 0, SCHEDULE_COLUMNS, head)
+                for r, row in enumerate(iter_schedule(contract), start=1):
+                    ws.write_number(r, 0, row["month"])
+                    ws.write_row(r, 1, [row[k] for k in SCHEDULE_COLUMNS[1:]], num)
+            else:
+                for row in iter_schedule(contract):
+                    if long_ws is None or long_row >= XLSX_MAX_ROWS:
+                        long_ws = new_long_sheet()
+                    long_ws.write_string(long_row, 0, cid)
+                    long_ws.write_number(long_row, 1, row["month"])
+                    long_ws.write_row(
+                        long_row, 2, [row[k] for k in SCHEDULE_COLUMNS[1:]], num
+                    )
+                    long_row += 1
+
+        if on_progress is not None:
+            on_progress(start + len(chunk))
+
+    wb.close()
+
+
+class BulkExportJobs:
+    """In-process registry of bulk export jobs, run on a small worker pool."""
+
+    def __init__(self, max_workers: int = 2) -> None:
+        self._jobs: Dict[str, BulkExportJob] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bulk-export"
+        )
+
+    def submit(self, req: BulkExportRequest) -> BulkExportJob:
+        self.purge_expired()
+        job = BulkExportJob(
+            job_id=uuid.uuid4().hex,
+            layout=req.layout,
+            contracts_total=len(req.contracts),
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job, req)
+        return job
+
+    def _run(self, job: BulkExportJob, req: BulkExportRequest) -> None:
+        job.status = "running"
+        fd, path = tempfile.mkstemp(
+            prefix=f"ipa-bulk-{job.job_id}-", suffix=".xlsx", dir=BULK_EXPORT_DIR
+        )
+        os.close(fd)
+        job.path = path
+
+        def progress(done: int) -> None:
+            job.contracts_done = done
+
+        try:
+            write_portfolio_xlsx(req.contracts, path, req.layout, on_progress=progress)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            _unlink(path)
+            job.path = None
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[BulkExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - BULK_JOB_TTL_SECONDS
+        with self._lock:
+            expired = [
+                j
+                for j in self._jobs.values()
+                if j.finished_at is not None and j.finished_at < cutoff
+            ]
+            for j in expired:
+                del self._jobs[j.job_id]
+        for j in expired:
+            if j.path:
+                _unlink(j.path)
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+BULK_EXPORTS = BulkExportJobs(
+    max_workers=int(os.getenv("IPA_BULK_EXPORT_WORKERS", "2"))
+)
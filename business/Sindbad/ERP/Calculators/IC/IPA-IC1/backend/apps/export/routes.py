@@ -3,7 +3,8 @@ from __future__ import annotations
 from datetime import date
 from typing import Any, Dict, List
 
-from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
+from backend.core.calculations.ipa_engine.cache import cached_run_calc
+from backend.core.calculations.ipa_engine.engine import Inputs, iter_schedule
 
 # ---------------- helpers
 
@@ -45,25 +46,10 @@ def _add_months(d: date, n: int) -> date:
     return date(y, m, day)
 
 
-def _as_dict(res: Any) -> Dict[str, Any]:
-    if isinstance(res, dict):
-        return res
-    try:
-        from backend.core.calculations.equilibrium import _to_dict as _td  # type: ignore
-
-        return _td(res)
-    except Exception:
-        pass
-    out = {}
-    for k in ("annuity", "ipa_net", "ipa_vat", "schedule"):
-        out[k] = getattr(res, k, None)
-    return out
-
-
 # ---------------- core
 
 
-def compute_preview(payload: Dict[str, Any]) -> Dict[str, Any]:
+def compute_preview(payload: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
     # 1) normalize inputs
     term = _int(payload.get("term_months") or payload.get("tenure_months") or 0)
     rate = _num(payload.get("rate") or payload.get("nominal_rate_annual") or 0.0)
@@ -86,18 +72,18 @@ def compute_preview(payload: Dict[str, Any]) -> Dict[str, Any]:
     start = _parse_date(payload.get("start_date") or payload.get("contract_start_date"))
 
     # 2) engine
-    eng_inputs = {
+    eng_inputs: Dict[str, Any] = {
         "principal": principal,
         "term_months": term,
         "rate": rate,
         "vat_rate": vat_rate,
     }
-    res = _as_dict(run_calc(Inputs(**eng_inputs)))
+    eng = Inputs(**eng_inputs)
+    res = cached_run_calc(eng, use_cache=use_cache)
 
     annuity = _num(res.get("annuity"))
     ipa_net = _num(res.get("ipa_net"))
     ipa_vat = _num(res.get("ipa_vat"))
-    schedule = res.get("schedule") or []
 
     # 3) v11.4-friendly fields
     d = principal
@@ -106,10 +92,9 @@ def compute_preview(payload: Dict[str, Any]) -> Dict[str, Any]:
     c = ipa_net - principal
 
     rows: List[Dict[str, Any]] = []
-    for i in range(term):
+    for i, eng_row in enumerate(iter_schedule(eng)):
         row_date = _add_months(start, i)
-        eng_row = schedule[i] if i < len(schedule) else {}
-        a = _num(eng_row.get("annuity") if isinstance(eng_row, dict) else None, annuity)
+        a = _num(eng_row.get("annuity"), annuity)
         v = round(a * vat_rate, 2)
         t = round(a + v, 2)
         rows.append(
@@ -129,10 +114,11 @@ def compute_preview(payload: Dict[str, Any]) -> Dict[str, Any]:
     # try the real f-solver; fall back to direct diff
     eq_obj: Dict[str, Any]
     try:
-        from backend.core.calculations.equilibrium import solve_equilibrium_f_bisect  # type: ignore
+        from backend.core.calculations.equilibrium import solve_equilibrium_f_bisect
 
         eq_res = solve_equilibrium_f_bisect(
-            {"principal": d, "term_months": term, "rate": rate, "vat_rate": vat_rate}
+            {"principal": d, "term_months": term, "rate": rate, "vat_rate": vat_rate},
+            use_cache=use_cache,
         )
         eq = (eq_res or {}).get("equilibrium", {}) if isinstance(eq_res, dict) else {}
         f_solved = _num(eq.get("f_solved"), ipa_vat - asset_vat)
@@ -183,7 +169,9 @@ router = APIRouter()
 
 
 @router.post("/compute")
-async def compute_preview_endpoint(body: dict = Body(...)):
+async def compute_preview_endpoint(
+    body: Dict[str, Any] = Body(...), cache: bool = True
+) -> Dict[str, Any]:
     if os.getenv("DEV_ALLOW_PUBLIC_COMPUTE") != "1":
         raise HTTPException(status_code=404, detail="Not found")
-    return compute_preview(body)
+    return compute_preview(body, use_cache=cache)
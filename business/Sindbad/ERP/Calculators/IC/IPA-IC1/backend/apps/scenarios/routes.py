@@ -0,0 +1,88 @@
+import io
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+import numpy as np
+
+from backend.apps.auth.routes import require_auth
+from backend.core.calculations.scenarios import (
+    ScenarioGridRequest,
+    evaluate_grid,
+    grid_columns,
+)
+from backend.core.responses import FAST_JSON, FastJSONResponse
+from backend.core.routes import dispatch
+
+router = APIRouter()
+
+GRID_FORMATS = ("json", "arrow", "parquet")
+
+
+def _dense_json(grid: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = {}
+    for k, v in grid["metrics"].items():
+        arr = np.round(v, 2)
+        if np.isnan(arr).any():
+            obj = arr.astype(object)
+            obj[np.isnan(arr)] = None
+            metrics[k] = obj.tolist()
+        else:
+            metrics[k] = arr.tolist()
+    return {
+        "axes": {k: v.tolist() for k, v in grid["axes"].items()},
+        "shape": list(grid["shape"]),
+        "metrics": metrics,
+    }
+
+
+def _arrow_table(grid: Dict[str, Any]) -> Any:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(
+            status_code=501, detail="Arrow/Parquet output requires pyarrow"
+        )
+    return pa.table(grid_columns(grid))
+
+
+@router.post("/grid")
+async def scenario_grid(
+    req: ScenarioGridRequest, format: str = "json", _: Any = Depends(require_auth)
+) -> Any:
+    if format not in GRID_FORMATS:
+        raise HTTPException(
+            status_code=400, detail=f"format must be one of {', '.join(GRID_FORMATS)}"
+        )
+    try:
+        grid = await dispatch(evaluate_grid, req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "json":
+        if FAST_JSON:
+            # arrays go to the encoder as-is, no per-element float objects
+            return FastJSONResponse(
+                {
+                    "axes": grid["axes"],
+                    "shape": list(grid["shape"]),
+                    "metrics": {k: np.round(v, 2) for k, v in grid["metrics"].items()},
+                }
+            )
+        return _dense_json(grid)
+
+    table = _arrow_table(grid)
+    buf = io.BytesIO()
+    if format == "arrow":
+        import pyarrow as pa
+
+        with pa.ipc.new_stream(buf, table.schema) as writer:
+            writer.write_table(table)
+        media_type = "application/vnd.apache.arrow.stream"
+    else:
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, buf)
+        media_type = "application/vnd.apache.parquet"
+    headers = {"Content-Disposition": f'attachment; filename="scenario_grid.{format}"'}
+    return Response(buf.getvalue(), media_type=media_type, headers=headers)
@@ -0,0 +1,21 @@
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+BODY = {"principal": 2_500_000, "rate": 0.11, "term_months": 84, "balloon": 100_000}
+
+
+@pytest.mark.parametrize("cache", ["false", "true"])
+def test_calculate_roundtrip(
+    benchmark: Any, api_client: TestClient, auth_headers: Dict[str, str], cache: str
+) -> None:
+    def post() -> Any:
+        return api_client.post(
+            f"/calculate?cache={cache}", headers=auth_headers, json=BODY
+        )
+
+    resp = benchmark(post)
+    assert resp.status_code == 200
@@ -0,0 +1,38 @@
+from typing import Any
+
+import pytest
+
+from backend.core.calculations.ipa_engine.engine import (
+    Inputs,
+    iter_schedule,
+    pmt_with_balloon,
+    run_calc,
+)
+
+pytest.importorskip("pytest_benchmark")
+
+TERMS = (12, 36, 84, 120)
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_run_calc(benchmark: Any, term: int) -> None:
+    inp = Inputs(principal=2_500_000, rate=0.11, term_months=term, balloon=100_000)
+    res = benchmark(run_calc, inp)
+    assert res["annuity"] > 0
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_run_calc_totals_only(benchmark: Any, term: int) -> None:
+    inp = Inputs(principal=2_500_000, rate=0.11, term_months=term, balloon=100_000)
+    benchmark(run_calc, inp, totals_only=True)
+
+
+def test_pmt_with_balloon(benchmark: Any) -> None:
+    benchmark(pmt_with_balloon, 2_500_000, 0.11, 84, 100_000)
+
+
+@pytest.mark.parametrize("term", (120, 360))
+def test_iter_schedule_full_term(benchmark: Any, term: int) -> None:
+    inp = Inputs(principal=2_500_000, rate=0.11, term_months=term)
+    rows = benchmark(lambda: list(iter_schedule(inp)))
+    assert len(rows) == term
@@ -0,0 +1,49 @@
+from typing import Any
+
+import pytest
+
+from backend.apps.export.routes import compute_preview
+from backend.core.calculations.equilibrium import (
+    PRINCIPAL_SOLVERS,
+    solve_equilibrium_f,
+    solve_equilibrium_f_bisect,
+    solve_equilibrium_principal,
+)
+
+pytest.importorskip("pytest_benchmark")
+
+PAYLOAD = {
+    "principal": 1_000_000,
+    "rate": 0.12,
+    "term_months": 84,
+    "vat_rate": 0.18,
+    "asset_vat": 250_000,
+}
+
+
+@pytest.mark.parametrize("solver", PRINCIPAL_SOLVERS)
+def test_solve_equilibrium_principal(benchmark: Any, solver: str) -> None:
+    res = benchmark(
+        solve_equilibrium_principal, PAYLOAD, solver=solver, use_cache=False
+    )
+    assert res["equilibrium"]["ok"]
+
+
+def test_solve_equilibrium_f(benchmark: Any) -> None:
+    benchmark(solve_equilibrium_f, PAYLOAD, use_cache=False)
+
+
+def test_solve_equilibrium_f_bisect(benchmark: Any) -> None:
+    benchmark(solve_equilibrium_f_bisect, PAYLOAD, use_cache=False)
+
+
+def test_compute_preview(benchmark: Any) -> None:
+    body = {
+        "principal": 1_000_000,
+        "rate": 0.12,
+        "term_months": 84,
+        "vat_rate": 0.18,
+        "asset_net": 900_000,
+    }
+    res = benchmark(compute_preview, body, use_cache=False)
+    assert len(res["payments"]) == 84
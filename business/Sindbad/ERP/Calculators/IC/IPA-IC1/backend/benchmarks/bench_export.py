@@ -0,0 +1,26 @@
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from backend.apps.export.utils_export import (
+    schedule_to_pdf_bytes,
+    schedule_to_xlsx_bytes,
+)
+from backend.core.calculations.ipa_engine.engine import Inputs, iter_schedule
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module")
+def schedule_df() -> pd.DataFrame:
+    inp = Inputs(principal=2_500_000, rate=0.11, term_months=120)
+    return pd.DataFrame(list(iter_schedule(inp)))
+
+
+def test_schedule_to_xlsx_bytes(benchmark: Any, schedule_df: pd.DataFrame) -> None:
+    assert benchmark(schedule_to_xlsx_bytes, schedule_df)
+
+
+def test_schedule_to_pdf_bytes(benchmark: Any, schedule_df: pd.DataFrame) -> None:
+    assert benchmark(schedule_to_pdf_bytes, schedule_df)
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+import math
+from typing import Any, Callable, Dict, List, Mapping, Tuple
 
-from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
+from backend.core.calculations.ipa_engine.cache import cached_run_calc
+from backend.core.calculations.ipa_engine.engine import CalcResult, Inputs
+from backend.core.instrumentation import span
 
 # ------------------------
 # Helpers
@@ -10,7 +13,11 @@ from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
 
 
 def solve_bisect(
-    fn, lo: float, hi: float, tol: float = 0.01, max_iter: int = 64
+    fn: Callable[[float], float],
+    lo: float,
+    hi: float,
+    tol: float = 0.01,
+    max_iter: int = 64,
 ) -> Tuple[float, int, float, float]:
     f_lo = fn(lo)
     f_hi = fn(hi)
@@ -29,9 +36,103 @@ def solve_bisect(
     return (a + b) / 2.0, max_iter, f_lo, f_hi
 
 
+def solve_brent(
+    fn: Callable[[float], float],
+    lo: float,
+    hi: float,
+    tol: float = 0.01,
+    max_iter: int = 64,
+) -> Tuple[float, int, float, float]:
+    """Brent-Dekker on a bracket; same contract as solve_bisect."""
+    a, b = lo, hi
+    fa, fb = fn(a), fn(b)
+    f_lo, f_hi = fa, fb
+    if not (fa == 0 or fb == 0 or (fa < 0 < fb) or (fb < 0 < fa)):
+        raise ValueError("No sign change on [lo, hi]; cannot bracket root.")
+    xtol = 1e-12 * (abs(lo) + abs(hi))
+    c, fc = b, fb
+    d = e = b - a
+    for iters in range(1, max_iter + 1):
+        if (fb > 0 and fc > 0) or (fb < 0 and fc < 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2.0 * 2.2e-16 * abs(b) + 0.5 * xtol
+        xm = 0.5 * (c - b)
+        if abs(fb) <= tol or abs(xm) <= tol1:
+            return b, iters, f_lo, f_hi
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:  # secant step
+                p, q = 2.0 * xm * s, 1.0 - s
+            else:  # inverse quadratic interpolation
+                q, r = fa / fc, fb / fc
+                p = s * (2.0 * xm * q * (q - r) - (b - a) * (r - 1.0))
+                q = (q - 1.0) * (r - 1.0) * (s - 1.0)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2.0 * p < min(3.0 * xm * q - abs(tol1 * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = xm
+        else:
+            d = e = xm
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else math.copysign(tol1, xm)
+        fb = fn(b)
+    return b, max_iter, f_lo, f_hi
+
+
+def solve_secant(
+    fn: Callable[[float], float],
+    x0: float,
+    x1: float,
+    tol: float = 0.01,
+    max_iter: int = 64,
+) -> Tuple[float, int]:
+    """Unbracketed secant iteration; raises ValueError if it stalls or diverges."""
+    f0, f1 = fn(x0), fn(x1)
+    for iters in range(1, max_iter + 1):
+        if abs(f1) <= tol:
+            return x1, iters
+        if f1 == f0:
+            raise ValueError("Secant stalled on a flat error function.")
+        x0, x1, f0 = x1, x1 - f1 * (x1 - x0) / (f1 - f0), f1
+        f1 = fn(x1)
+    if abs(f1) <= tol:
+        return x1, max_iter
+    raise ValueError("Secant did not converge.")
+
+
+def solve_newton(
+    fn: Callable[[float], float],
+    slope: float,
+    x0: float,
+    tol: float = 0.01,
+    max_iter: int = 64,
+) -> Tuple[float, int]:
+    """Newton iteration with a fixed (analytic) slope."""
+    if slope == 0 or not math.isfinite(slope):
+        raise ValueError("Analytic slope is zero; cannot solve.")
+    x, fx = x0, fn(x0)
+    for iters in range(1, max_iter + 1):
+        if abs(fx) <= tol:
+            return x, iters
+        x = x - fx / slope
+        fx = fn(x)
+    if abs(fx) <= tol:
+        return x, max_iter
+    raise ValueError("Newton did not converge.")
+
+
 def _to_dict(x: Any) -> Dict[str, Any]:
     if isinstance(x, dict):
         return x
+    if isinstance(x, CalcResult):
+        return x.to_dict()
     # Pydantic v2
     if hasattr(x, "model_dump"):
         try:
@@ -63,8 +164,11 @@ def _to_dict(x: Any) -> Dict[str, Any]:
         return {"_raw": str(x)}
 
 
-def vat_from_result(result: Dict[str, Any]) -> float:
-    # 1) direct field
+def vat_from_result(result: Mapping[str, Any]) -> float:
+    # 1) direct field; unrounded for CalcResult so the solvers' error functions
+    # stay smooth (callers round what they report)
+    if isinstance(result, CalcResult):
+        return result.raw("ipa_vat")
     if isinstance(result, dict) and "ipa_vat" in result:
         try:
             return float(result["ipa_vat"])
@@ -81,6 +185,7 @@ def vat_from_result(result: Dict[str, Any]) -> float:
             pass
     # 3) totals.vat
     totals = result.get("totals") or {}
+    return float(totals.get("vat") or 0.0)
 
 
 def get_vat_fields(result: dict) -> dict:
@@ -122,7 +227,9 @@ def vat_asset(payload: Dict[str, Any]) -> float:
     return float(base) * vat_rate
 
 
-def run_once(payload: Dict[str, Any]) -> Dict[str, Any]:
+def run_once(
+    payload: Dict[str, Any], totals_only: bool = False, use_cache: bool = True
+) -> CalcResult:
     allowed = {
         "principal",
         "rate",
@@ -143,14 +250,53 @@ def run_once(payload: Dict[str, Any]) -> Dict[str, Any]:
     p.setdefault("include_banking", True)
     p.setdefault("irc_rate", 0.18)
     p.setdefault("banking_rate", 0.026)
-    res = run_calc(Inputs(**p))
-    return _to_dict(res)
+    with span("calc"):
+        return cached_run_calc(
+            Inputs(**p), totals_only=totals_only, use_cache=use_cache
+        )
 
 
 # ------------------------
 # Principal Equilibrium
 # ------------------------
 
+PRINCIPAL_SOLVERS = ("bisect", "brent", "secant", "analytic")
+DEFAULT_PRINCIPAL_SOLVER = "brent"
+
+
+def principal_error_slope(payload: Dict[str, Any]) -> float:
+    """
+    d(VAT(IPA) - VAT(asset)) / d(principal).
+    ipa_vat = vat_rate * (annuity * n + balloon) and annuity is linear in pv, so
+    the slope is constant; VAT(asset) only moves when it falls back to principal.
+    """
+    vat_rate = float(payload.get("vat_rate", 0.18) or 0.0)
+    n = int(payload.get("term_months", 0) or 0)
+    i = float(payload.get("rate", 0.0) or 0.0) / 12.0
+    if n <= 0 or i <= 0:
+        raise ValueError("rate and term_months must be > 0")
+    d_annuity = i / (1.0 - (1.0 + i) ** (-n))
+    slope = vat_rate * n * d_annuity
+    if payload.get("asset_vat") in (None, 0, 0.0, "0", "0.0") and (
+        "asset_price" not in payload
+    ):
+        slope -= vat_rate
+    return slope
+
+
+def equilibrium_error_for_principal(
+    payload: Dict[str, Any], use_cache: bool = True
+) -> Callable[[float], float]:
+    """VAT(IPA) - VAT(asset) as a function of principal (totals-only engine)."""
+
+    def err(principal_candidate: float) -> float:
+        p = dict(payload)
+        p["principal"] = principal_candidate
+        r = run_once(p, totals_only=True, use_cache=use_cache)
+        return vat_from_result(r) - vat_asset(p)
+
+    return err
+
 
 def solve_equilibrium_principal(
     payload: Dict[str, Any],
@@ -158,46 +304,82 @@ def solve_equilibrium_principal(
     hi_factor: float = 1.7,
     tol: float = 0.01,
     max_iter: int = 64,
+    solver: str = DEFAULT_PRINCIPAL_SOLVER,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
     """
     Solve principal such that VAT(IPA) = VAT(asset).
     lhs = VAT(IPA), rhs = VAT(asset).
+    solver: one of PRINCIPAL_SOLVERS ("bisect", "brent", "secant", "analytic").
     """
+    if solver not in PRINCIPAL_SOLVERS:
+        raise ValueError(
+            f"Unknown solver '{solver}'; expected one of {', '.join(PRINCIPAL_SOLVERS)}"
+        )
     original = float(payload.get("principal", 0.0))
     if original <= 0:
         raise ValueError("principal must be > 0")
 
+    calls = 0
+    err = equilibrium_error_for_principal(payload, use_cache=use_cache)
+
     def equilibrium_error(principal_candidate: float) -> float:
-        p = dict(payload)
-        p["principal"] = principal_candidate
-        r = run_once(p)
-        lhs = vat_from_result(r)
-        rhs = vat_asset(p)
-        return lhs - rhs
+        nonlocal calls
+        calls += 1
+        with span("solver_iter"):
+            return err(principal_candidate)
 
     lo, hi = original * lo_factor, original * hi_factor
     ok = False
+    message = "Could not bracket a root for principal"
 
-    for _ in range(6):
+    if solver in ("bisect", "brent"):
+        bracketed: Callable[..., Tuple[float, int, float, float]] = (
+            solve_bisect if solver == "bisect" else solve_brent
+        )
+        for _ in range(6):
+            try:
+                root, iters, _, _ = bracketed(
+                    equilibrium_error, lo, hi, tol=tol, max_iter=max_iter
+                )
+                ok = True
+                break
+            except ValueError:
+                lo *= 0.5
+                hi *= 1.5
+    else:
         try:
-            root, iters, _, _ = solve_bisect(
-                equilibrium_error, lo, hi, tol=tol, max_iter=max_iter
-            )
-            ok = True
-            break
+            if solver == "secant":
+                root, iters = solve_secant(
+                    equilibrium_error, original, hi, tol=tol, max_iter=max_iter
+                )
+            else:
+                root, iters = solve_newton(
+                    equilibrium_error,
+                    principal_error_slope(payload),
+                    original,
+                    tol=tol,
+                    max_iter=max_iter,
+                )
+            # Same search window the bracketing solvers can expand to
+            ok = lo * 0.5**5 <= root <= hi * 1.5**5
         except ValueError:
-            lo *= 0.5
-            hi *= 1.5
+            ok = False
+        if not ok:
+            message = "Could not find a root for principal in the search range"
 
     if not ok:
-        r = run_once(payload)
+        r = run_once(payload, use_cache=use_cache)
+        calls += 1
         lhs = vat_from_result(r)
         rhs = vat_asset(payload)
         return {
-            "result": r,
+            "result": r.to_dict(),
             "equilibrium": {
                 "ok": False,
-                "message": "Could not bracket a root for principal",
+                "message": message,
+                "solver": solver,
+                "engine_calls": calls,
                 "principal_original": original,
                 "principal_solved": original,
                 "lhs": round(lhs, 2),
@@ -209,17 +391,20 @@ def solve_equilibrium_principal(
     solved = round(root, 2)
     payload_solved = dict(payload)
     payload_solved["principal"] = solved
-    r = run_once(payload_solved)
+    r = run_once(payload_solved, use_cache=use_cache)
+    calls += 1
     lhs = vat_from_result(r)
     rhs = vat_asset(payload)
     err_abs = abs(lhs - rhs)
 
     return {
-        "result": r,
+        "result": r.to_dict(),
         "equilibrium": {
             "ok": err_abs <= tol,
             "tolerance": tol,
+            "solver": solver,
             "iterations": iters,
+            "engine_calls": calls,
             "principal_original": original,
             "principal_solved": solved,
             "lhs": round(lhs, 2),
@@ -234,18 +419,19 @@ def solve_equilibrium_principal(
 # ------------------------
 
 
-def solve_equilibrium_f(payload: Dict[str, Any]) -> Dict[str, Any]:
+def solve_equilibrium_f(
+    payload: Dict[str, Any], use_cache: bool = True
+) -> Dict[str, Any]:
     """
     Direct equilibrium on VAT delta f:
     lhs = VAT(IPA), rhs = VAT(asset) + f.
     """
-    r = run_once(payload)
-    r_dict = r if isinstance(r, dict) else _to_dict(r)
-    lhs = vat_from_result(r_dict)
+    r = run_once(payload, use_cache=use_cache)
+    lhs = vat_from_result(r)
     rhs = vat_asset(payload)
     f_star = round(lhs - rhs, 2)
     return {
-        "result": r_dict,
+        "result": r.to_dict(),
         "equilibrium": {
             "method": "f_direct",
             "ok": True,
@@ -258,38 +444,51 @@ def solve_equilibrium_f(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def equilibrium_error_for_f(
+    payload: Dict[str, Any], use_cache: bool = True
+) -> Callable[[float], float]:
+    """
+    VAT(IPA) - (VAT(asset) + f) as a function of f. VAT(IPA) does not depend
+    on f, so the totals-only engine runs once and each evaluation is a subtraction.
+    """
+    r = run_once(payload, totals_only=True, use_cache=use_cache)
+    gap = vat_from_result(r) - vat_asset(payload)
+
+    def err(f_candidate: float) -> float:
+        return gap - f_candidate
+
+    return err
+
+
 def solve_equilibrium_f_bisect(
-    payload: dict,
+    payload: Dict[str, Any],
     around: float | None = None,
-    span: float = 1e6,
+    half_width: float = 1e6,
     tol: float = 0.01,
     max_iter: int = 64,
-) -> dict:
+    use_cache: bool = True,
+) -> Dict[str, Any]:
     """
-    Solve VAT equilibrium for f such that VAT(IPA) = VAT(asset) + f.
-    Attempts bisection if helpers exist, otherwise falls back to direct f*.
+    Solve VAT equilibrium for f such that VAT(IPA) = VAT(asset) + f by
+    bisection on [around - half_width, around + half_width] (around defaults
+    to the direct f*). Falls back to the direct f* if bisection fails.
     Returns consistent keys: lhs, rhs, f_solved, tolerance, iterations.
     """
-    try:  # pragma: no cover
-        # try true bisection if helpers are present
-        err = equilibrium_error_for_f(payload)  # type: ignore[name-defined]
-        # choose center near direct f0
-        r0 = run_once({**payload})
-        f0 = vat_from_result(r0) - vat_asset(payload)
-        if around is not None:
-            f0 = float(around)
-        lo, hi = f0 - span, f0 + span
+    try:
+        err = equilibrium_error_for_f(payload, use_cache=use_cache)
+        f0 = err(0.0) if around is None else float(around)
+        lo, hi = f0 - half_width, f0 + half_width
         try:
             root, iters, f_lo, f_hi = solve_bisect(
                 err, lo, hi, tol=tol, max_iter=max_iter
-            )  # type: ignore[name-defined]
+            )
             f_star = round(root, 2)
-            r = run_once({**payload})
+            r = run_once({**payload}, use_cache=use_cache)
             lhs = vat_from_result(r)
             rhs_base = vat_asset(payload)
             err_abs = abs(err(f_star))
             return {
-                "result": r,
+                "result": r.to_dict(),
                 "equilibrium": {
                     "method": "f_bisection",
                     "ok": err_abs <= tol,
@@ -308,12 +507,12 @@ def solve_equilibrium_f_bisect(
         pass  # fall through to direct
 
     # fallback to direct
-    r = run_once({**payload})
+    r = run_once({**payload}, use_cache=use_cache)
     lhs = vat_from_result(r)
     rhs_base = vat_asset(payload)
     f_star = round(lhs - rhs_base, 2)
     return {
-        "result": r,
+        "result": r.to_dict(),
         "equilibrium": {
             "method": "f_direct_fallback",
             "ok": True,
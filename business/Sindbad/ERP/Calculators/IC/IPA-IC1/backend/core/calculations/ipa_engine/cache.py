@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple, TypeVar, cast
+
+from backend.core.calculations.ipa_engine.engine import CalcResult, Inputs, run_calc
+
+T = TypeVar("T")
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL for engine results."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], T]) -> T:
+        cached = self.get(key)
+        if cached is not None:
+            return cast(T, cached)
+        # computed outside the lock; a concurrent miss may compute twice
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+RESULT_CACHE = ResultCache(
+    maxsize=int(os.getenv("IPA_CACHE_MAXSIZE", "4096")),
+    ttl=float(os.getenv("IPA_CACHE_TTL_SECONDS", "600")),
+)
+
+
+def inputs_key(inp: Inputs, totals_only: bool = False) -> str:
+    """Canonical hash of the validated Inputs fields (+ engine mode)."""
+    canon = json.dumps(inp.model_dump(), sort_keys=True, separators=(",", ":"))
+    mode = "totals" if totals_only else "full"
+    return hashlib.blake2b(f"{mode}|{canon}".encode(), digest_size=16).hexdigest()
+
+
+def cached_run_calc(
+    inp: Inputs, totals_only: bool = False, use_cache: bool = True
+) -> CalcResult:
+    """
+    run_calc behind RESULT_CACHE; use_cache=False bypasses it entirely.
+    CalcResult is read-only, so cached entries are shared without copying.
+    """
+    if not use_cache:
+        return run_calc(inp, totals_only=totals_only)
+    return RESULT_CACHE.get_or_compute(
+        inputs_key(inp, totals_only), lambda: run_calc(inp, totals_only=totals_only)
+    )
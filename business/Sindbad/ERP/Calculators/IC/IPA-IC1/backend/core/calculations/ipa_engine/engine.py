@@ -1,7 +1,20 @@
-from typing import Dict, List
+from collections.abc import Mapping
+import json
+from typing import Any, Dict, Iterator, List, Optional, Union
 
+import numpy as np
 from pydantic import BaseModel, Field
 
+try:  # optional fast JSON encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+# Number of schedule rows returned by run_calc (the full term is still computed).
+SCHEDULE_PREVIEW_MONTHS = 12
+# Months computed per vectorized block when streaming the full schedule.
+SCHEDULE_CHUNK_MONTHS = 240
+
 
 # --- Pydantic model replaces dataclass ---
 class Inputs(BaseModel):
@@ -11,7 +24,7 @@ class Inputs(BaseModel):
         ..., gt=0, description="Annual interest rate (decimal, e.g. 0.12)"
     )
     term_months: int = Field(..., gt=0, description="Number of months in term")
-    balloon: float = Field(0.0, ge=0, description="Balloon due at end")
+    balloon: float = Field(default=0.0, ge=0, description="Balloon due at end")
 
     # VAT / reporting
     vat_rate: float = 0.18
@@ -27,6 +40,25 @@ class Inputs(BaseModel):
     banking_rate: float = 0.026  # 2.6% on (C/n + monthly interest)
 
 
+# --- Columnar batch of contracts (scalars broadcast to every contract) ---
+class BatchInputs(BaseModel):
+    ids: Optional[List[str]] = None
+    principal: List[float]
+    rate: List[float]
+    term_months: List[int]
+    balloon: Union[float, List[float]] = 0.0
+
+    vat_rate: Union[float, List[float]] = 0.18
+    asset_vat: Union[float, List[float]] = 0.0
+
+    telematics_monthly: Union[float, List[float]] = 10_000.0
+    include_irc: Union[bool, List[bool]] = True
+    include_banking: Union[bool, List[bool]] = True
+
+    irc_rate: Union[float, List[float]] = 0.18
+    banking_rate: Union[float, List[float]] = 0.026
+
+
 def pmt_with_balloon(pv: float, rate_annual: float, n: int, fv: float = 0.0) -> float:
     """Standard annuity (includes balloon in PV logic)."""
     i = rate_annual / 12.0
@@ -37,52 +69,330 @@ def pmt_with_balloon(pv: float, rate_annual: float, n: int, fv: float = 0.0) ->
     return (i * adj_pv) / denom
 
 
-def run_calc(inp: Inputs) -> Dict:
+def pmt_with_balloon_vec(
+    pv: np.ndarray, rate_annual: np.ndarray, n: np.ndarray, fv: np.ndarray
+) -> np.ndarray:
+    """Array form of pmt_with_balloon: one annuity per contract, 0.0 where n <= 0."""
+    i = rate_annual / 12.0
+    n_safe = np.where(n > 0, n, 1)
+    growth = (1.0 + i) ** n_safe
+    out = (i * (pv - fv / growth)) / (1.0 - 1.0 / growth)
+    return np.where(n > 0, out, 0.0)
+
+
+def schedule_arrays(
+    inp: Inputs,
+    annuity: float | None = None,
+    start: int = 1,
+    stop: int | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Schedule for months start..stop (default: full term) as float64 columns
+    (unrounded).
+
+    Outstanding follows o_m = (1 + k) * o_{m-1} - c0 with
+    k = i * (1 + irc + banking) and c0 = annuity - telematics - banking * C/n,
+    which is evaluated in closed form instead of month by month, so any
+    block of months can be computed independently.
+    """
+    if annuity is None:
+        annuity = pmt_with_balloon(
+            inp.principal, inp.rate, inp.term_months, fv=inp.balloon
+        )
+    n = int(inp.term_months)
+    stop = n if stop is None else min(stop, n)
     i = inp.rate / 12.0
+    irc = inp.irc_rate if inp.include_irc else 0.0
+    bank = inp.banking_rate if inp.include_banking else 0.0
+    principal = float(inp.principal)
+
+    k = i * (1.0 + irc + bank)
+    c0 = annuity - inp.telematics_monthly - bank * (principal / n)
+    # balances at the end of months start-1..stop; the first is the opening
+    m = np.arange(start - 1, stop + 1, dtype=np.float64)
+    if k != 0.0:
+        growth_m1 = np.expm1(m * np.log1p(k))  # (1 + k)^m - 1
+        balance = principal + growth_m1 * (principal - c0 / k)
+    else:
+        balance = principal - c0 * m
+    opening = balance[:-1]
+    outstanding = balance[1:]
+
+    interest = opening * i
+    tsf = inp.telematics_monthly + irc * interest + bank * (principal / n + interest)
+    capital = annuity - interest - tsf
+    return {
+        "month": m[1:],
+        "interest": interest,
+        "tsf": tsf,
+        "capital": capital,
+        "outstanding": outstanding,
+    }
+
+
+def schedule_rows(
+    cols: Dict[str, np.ndarray], annuity: float, limit: int | None = None
+) -> List[Dict]:
+    """Materialize (rounded) row dicts for the first `limit` months only."""
+    stop = len(cols["month"]) if limit is None else limit
+    months = cols["month"][:stop].astype(np.int64).tolist()
+    interest = cols["interest"][:stop].tolist()
+    tsf = cols["tsf"][:stop].tolist()
+    capital = cols["capital"][:stop].tolist()
+    outstanding = cols["outstanding"][:stop].tolist()
+    annuity_r = round(annuity, 2)
+    return [
+        {
+            "month": months[j],
+            "interest": round(interest[j], 2),
+            "tsf": round(tsf[j], 2),
+            "capital": round(capital[j], 2),
+            "annuity": annuity_r,
+            "outstanding": round(outstanding[j], 2),
+        }
+        for j in range(len(months))
+    ]
+
+
+def iter_schedule(
+    inp: Inputs, chunk_months: int = SCHEDULE_CHUNK_MONTHS
+) -> Iterator[Dict]:
+    """Yield every month of the schedule (rounded rows), one block at a time."""
     annuity = pmt_with_balloon(inp.principal, inp.rate, inp.term_months, fv=inp.balloon)
+    for start in range(1, inp.term_months + 1, chunk_months):
+        cols = schedule_arrays(inp, annuity, start=start, stop=start + chunk_months - 1)
+        yield from schedule_rows(cols, annuity)
 
-    rows: List[Dict] = []
-    outstanding = float(inp.principal)
-    annuity_identity_ok = True
-
-    for m in range(1, inp.term_months + 1):
-        interest = outstanding * i
-        irc_m = (inp.irc_rate * interest) if inp.include_irc else 0.0
-        bank_m = (
-            (inp.banking_rate * ((inp.principal / inp.term_months) + interest))
-            if inp.include_banking
-            else 0.0
-        )
-        tsf = inp.telematics_monthly + irc_m + bank_m
-        capital = annuity - interest - tsf
-        outstanding = outstanding - capital
-
-        if abs((interest + tsf + capital) - annuity) > 1e-6:
-            annuity_identity_ok = False
-
-        rows.append(
-            {
-                "month": m,
-                "interest": round(interest, 2),
-                "tsf": round(tsf, 2),
-                "capital": round(capital, 2),
-                "annuity": round(annuity, 2),
-                "outstanding": round(outstanding, 2),
-            }
+
+TOTAL_FIELDS = ("annuity", "ipa_net", "ipa_vat", "asset_vat", "vat_delta")
+# Rows of CalcResult.schedule_cols
+SCHEDULE_ARRAY_FIELDS = ("month", "interest", "tsf", "capital", "outstanding")
+
+
+class CalcResult(Mapping):
+    """
+    Engine result kept as raw float64 values: totals in one array and the
+    preview schedule as contiguous columns. Reads through the mapping
+    interface round to cents and build fresh objects, so the result itself
+    is immutable and safe to share (e.g. from the result cache). Keys match
+    the dict run_calc used to return.
+    """
+
+    __slots__ = (
+        "inputs",
+        "totals",
+        "schedule_cols",
+        "outstanding_final_raw",
+        "identity_ok",
+    )
+
+    def __init__(
+        self,
+        inputs: Inputs,
+        totals: np.ndarray,
+        schedule_cols: Optional[np.ndarray] = None,
+        outstanding_final_raw: float = 0.0,
+        identity_ok: bool = True,
+    ) -> None:
+        self.inputs = inputs
+        self.totals = totals
+        self.schedule_cols = schedule_cols
+        self.outstanding_final_raw = outstanding_final_raw
+        self.identity_ok = identity_ok
+
+    @property
+    def totals_only(self) -> bool:
+        return self.schedule_cols is None
+
+    def _keys(self) -> tuple:
+        if self.totals_only:
+            return TOTAL_FIELDS
+        return (
+            ("inputs",)
+            + TOTAL_FIELDS
+            + ("annuity_identity_ok", "schedule", "outstanding_final")
         )
 
+    def raw(self, key: str) -> float:
+        """Unrounded value of a total (or outstanding_final)."""
+        if key in TOTAL_FIELDS:
+            return float(self.totals[TOTAL_FIELDS.index(key)])
+        if key == "outstanding_final":
+            if self.totals_only:
+                raise KeyError(
+                    "outstanding_final is not available on a totals_only result"
+                )
+            return self.outstanding_final_raw
+        raise KeyError(key)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in TOTAL_FIELDS:
+            return round(float(self.totals[TOTAL_FIELDS.index(key)]), 2)
+        if not self.totals_only:
+            if key == "schedule":
+                return self.schedule_rows()
+            if key == "outstanding_final":
+                return round(self.outstanding_final_raw, 2)
+            if key == "annuity_identity_ok":
+                return self.identity_ok
+            if key == "inputs":
+                return self.inputs.model_dump()
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"CalcResult({self.to_dict()!r})"
+
+    def schedule_rows(self) -> List[Dict]:
+        if self.schedule_cols is None:
+            return []
+        cols = dict(zip(SCHEDULE_ARRAY_FIELDS, self.schedule_cols))
+        return schedule_rows(cols, self.raw("annuity"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain (rounded) dict for the API boundary; a new object per call."""
+        return {k: self[k] for k in self._keys()}
+
+    def to_json(self, **extra: Any) -> bytes:
+        """JSON bytes of to_dict() plus any extra top-level keys."""
+        data = self.to_dict()
+        data.update(extra)
+        if orjson is not None:
+            return bytes(orjson.dumps(data))
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+def run_calc(inp: Inputs, totals_only: bool = False) -> CalcResult:
+    """
+    Price one contract. With totals_only=True only the closed-form totals
+    (annuity, ipa_net, ipa_vat, asset_vat, vat_delta) are returned and no
+    schedule is built; solvers use this for their inner evaluations.
+    """
+    annuity = pmt_with_balloon(inp.principal, inp.rate, inp.term_months, fv=inp.balloon)
+
     ipa_net = annuity * inp.term_months + inp.balloon
     vat_ipa = inp.vat_rate * ipa_net
     vat_delta = vat_ipa - inp.asset_vat
+    totals = np.array([annuity, ipa_net, vat_ipa, inp.asset_vat, vat_delta])
+
+    if totals_only:
+        return CalcResult(inp, totals)
+
+    cols = schedule_arrays(inp, annuity)
+    residual = (cols["interest"] + cols["tsf"] + cols["capital"]) - annuity
+    annuity_identity_ok = not bool(np.any(np.abs(residual) > 1e-6))
+    preview = np.stack(
+        [cols[k][:SCHEDULE_PREVIEW_MONTHS] for k in SCHEDULE_ARRAY_FIELDS]
+    )
+    return CalcResult(
+        inp,
+        totals,
+        preview,
+        float(cols["outstanding"][-1]),
+        annuity_identity_ok,
+    )
+
+
+def _batch_column(value: Any, size: int, dtype: Any, name: str) -> np.ndarray:
+    arr = np.asarray(value, dtype=dtype)
+    if arr.ndim == 0:
+        return np.full(size, arr, dtype=dtype)
+    if arr.shape != (size,):
+        raise ValueError(f"{name}: expected {size} values, got {arr.shape[0]}")
+    return arr
+
+
+def run_calc_batch(batch: BatchInputs) -> Dict[str, np.ndarray]:
+    """
+    Totals for every contract in the batch, computed column-wise in one pass.
+    Returns unrounded float64 columns; see iter_batch_records for row output.
+    """
+    size = len(batch.principal)
+    f8 = np.float64
+    pv = _batch_column(batch.principal, size, f8, "principal")
+    rate = _batch_column(batch.rate, size, f8, "rate")
+    n = _batch_column(batch.term_months, size, np.int64, "term_months")
+    fv = _batch_column(batch.balloon, size, f8, "balloon")
+    vat_rate = _batch_column(batch.vat_rate, size, f8, "vat_rate")
+    asset_vat = _batch_column(batch.asset_vat, size, f8, "asset_vat")
+    telematics = _batch_column(batch.telematics_monthly, size, f8, "telematics_monthly")
+    irc = _batch_column(batch.irc_rate, size, f8, "irc_rate") * _batch_column(
+        batch.include_irc, size, bool, "include_irc"
+    )
+    bank = _batch_column(batch.banking_rate, size, f8, "banking_rate") * _batch_column(
+        batch.include_banking, size, bool, "include_banking"
+    )
+    if batch.ids is not None and len(batch.ids) != size:
+        raise ValueError(f"ids: expected {size} values, got {len(batch.ids)}")
+
+    return totals_arrays(pv, rate, n, fv, vat_rate, asset_vat, telematics, irc, bank)
+
+
+def totals_arrays(
+    pv: np.ndarray,
+    rate: np.ndarray,
+    n: np.ndarray,
+    fv: np.ndarray,
+    vat_rate: np.ndarray | float,
+    asset_vat: np.ndarray | float,
+    telematics: np.ndarray | float,
+    irc: np.ndarray | float,
+    bank: np.ndarray | float,
+) -> Dict[str, np.ndarray]:
+    """
+    Element-wise totals over broadcastable arrays (irc/bank already zeroed
+    where the flag is off). Raises ValueError outside the Inputs domain.
+    """
+    for name, bad in (
+        ("principal", pv <= 0),
+        ("rate", rate <= 0),
+        ("term_months", n <= 0),
+        ("balloon", fv < 0),
+    ):
+        if np.any(bad):
+            idx = int(np.argmax(np.ravel(bad)))
+            raise ValueError(f"{name}: invalid value at index {idx}")
+
+    annuity = pmt_with_balloon_vec(pv, rate, n, fv)
+    ipa_net = annuity * n + fv
+    ipa_vat = vat_rate * ipa_net
+
+    # Closed-form outstanding after the last month (see schedule_arrays)
+    i = rate / 12.0
+    k = i * (1.0 + irc + bank)
+    c0 = annuity - telematics - bank * (pv / n)
+    k_safe = np.where(k != 0.0, k, 1.0)
+    outstanding = np.where(
+        k != 0.0,
+        pv + np.expm1(n * np.log1p(k)) * (pv - c0 / k_safe),
+        pv - c0 * n,
+    )
 
     return {
-        "inputs": inp.model_dump(),  # Pydantic replacement for asdict
-        "annuity": round(annuity, 2),
-        "ipa_net": round(ipa_net, 2),
-        "ipa_vat": round(vat_ipa, 2),
-        "asset_vat": round(inp.asset_vat, 2),
-        "vat_delta": round(vat_delta, 2),
-        "annuity_identity_ok": annuity_identity_ok,
-        "schedule": rows[:12],
-        "outstanding_final": round(outstanding, 2),
+        "annuity": annuity,
+        "ipa_net": ipa_net,
+        "ipa_vat": ipa_vat,
+        "asset_vat": np.broadcast_to(asset_vat, annuity.shape),
+        "vat_delta": ipa_vat - asset_vat,
+        "outstanding_final": outstanding,
     }
+
+
+def iter_batch_records(
+    cols: Dict[str, np.ndarray], ids: Optional[List[str]] = None
+) -> Iterator[Dict]:
+    """Yield one rounded result dict per contract, in input order."""
+    names = list(cols)
+    values = [cols[k].tolist() for k in names]
+    for idx, row in enumerate(zip(*values)):
+        rec: Dict = {"index": idx}
+        if ids is not None:
+            rec["id"] = ids[idx]
+        for k, v in zip(names, row):
+            rec[k] = round(v, 2)
+        yield rec
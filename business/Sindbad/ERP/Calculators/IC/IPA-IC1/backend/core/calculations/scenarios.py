@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from backend.core.calculations.ipa_engine.engine import totals_arrays
+
+GRID_AXES = ("principal", "rate", "term_months", "balloon")
+MAX_GRID_CELLS = int(os.getenv("IPA_GRID_MAX_CELLS", "2000000"))
+
+
+class AxisRange(BaseModel):
+    start: float
+    stop: float
+    num: int = Field(..., gt=0, description="Number of evenly spaced points")
+
+
+class ScenarioGridRequest(BaseModel):
+    # Axes: explicit values or an inclusive linspace
+    principal: Union[List[float], AxisRange]
+    rate: Union[List[float], AxisRange]
+    term_months: Union[List[int], AxisRange]
+    balloon: Union[List[float], AxisRange] = [0.0]
+
+    # Held constant across the grid (same defaults as Inputs)
+    vat_rate: float = 0.18
+    asset_vat: float = 0.0
+    telematics_monthly: float = 10_000.0
+    include_irc: bool = True
+    include_banking: bool = True
+    irc_rate: float = 0.18
+    banking_rate: float = 0.026
+
+    # Also solve VAT(IPA) = VAT(asset) for principal in every cell
+    equilibrium: bool = False
+
+
+def axis_values(
+    axis: Union[Sequence[float], AxisRange], integer: bool = False
+) -> np.ndarray:
+    if isinstance(axis, AxisRange):
+        values = np.linspace(axis.start, axis.stop, axis.num)
+    else:
+        values = np.asarray(axis, dtype=np.float64)
+    if values.size == 0:
+        raise ValueError("grid axes must not be empty")
+    if integer:
+        return np.rint(values).astype(np.int64)
+    return values
+
+
+def principal_equilibrium_arrays(
+    rate: np.ndarray,
+    n: np.ndarray,
+    fv: np.ndarray,
+    vat_rate: float,
+    asset_vat: float,
+) -> np.ndarray:
+    """
+    Closed-form principal where VAT(IPA) = VAT(asset), ignoring cent rounding.
+    VAT(IPA) = vat_rate * (n * a * (P - fv * g) + fv) with a = i / (1 - g),
+    g = (1 + i)^-n. VAT(asset) is asset_vat, or vat_rate * P when it is 0
+    (mirrors equilibrium.vat_asset). NaN where no positive root exists.
+    """
+    i = rate / 12.0
+    g = (1.0 + i) ** (-n)
+    na = n * i / (1.0 - g)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if asset_vat:
+            root = (asset_vat / vat_rate - fv) / na + fv * g
+        else:
+            root = fv * (na * g - 1.0) / (na - 1.0)
+    return np.where(np.isfinite(root) & (root > 0), root, np.nan)
+
+
+def evaluate_grid(req: ScenarioGridRequest) -> Dict[str, Any]:
+    """
+    Evaluate the Cartesian product of the axes in one broadcast engine pass.
+    Metrics are dense float64 arrays of shape (principal, rate, term, balloon).
+    """
+    axes = {
+        "principal": axis_values(req.principal),
+        "rate": axis_values(req.rate),
+        "term_months": axis_values(req.term_months, integer=True),
+        "balloon": axis_values(req.balloon),
+    }
+    shape: Tuple[int, ...] = tuple(axes[k].size for k in GRID_AXES)
+    cells = int(np.prod(shape))
+    if cells > MAX_GRID_CELLS:
+        raise ValueError(f"grid has {cells} cells; limit is {MAX_GRID_CELLS}")
+
+    pv, rate, n, fv = np.meshgrid(
+        *(axes[k] for k in GRID_AXES), indexing="ij", sparse=True
+    )
+    totals = totals_arrays(
+        pv,
+        rate,
+        n,
+        fv,
+        req.vat_rate,
+        req.asset_vat,
+        req.telematics_monthly,
+        req.irc_rate if req.include_irc else 0.0,
+        req.banking_rate if req.include_banking else 0.0,
+    )
+    metrics = {k: np.broadcast_to(v, shape) for k, v in totals.items()}
+    if req.equilibrium:
+        eq = principal_equilibrium_arrays(rate, n, fv, req.vat_rate, req.asset_vat)
+        metrics["principal_equilibrium"] = np.broadcast_to(eq, shape)
+
+    return {"axes": axes, "shape": shape, "metrics": metrics}
+
+
+def grid_columns(grid: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Long-format columns (one row per cell, C order) for tabular outputs."""
+    shape = grid["shape"]
+    mesh = np.meshgrid(
+        *(grid["axes"][k] for k in GRID_AXES), indexing="ij", sparse=True
+    )
+    cols = {k: np.broadcast_to(m, shape).ravel() for k, m in zip(GRID_AXES, mesh)}
+    for k, v in grid["metrics"].items():
+        cols[k] = np.ascontiguousarray(v).ravel()
+    return cols
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+from typing import Any, Callable, Dict
+
+from backend.core.instrumentation import profiling_active
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+class ExecutorSaturated(RuntimeError):
+    """Every worker is busy and the pending queue is full."""
+
+
+class ExecutorTimeout(RuntimeError):
+    """A job did not finish within its timeout."""
+
+
+class EngineExecutor:
+    """
+    Runs CPU-bound engine work off the event loop.
+
+    mode: "inline" (call directly, old behaviour), "thread" or "process".
+    At most max_workers + max_queue jobs are admitted at once; further
+    submissions raise ExecutorSaturated. A job that times out keeps its slot
+    until the worker actually finishes, so back-pressure stays honest.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int | None = None,
+        max_queue: int = 64,
+        timeout: float | None = 30.0,
+    ) -> None:
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(
+                f"executor mode must be one of {', '.join(EXECUTOR_MODES)}"
+            )
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="ipa-engine"
+                )
+        return self._pool
+
+    def _release(self, _fut: Any = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        # Profiled requests run inline so the engine shows up in the report
+        if self.mode == "inline" or profiling_active():
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise ExecutorSaturated("Engine executor is saturated; retry later")
+            self._in_flight += 1
+
+        call = functools.partial(fn, *args, **kwargs)
+        if self.mode == "thread":
+            # carry the request's timing spans into the worker thread
+            call = functools.partial(contextvars.copy_context().run, call)
+        try:
+            cfut = self._get_pool().submit(call)
+        except Exception:
+            self._release()
+            raise
+        cfut.add_done_callback(self._release)
+
+        limit = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(cfut), limit)
+        except asyncio.TimeoutError:
+            cfut.cancel()  # only takes effect if still queued
+            with self._lock:
+                self.timed_out += 1
+            raise ExecutorTimeout(f"Engine job exceeded {limit}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _env_float(name: str, default: str) -> float | None:
+    value = float(os.getenv(name, default))
+    return value if value > 0 else None
+
+
+ENGINE_EXECUTOR = EngineExecutor(
+    mode=os.getenv("IPA_EXECUTOR", "thread"),
+    max_workers=int(os.getenv("IPA_EXECUTOR_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("IPA_EXECUTOR_QUEUE", "64")),
+    timeout=_env_float("IPA_EXECUTOR_TIMEOUT_SECONDS", "30"),
+)
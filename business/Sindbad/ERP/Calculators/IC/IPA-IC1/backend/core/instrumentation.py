@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import cProfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+import io
+import os
+import pstats
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Per-request stage timings: name -> [seconds, count]. None outside a request.
+_SPANS: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "ipa_spans", default=None
+)
+_PROFILING: ContextVar[bool] = ContextVar("ipa_profiling", default=False)
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# ?profile=1 exposes server internals, so it is off unless explicitly enabled
+PROFILE_ALLOWED = os.getenv("IPA_ALLOW_PROFILE", "0") == "1"
+
+
+# ---------------- spans
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a block into the current request's stages (no-op outside requests).
+    Spans that close after the response headers are sent (e.g. "render" while
+    a streamed export body is produced) miss Server-Timing and are recorded in
+    /metrics only.
+    """
+    spans = _SPANS.get()
+    if spans is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = spans.setdefault(name, [0.0, 0])
+        entry[0] += time.perf_counter() - t0
+        entry[1] += 1
+
+
+def profiling_active() -> bool:
+    return _PROFILING.get()
+
+
+def server_timing(spans: Dict[str, List[float]], total: float) -> str:
+    parts = [f"total;dur={total * 1000:.2f}"]
+    for name, (secs, count) in spans.items():
+        entry = f"{name};dur={secs * 1000:.2f}"
+        if count > 1:
+            entry += f';desc="n={int(count)}"'
+        parts.append(entry)
+    return ", ".join(parts)
+
+
+# ---------------- metrics
+
+
+class Histogram:
+    """Minimal Prometheus-style histogram keyed by label values."""
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts, then sum and count
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            for label_values, series in items:
+                base = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+                sep = "," if base else ""
+                for le, count in zip(self.buckets, series):
+                    lines.append(
+                        f'{self.name}_bucket{{{base}{sep}le="{le}"}} {int(count)}'
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {int(series[-1])}'
+                )
+                lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{{{base}}} {int(series[-1])}")
+        return "\n".join(lines)
+
+
+REQUEST_LATENCY = Histogram(
+    "ipa_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+STAGE_LATENCY = Histogram(
+    "ipa_stage_duration_seconds",
+    "Time spent per instrumented stage, per request",
+    ("route", "stage"),
+)
+
+
+def render_metrics() -> str:
+    return REQUEST_LATENCY.render() + "\n" + STAGE_LATENCY.render() + "\n"
+
+
+# ---------------- middleware
+
+
+def _route_template(app: Any, scope: Scope) -> str:
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return str(getattr(route, "path", scope["path"]))
+    return "unmatched"
+
+
+def _profile_requested(scope: Scope) -> bool:
+    if not PROFILE_ALLOWED:
+        return False
+    qs = parse_qs(scope.get("query_string", b"").decode())
+    return qs.get("profile", ["0"])[0] in ("1", "true")
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: per-request stage spans, a Server-Timing header,
+    latency histograms, and an opt-in ?profile=1 report (pyinstrument if
+    installed, else cProfile) returned in place of a 2xx response; other
+    responses pass through unchanged.
+    """
+
+    def __init__(self, app: ASGIApp, router_app: Optional[Any] = None) -> None:
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: Dict[str, List[float]] = {}
+        token = _SPANS.set(spans)
+        profiling = _profile_requested(scope)
+        prof_token = _PROFILING.set(profiling)
+        t0 = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_timed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                elapsed = time.perf_counter() - t0
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", server_timing(spans, elapsed).encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profiling:
+                status["code"] = await self._profiled(scope, receive, send)
+            else:
+                await self.app(scope, receive, send_timed)
+        finally:
+            total = time.perf_counter() - t0
+            _SPANS.reset(token)
+            _PROFILING.reset(prof_token)
+            route = (
+                _route_template(self.router_app, scope)
+                if self.router_app
+                else scope["path"]
+            )
+            REQUEST_LATENCY.observe(
+                (scope["method"], route, str(status["code"])), total
+            )
+            for name, (secs, _count) in spans.items():
+                STAGE_LATENCY.observe((route, name), secs)
+
+    async def _profiled(self, scope: Scope, receive: Receive, send: Send) -> int:
+        captured = {"status": 500}
+        messages: List[Message] = []
+
+        async def swallow(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+            messages.append(message)
+
+        try:
+            from pyinstrument import Profiler  # optional
+        except ImportError:
+            Profiler = None
+
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, swallow)
+            finally:
+                profiler.stop()
+            report = str(profiler.output_text(unicode=True, color=False))
+        else:
+            cprof = cProfile.Profile()
+            cprof.enable()
+            try:
+                await self.app(scope, receive, swallow)
+            finally:
+                cprof.disable()
+            out = io.StringIO()
+            pstats.Stats(cprof, stream=out).sort_stats("cumulative").print_stats(40)
+            report = out.getvalue()
+
+        if not 200 <= captured["status"] < 300:
+            for message in messages:
+                await send(message)
+            return captured["status"]
+
+        body = report.encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profiled-status", str(captured["status"]).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+        return captured["status"]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+import json
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+import numpy as np
+
+try:  # optional fast encoders, preferred in this order
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on environment
+    msgspec = None
+
+# Opt-in: make FastJSONResponse the app default and let hot routes hand
+# NumPy arrays straight to the encoder.
+FAST_JSON = os.getenv("IPA_FAST_JSON", "0") == "1"
+
+
+def _ndarray_to_list(arr: np.ndarray) -> list:
+    if arr.dtype.kind == "f" and np.isnan(arr).any():
+        obj = arr.astype(object)
+        obj[np.isnan(arr)] = None
+        return list(obj.tolist())
+    return list(arr.tolist())
+
+
+def json_default(obj: Any) -> Any:
+    """Encoder hook for values the JSON libraries do not handle natively."""
+    if isinstance(obj, np.ndarray):
+        return _ndarray_to_list(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Mapping):  # e.g. CalcResult
+        return dict(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize with orjson, then msgspec, then the stdlib json module."""
+    if orjson is not None:
+        return bytes(
+            orjson.dumps(
+                content,
+                default=json_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+        )
+    if msgspec is not None:
+        return bytes(msgspec.json.encode(content, enc_hook=json_default))
+    return json.dumps(
+        content,
+        default=json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by dumps(): NumPy arrays and scalars encode natively."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def respond(content: Any) -> Any:
+    """
+    Return content through FastJSONResponse when FAST_JSON is on, skipping
+    jsonable_encoder; otherwise hand it back for FastAPI's default path.
+    """
+    if FAST_JSON:
+        return FastJSONResponse(content)
+    return content
@@ -1,105 +1,262 @@
-import io
+from typing import Any, Callable, Dict, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from backend.apps.auth.routes import require_auth
+from backend.apps.export.bulk import (
+    BULK_EXPORTS,
+    BulkExportJob,
+    BulkExportRequest,
+    check_sheet_count,
+)
+from backend.apps.export.utils_export import (
+    iter_schedule_csv,
+    iter_schedule_pdf,
+    iter_schedule_xlsx,
+)
 from backend.core.calculations.equilibrium import (
+    DEFAULT_PRINCIPAL_SOLVER,
     solve_equilibrium_f,
     solve_equilibrium_f_bisect,
     solve_equilibrium_principal,
 )
-from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from openpyxl import Workbook
-from reportlab.pdfgen import canvas
+from backend.core.calculations.ipa_engine.cache import RESULT_CACHE, inputs_key
+from backend.core.calculations.ipa_engine.engine import (
+    BatchInputs,
+    Inputs,
+    iter_batch_records,
+    iter_schedule,
+    run_calc,
+    run_calc_batch,
+)
+from backend.core.executor import ENGINE_EXECUTOR, ExecutorSaturated, ExecutorTimeout
+from backend.core.instrumentation import span
+from backend.core.responses import dumps, respond
 
 router = APIRouter()
 
+# NDJSON lines per streamed chunk for /calculate/batch
+BATCH_CHUNK_LINES = 1000
+
+
+async def dispatch(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run engine work on ENGINE_EXECUTOR, mapping back-pressure to HTTP errors."""
+    try:
+        with span("engine"):
+            return await ENGINE_EXECUTOR.run(fn, *args, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "1"}
+        )
+    except ExecutorTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+def worker_cache(cache: bool) -> bool:
+    """
+    use_cache for engine work sent through dispatch. RESULT_CACHE lives in this
+    process; with IPA_EXECUTOR=process the solvers run in worker processes
+    whose caches /cache/stats and DELETE /cache cannot see, so they run
+    uncached there. /calculate caches here, around dispatch, in every mode.
+    """
+    return cache and ENGINE_EXECUTOR.mode != "process"
+
 
 # --- Calculate ---
 @router.post("/calculate")
-async def calculate(inp: Inputs, _=Depends(require_auth)):
+async def calculate(
+    inp: Inputs, cache: bool = True, _: Any = Depends(require_auth)
+) -> Response:
     try:
-        res = run_calc(inp)
+        key = inputs_key(inp)
+        res = RESULT_CACHE.get(key) if cache else None
+        if res is None:
+            res = await dispatch(run_calc, inp)
+            if cache:
+                RESULT_CACHE.put(key, res)
+    except HTTPException:
+        raise
     except Exception as e:
         msg = str(e)
         if "missing" in msg.lower():
             raise HTTPException(status_code=400, detail="Missing required field")
         raise HTTPException(status_code=400, detail=msg)
 
-    # Backward-compatibility: ensure "totals" dict exists
-    if not isinstance(res.get("totals"), dict):
-        totals = {}
-        for k in ("annuity", "ipa_vat", "asset_vat", "vat_delta"):
-            if k in res:
-                totals[k] = res[k]
-        res["totals"] = totals
+    # Backward-compatibility: "totals" mirrors the top-level VAT figures.
+    # Serialized straight from the CalcResult, skipping jsonable_encoder.
+    totals = {k: res[k] for k in ("annuity", "ipa_vat", "asset_vat", "vat_delta")}
+    return Response(res.to_json(totals=totals), media_type="application/json")
 
-    return res
+
+# --- Calculate: batch (columnar in, NDJSON out) ---
+@router.post("/calculate/batch")
+async def calculate_batch(
+    batch: BatchInputs, _: Any = Depends(require_auth)
+) -> StreamingResponse:
+    try:
+        cols = await dispatch(run_calc_batch, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def ndjson() -> Iterator[bytes]:
+        buf = []
+        for rec in iter_batch_records(cols, batch.ids):
+            buf.append(dumps(rec))
+            if len(buf) >= BATCH_CHUNK_LINES:
+                yield b"\n".join(buf) + b"\n"
+                buf = []
+        if buf:
+            yield b"\n".join(buf) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 # --- Equilibrium: principal ---
 @router.post("/equilibrium/principal")
-async def equilibrium_principal(inp: Inputs, _=Depends(require_auth)):
+async def equilibrium_principal(
+    inp: Inputs,
+    solver: str = DEFAULT_PRINCIPAL_SOLVER,
+    cache: bool = True,
+    _: Any = Depends(require_auth),
+) -> Any:
     try:
-        return solve_equilibrium_principal(inp.model_dump())
+        return respond(
+            await dispatch(
+                solve_equilibrium_principal,
+                inp.model_dump(),
+                solver=solver,
+                use_cache=worker_cache(cache),
+            )
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 # --- Equilibrium: f ---
 @router.post("/equilibrium/f")
-async def equilibrium_f(inp: Inputs, _=Depends(require_auth)):
+async def equilibrium_f(
+    inp: Inputs, cache: bool = True, _: Any = Depends(require_auth)
+) -> Any:
     try:
-        return solve_equilibrium_f(inp.model_dump())
+        return respond(
+            await dispatch(
+                solve_equilibrium_f, inp.model_dump(), use_cache=worker_cache(cache)
+            )
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 # --- Equilibrium: f_bisect ---
 @router.post("/equilibrium/f_bisect")
-async def equilibrium_f_bisect(inp: Inputs, _=Depends(require_auth)):
+async def equilibrium_f_bisect(
+    inp: Inputs, cache: bool = True, _: Any = Depends(require_auth)
+) -> Any:
     try:
-        return solve_equilibrium_f_bisect(inp.model_dump())
+        return respond(
+            await dispatch(
+                solve_equilibrium_f_bisect,
+                inp.model_dump(),
+                use_cache=worker_cache(cache),
+            )
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-# --- Export XLSX ---
+# --- Engine result cache ---
+@router.get("/cache/stats")
+async def cache_stats(_: Any = Depends(require_auth)) -> Dict[str, Any]:
+    return RESULT_CACHE.stats()
+
+
+@router.delete("/cache")
+async def cache_clear(_: Any = Depends(require_auth)) -> Dict[str, bool]:
+    RESULT_CACHE.clear()
+    return {"cleared": True}
+
+
+# --- Engine executor ---
+@router.get("/executor/stats")
+async def executor_stats(_: Any = Depends(require_auth)) -> Dict[str, Any]:
+    return ENGINE_EXECUTOR.stats()
+
+
+# --- Export: full-term schedule, streamed ---
+def _export_headers(ext: str) -> Dict[str, str]:
+    return {"Content-Disposition": f'attachment; filename="calculation.{ext}"'}
+
+
+@router.post("/export/csv")
+async def export_csv(inp: Inputs, _: Any = Depends(require_auth)) -> StreamingResponse:
+    return StreamingResponse(
+        iter_schedule_csv(iter_schedule(inp)),
+        media_type="text/csv",
+        headers=_export_headers("csv"),
+    )
+
+
 @router.post("/export/xlsx")
-async def export_xlsx(inp: Inputs, _=Depends(require_auth)):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Calculation"
-    ws["A1"] = "Example Metric"
-    ws["B1"] = "Another"
-    ws["A2"] = 123.45
-    ws["B2"] = 67.89
-    ws["A4"] = "Payload Echo"
-    ws["B4"] = str(inp.model_dump())
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    headers = {"Content-Disposition": 'attachment; filename="calculation.xlsx"'}
+async def export_xlsx(inp: Inputs, _: Any = Depends(require_auth)) -> StreamingResponse:
     return StreamingResponse(
-        buf,
+        iter_schedule_xlsx(iter_schedule(inp)),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
+        headers=_export_headers("xlsx"),
     )
 
 
-# --- Export PDF ---
 @router.post("/export/pdf")
-async def export_pdf(inp: Inputs, _=Depends(require_auth)):
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf)
-    c.setFont("Helvetica", 12)
-    c.drawString(72, 800, "IPA Calculator - Demo PDF")
-    c.drawString(72, 780, "Example Metric: 123.45")
-    c.drawString(72, 760, "Another: 67.89")
-    c.drawString(72, 740, f"Payload: {str(inp.model_dump())[:80]}...")
-    c.showPage()
-    c.save()
-    buf.seek(0)
-    headers = {"Content-Disposition": 'attachment; filename="calculation.pdf"'}
-    return StreamingResponse(buf, media_type="application/pdf", headers=headers)
+async def export_pdf(inp: Inputs, _: Any = Depends(require_auth)) -> StreamingResponse:
+    return StreamingResponse(
+        iter_schedule_pdf(iter_schedule(inp), title="IPA Calculator - Schedule"),
+        media_type="application/pdf",
+        headers=_export_headers("pdf"),
+    )
+
+
+# --- Export: bulk portfolio workbook (background job) ---
+def _bulk_job_or_404(job_id: str) -> BulkExportJob:
+    job = BULK_EXPORTS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+def _bulk_status(job: BulkExportJob) -> Dict[str, Any]:
+    out: Dict[str, Any] = job.model_dump()
+    out["status_url"] = f"/export/bulk/{job.job_id}"
+    out["download_url"] = f"/export/bulk/{job.job_id}/download"
+    return out
+
+
+@router.post("/export/bulk", status_code=202)
+async def export_bulk(
+    req: BulkExportRequest, _: Any = Depends(require_auth)
+) -> Dict[str, Any]:
+    try:
+        check_sheet_count(len(req.contracts), req.layout)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _bulk_status(BULK_EXPORTS.submit(req))
+
+
+@router.get("/export/bulk/{job_id}")
+async def export_bulk_status(
+    job_id: str, _: Any = Depends(require_auth)
+) -> Dict[str, Any]:
+    return _bulk_status(_bulk_job_or_404(job_id))
+
+
+@router.get("/export/bulk/{job_id}/download")
+async def export_bulk_download(
+    job_id: str, _: Any = Depends(require_auth)
+) -> FileResponse:
+    job = _bulk_job_or_404(job_id)
+    if job.status != "done" or not job.path:
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    return FileResponse(
+        job.path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"portfolio_{job.job_id[:8]}.xlsx",
+    )
@@ -1,15 +1,21 @@
+from contextlib import asynccontextmanager
 import os
 import sys
+from typing import AsyncIterator, Dict
 
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.status import HTTP_400_BAD_REQUEST
 
 from backend.apps.auth.routes import router as auth_router
 from backend.apps.insurance.routes import router as insurance_router
+from backend.apps.scenarios.routes import router as scenarios_router
 from backend.apps.vehicles.routes import router as vehicles_router
+from backend.core.executor import ENGINE_EXECUTOR
+from backend.core.instrumentation import TimingMiddleware, render_metrics
+from backend.core.responses import FAST_JSON, FastJSONResponse
 from backend.core.routes import router as core_router
 
 # Ensure repo root on path
@@ -17,7 +23,18 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-app = FastAPI(title="IPA Calculator API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    ENGINE_EXECUTOR.shutdown()
+
+
+app = FastAPI(
+    title="IPA Calculator API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse,
+)
 
 
 # --- Validation error handler (422 → 400) ---
@@ -54,21 +71,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# --- Timing: Server-Timing header, /metrics histograms, ?profile=1 ---
+app.add_middleware(TimingMiddleware, router_app=app)
+
 # --- Routers ---
 app.include_router(vehicles_router, prefix="/vehicles", tags=["vehicles"])
 app.include_router(insurance_router, prefix="/insurance", tags=["Insurance"])
 app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 app.include_router(core_router, tags=["Core"])
+app.include_router(scenarios_router, prefix="/scenarios", tags=["Scenarios"])
 
 
 # --- Health endpoint ---
 @app.get("/health")
-def health():
+def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+# --- Prometheus metrics ---
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # --- Optional: dev mode router ---
 if os.getenv("APP_MODE", "dev") == "dev":
     from fastapi import APIRouter
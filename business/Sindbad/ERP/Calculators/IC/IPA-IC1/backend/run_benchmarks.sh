@@ -0,0 +1,18 @@
+#!/usr/bin/env bash
+# Usage: ./run_benchmarks.sh save            # record a baseline
+#        ./run_benchmarks.sh [compare] [20%] # fail if any mean regresses past threshold
+set -e
+cd "$(dirname "$0")/.."
+MODE="${1:-compare}"
+THRESHOLD="${2:-20%}"
+STORAGE="file://backend/benchmarks/.results"
+# bench_*.py are not collected by the regular test run
+COLLECT="-o python_files=bench_*.py"
+if [ "$MODE" = "save" ]; then
+  python -m pytest backend/benchmarks $COLLECT --benchmark-only \
+    --benchmark-storage="$STORAGE" --benchmark-autosave
+else
+  python -m pytest backend/benchmarks $COLLECT --benchmark-only \
+    --benchmark-storage="$STORAGE" --benchmark-compare \
+    --benchmark-compare-fail="mean:$THRESHOLD"
+fi
@@ -0,0 +1,71 @@
+import json
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.core.calculations.ipa_engine.engine import (
+    BatchInputs,
+    Inputs,
+    iter_batch_records,
+    run_calc,
+    run_calc_batch,
+)
+
+
+@pytest.fixture
+def batch_payload() -> Dict[str, Any]:
+    return {
+        "ids": ["A-1", "A-2", "A-3"],
+        "principal": [100_000, 300_000, 25_000_000],
+        "rate": [0.12, 0.08, 0.145],
+        "term_months": [24, 36, 84],
+        "balloon": [0, 50_000, 2_500_000],
+        "asset_vat": 1_000.0,
+    }
+
+
+def test_batch_matches_single_run_calc(batch_payload: Dict[str, Any]) -> None:
+    batch = BatchInputs(**batch_payload)
+    records = list(iter_batch_records(run_calc_batch(batch), batch.ids))
+
+    assert [r["id"] for r in records] == batch_payload["ids"]
+    for idx, rec in enumerate(records):
+        single = run_calc(
+            Inputs(
+                principal=batch.principal[idx],
+                rate=batch.rate[idx],
+                term_months=batch.term_months[idx],
+                balloon=batch_payload["balloon"][idx],
+                asset_vat=1_000.0,
+            )
+        )
+        for k in ("annuity", "ipa_net", "ipa_vat", "asset_vat", "vat_delta"):
+            assert rec[k] == single[k]
+        assert abs(rec["outstanding_final"] - single["outstanding_final"]) <= 0.01
+
+
+def test_batch_rejects_ragged_columns(batch_payload: Dict[str, Any]) -> None:
+    batch_payload["rate"] = [0.12, 0.08]
+    with pytest.raises(ValueError):
+        run_calc_batch(BatchInputs(**batch_payload))
+
+
+def test_batch_endpoint_streams_ndjson(
+    api_client: TestClient, auth_headers: Dict[str, str], batch_payload: Dict[str, Any]
+) -> None:
+    resp = api_client.post("/calculate/batch", headers=auth_headers, json=batch_payload)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines() if line]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["annuity"] == 4707.35
+
+
+def test_batch_endpoint_invalid_value(
+    api_client: TestClient, auth_headers: Dict[str, str], batch_payload: Dict[str, Any]
+) -> None:
+    batch_payload["term_months"] = [24, 0, 84]
+    resp = api_client.post("/calculate/batch", headers=auth_headers, json=batch_payload)
+    assert resp.status_code == 400
+    assert "term_months" in resp.json()["detail"]
@@ -0,0 +1,142 @@
+import json
+import pickle
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from backend.core.calculations.ipa_engine.engine import (
+    Inputs,
+    pmt_with_balloon,
+    run_calc,
+    schedule_arrays,
+    schedule_rows,
+)
+
+
+def _reference_schedule(inp: Inputs) -> Tuple[List[Dict[str, Any]], float, bool]:
+    """Month-by-month loop the vectorized kernel replaced (kept as the oracle)."""
+    i = inp.rate / 12.0
+    annuity = pmt_with_balloon(inp.principal, inp.rate, inp.term_months, fv=inp.balloon)
+    rows = []
+    outstanding = float(inp.principal)
+    ok = True
+    for m in range(1, inp.term_months + 1):
+        interest = outstanding * i
+        irc_m = (inp.irc_rate * interest) if inp.include_irc else 0.0
+        bank_m = (
+            (inp.banking_rate * ((inp.principal / inp.term_months) + interest))
+            if inp.include_banking
+            else 0.0
+        )
+        tsf = inp.telematics_monthly + irc_m + bank_m
+        capital = annuity - interest - tsf
+        outstanding = outstanding - capital
+        if abs((interest + tsf + capital) - annuity) > 1e-6:
+            ok = False
+        rows.append(
+            {
+                "month": m,
+                "interest": round(interest, 2),
+                "tsf": round(tsf, 2),
+                "capital": round(capital, 2),
+                "annuity": round(annuity, 2),
+                "outstanding": round(outstanding, 2),
+            }
+        )
+    return rows, round(outstanding, 2), ok
+
+
+CASES = [
+    {"principal": 100_000, "rate": 0.12, "term_months": 24},
+    {"principal": 1_000_000, "rate": 0.05, "term_months": 12},
+    {"principal": 300_000, "rate": 0.08, "term_months": 36, "balloon": 50_000},
+    {"principal": 25_000_000, "rate": 0.145, "term_months": 84, "balloon": 2_500_000},
+    {"principal": 80_000_000, "rate": 0.11, "term_months": 120},
+    {"principal": 500_000, "rate": 0.10, "term_months": 60, "include_irc": False},
+    {"principal": 500_000, "rate": 0.10, "term_months": 48, "include_banking": False},
+    {
+        "principal": 750_000,
+        "rate": 0.09,
+        "term_months": 1,
+        "telematics_monthly": 0.0,
+        "include_irc": False,
+        "include_banking": False,
+    },
+]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_schedule_matches_reference_loop_to_the_cent(case: Dict[str, Any]) -> None:
+    inp = Inputs(**case)
+    ref_rows, ref_final, _ = _reference_schedule(inp)
+    annuity = pmt_with_balloon(inp.principal, inp.rate, inp.term_months, fv=inp.balloon)
+    rows = schedule_rows(schedule_arrays(inp, annuity), annuity)
+
+    assert len(rows) == len(ref_rows) == inp.term_months
+    for got, want in zip(rows, ref_rows):
+        assert got["month"] == want["month"]
+        for k in ("interest", "tsf", "capital", "annuity", "outstanding"):
+            assert abs(got[k] - want[k]) <= 0.01, (got["month"], k, got[k], want[k])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_run_calc_matches_reference_totals(case: Dict[str, Any]) -> None:
+    inp = Inputs(**case)
+    ref_rows, ref_final, ref_ok = _reference_schedule(inp)
+    res = run_calc(inp)
+
+    assert len(res["schedule"]) == min(12, inp.term_months)
+    for got, want in zip(res["schedule"], ref_rows):
+        assert got == pytest.approx(want, abs=0.01)
+    assert abs(res["outstanding_final"] - ref_final) <= 0.01
+    assert res["annuity_identity_ok"] == ref_ok
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_totals_only_matches_full_result(case: Dict[str, Any]) -> None:
+    inp = Inputs(**case)
+    full = run_calc(inp)
+    totals = run_calc(inp, totals_only=True)
+
+    assert "schedule" not in totals
+    for k in ("annuity", "ipa_net", "ipa_vat", "asset_vat", "vat_delta"):
+        assert totals[k] == full[k]
+
+
+def test_calc_result_is_a_lazy_read_only_mapping() -> None:
+    inp = Inputs(principal=100_000, rate=0.12, term_months=24, asset_vat=25_000)
+    res = run_calc(inp)
+
+    assert list(res) == [
+        "inputs",
+        "annuity",
+        "ipa_net",
+        "ipa_vat",
+        "asset_vat",
+        "vat_delta",
+        "annuity_identity_ok",
+        "schedule",
+        "outstanding_final",
+    ]
+    assert res["annuity"] == round(res.raw("annuity"), 2) == 4707.35
+    cols = res.schedule_cols
+    assert cols is not None
+    assert cols.shape == (5, 12) and cols.flags.c_contiguous
+    assert res.to_dict() == dict(res)
+    assert res.to_dict() is not res.to_dict()
+    assert json.loads(res.to_json(extra=1)) == dict(res.to_dict(), extra=1)
+    assert pickle.loads(pickle.dumps(res)) == res
+    with pytest.raises(TypeError):
+        res["annuity"] = 0  # type: ignore[index]
+
+
+def test_calc_result_raw_raises_key_error_for_unavailable_keys() -> None:
+    inp = Inputs(principal=100_000, rate=0.12, term_months=24, asset_vat=25_000)
+    full = run_calc(inp)
+    totals = run_calc(inp, totals_only=True)
+
+    assert round(full.raw("outstanding_final"), 2) == full["outstanding_final"]
+    with pytest.raises(KeyError, match="totals_only"):
+        totals.raw("outstanding_final")
+    with pytest.raises(KeyError):
+        full.raw("no_such_total")
@@ -1,6 +1,11 @@
+from typing import Any, Dict, List
+
 import pytest
 
 from backend.core.calculations.equilibrium import (
+    PRINCIPAL_SOLVERS,
+    equilibrium_error_for_principal,
+    principal_error_slope,
     solve_equilibrium_f,
     solve_equilibrium_f_bisect,
     solve_equilibrium_principal,
@@ -31,6 +36,29 @@ def test_principal_equilibrium(sample_payload):
     assert abs(eq["lhs"] - eq["rhs"]) <= eq["tolerance"]
 
 
+@pytest.mark.parametrize("solver", PRINCIPAL_SOLVERS)
+def test_principal_equilibrium_solvers_agree(
+    sample_payload: Dict[str, Any], solver: str
+) -> None:
+    baseline = solve_equilibrium_principal(sample_payload, solver="bisect")
+    result = solve_equilibrium_principal(sample_payload, solver=solver)
+    eq = result["equilibrium"]
+
+    assert eq["ok"] is True
+    assert eq["solver"] == solver
+    assert eq["engine_calls"] >= eq["iterations"]
+    assert (
+        abs(eq["principal_solved"] - baseline["equilibrium"]["principal_solved"]) < 1.0
+    )
+    if solver != "bisect":
+        assert eq["engine_calls"] <= 5
+
+
+def test_principal_equilibrium_unknown_solver(sample_payload: Dict[str, Any]) -> None:
+    with pytest.raises(ValueError):
+        solve_equilibrium_principal(sample_payload, solver="newton-raphson")
+
+
 def test_f_equilibrium_direct(sample_payload):
     result = solve_equilibrium_f(sample_payload)
     eq = result["equilibrium"]
@@ -66,3 +94,33 @@ def test_f_equilibrium_bisect_real(sample_payload):
     assert eq["method"] == "f_bisection"
     assert "tolerance" in eq and "iterations" in eq
     assert abs(eq["lhs"] - eq["rhs"]) <= eq["tolerance"]
+
+
+@pytest.mark.parametrize("solver", PRINCIPAL_SOLVERS)
+def test_principal_equilibrium_builds_one_schedule(
+    sample_payload: Dict[str, Any], solver: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import backend.core.calculations.ipa_engine.engine as engine
+
+    built: List[int] = []
+    original = engine.schedule_arrays
+
+    def counting_schedule_arrays(*a: Any, **kw: Any) -> Any:
+        built.append(1)
+        return original(*a, **kw)
+
+    monkeypatch.setattr(engine, "schedule_arrays", counting_schedule_arrays)
+
+    result = solve_equilibrium_principal(sample_payload, solver=solver, use_cache=False)
+    assert result["equilibrium"]["engine_calls"] > 1
+    assert len(built) == 1
+    assert len(result["result"]["schedule"]) == 12
+
+
+def test_principal_error_is_not_rounded_to_cents(
+    sample_payload: Dict[str, Any],
+) -> None:
+    err = equilibrium_error_for_principal(sample_payload, use_cache=False)
+    step = err(100_000.01) - err(100_000.0)
+
+    assert step == pytest.approx(principal_error_slope(sample_payload) * 0.01, rel=1e-6)
@@ -1,3 +1,6 @@
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
 import pytest
 
 # Reuse shared fixtures from conftest.py:
@@ -26,6 +29,20 @@ def test_equilibrium_principal_ok(api_client, auth_headers, sample_payload):
     assert "lhs" in eq and "rhs" in eq
 
 
+def test_equilibrium_principal_solver_query(
+    api_client: TestClient, auth_headers: Dict[str, str], sample_payload: Dict[str, Any]
+) -> None:
+    payload = dict(sample_payload, asset_vat=25_000)
+    resp = api_client.post(
+        "/equilibrium/principal?solver=analytic", headers=auth_headers, json=payload
+    )
+    assert resp.status_code == 200
+    eq = resp.json()["equilibrium"]
+    assert eq["solver"] == "analytic"
+    assert eq["ok"] is True
+    assert eq["engine_calls"] <= 5
+
+
 def test_equilibrium_f_ok(api_client, auth_headers, sample_payload):
     resp = api_client.post("/equilibrium/f", headers=auth_headers, json=sample_payload)
     assert resp.status_code == 200
@@ -57,6 +74,16 @@ def test_equilibrium_principal_missing_principal(
     assert "Missing required field" in resp.json()["detail"]
 
 
+def test_equilibrium_principal_unknown_solver(
+    api_client: TestClient, auth_headers: Dict[str, str], sample_payload: Dict[str, Any]
+) -> None:
+    resp = api_client.post(
+        "/equilibrium/principal?solver=nope", headers=auth_headers, json=sample_payload
+    )
+    assert resp.status_code == 400
+    assert "Unknown solver" in resp.json()["detail"]
+
+
 def test_equilibrium_f_invalid_payload(api_client, auth_headers):
     # deliberately send junk
     resp = api_client.post("/equilibrium/f", headers=auth_headers, json={"foo": "bar"})
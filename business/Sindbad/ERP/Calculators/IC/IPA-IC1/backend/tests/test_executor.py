@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
+import backend.core.executor as executor_mod
+from backend.core.executor import EngineExecutor, ExecutorSaturated, ExecutorTimeout
+
+
+def _wait(event: threading.Event) -> str:
+    event.wait(5)
+    return "done"
+
+
+def test_inline_and_thread_modes_match() -> None:
+    inp = Inputs(principal=100_000, rate=0.12, term_months=24)
+    inline = asyncio.run(EngineExecutor(mode="inline").run(run_calc, inp))
+    threaded = asyncio.run(
+        EngineExecutor(mode="thread", max_workers=2).run(run_calc, inp)
+    )
+    assert inline == threaded
+
+
+def test_process_mode_runs_engine() -> None:
+    ex = EngineExecutor(mode="process", max_workers=1)
+    try:
+        res = asyncio.run(
+            ex.run(run_calc, Inputs(principal=100_000, rate=0.12, term_months=24))
+        )
+    finally:
+        ex.shutdown()
+    assert res["annuity"] == 4707.35
+
+
+def test_saturation_rejects_and_releases_slots() -> None:
+    ex = EngineExecutor(mode="thread", max_workers=1, max_queue=0, timeout=5)
+    gate = threading.Event()
+
+    async def scenario() -> Any:
+        first = asyncio.ensure_future(ex.run(_wait, gate))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await ex.run(_wait, gate)
+        gate.set()
+        return await first
+
+    assert asyncio.run(scenario()) == "done"
+    stats = ex.stats()
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
+    ex.shutdown()
+
+
+def test_timeout_keeps_slot_until_worker_finishes() -> None:
+    ex = EngineExecutor(mode="thread", max_workers=1, max_queue=0, timeout=0.05)
+    gate = threading.Event()
+    with pytest.raises(ExecutorTimeout):
+        asyncio.run(ex.run(_wait, gate))
+    assert ex.stats()["in_flight"] == 1
+    gate.set()
+    ex.shutdown()
+
+
+def test_api_returns_429_when_saturated(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(executor_mod.ENGINE_EXECUTOR, "max_workers", 0)
+    monkeypatch.setattr(executor_mod.ENGINE_EXECUTOR, "max_queue", 0)
+    body = {"principal": 100_000, "rate": 0.12, "term_months": 24}
+    resp = api_client.post("/calculate?cache=false", headers=auth_headers, json=body)
+    assert resp.status_code == 429
+    assert resp.headers["retry-after"] == "1"
@@ -0,0 +1,130 @@
+import io
+from pathlib import Path
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+import pytest
+
+from backend.apps.export.bulk import BULK_MAX_SHEETS
+
+
+@pytest.fixture
+def contracts() -> List[Dict[str, Any]]:
+    return [
+        {"id": "L-001", "principal": 100_000, "rate": 0.12, "term_months": 24},
+        {
+            "id": "L-002",
+            "principal": 300_000,
+            "rate": 0.08,
+            "term_months": 36,
+            "balloon": 50_000,
+        },
+        {"id": "L/003", "principal": 2_500_000, "rate": 0.11, "term_months": 84},
+    ]
+
+
+def _wait_done(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    status_url: str,
+    timeout: float = 10.0,
+) -> Dict[str, Any]:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job: Dict[str, Any] = api_client.get(status_url, headers=auth_headers).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("bulk export did not finish")
+
+
+@pytest.mark.parametrize("layout", ["long", "sheets"])
+def test_bulk_export_job_roundtrip(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    contracts: List[Dict[str, Any]],
+    layout: str,
+) -> None:
+    resp = api_client.post(
+        "/export/bulk",
+        headers=auth_headers,
+        json={"contracts": contracts, "layout": layout},
+    )
+    assert resp.status_code == 202
+    submitted = resp.json()
+    assert submitted["contracts_total"] == 3
+    assert "path" not in submitted
+
+    job = _wait_done(api_client, auth_headers, submitted["status_url"])
+    assert job["status"] == "done"
+    assert job["contracts_done"] == 3
+
+    dl = api_client.get(job["download_url"], headers=auth_headers)
+    assert dl.status_code == 200
+    wb = load_workbook(io.BytesIO(dl.content), read_only=True)
+
+    summary = list(wb["Summary"].iter_rows(values_only=True))
+    assert [r[0] for r in summary[1:]] == ["L-001", "L-002", "L/003"]
+    assert summary[1][summary[0].index("annuity")] == 4707.35
+
+    if layout == "long":
+        rows = list(wb["Schedule"].iter_rows(values_only=True))
+        assert len(rows) == 1 + 24 + 36 + 84
+    else:
+        assert wb.sheetnames == ["Summary", "L-001", "L-002", "L_003"]
+        assert len(list(wb["L_003"].iter_rows(values_only=True))) == 85
+
+
+def test_bulk_export_unknown_job(
+    api_client: TestClient, auth_headers: Dict[str, str]
+) -> None:
+    resp = api_client.get("/export/bulk/nope", headers=auth_headers)
+    assert resp.status_code == 404
+
+
+def test_bulk_export_rejects_more_sheets_than_the_limit(
+    api_client: TestClient, auth_headers: Dict[str, str]
+) -> None:
+    contracts = [
+        {"id": f"L-{i}", "principal": 100_000, "rate": 0.12, "term_months": 12}
+        for i in range(5000)
+    ]
+    resp = api_client.post(
+        "/export/bulk",
+        headers=auth_headers,
+        json={"contracts": contracts, "layout": "sheets"},
+    )
+    assert resp.status_code == 422
+    assert f"at most {BULK_MAX_SHEETS} contracts" in resp.text
+
+
+_LOW_FD_SCRIPT = """
+import resource, sys
+from backend.apps.export.bulk import BULK_MAX_SHEETS, BulkContract, write_portfolio_xlsx
+soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+resource.setrlimit(resource.RLIMIT_NOFILE, (min(1024, hard), hard))
+def book(n):
+    return [BulkContract(id=f"L-{i}", principal=100_000, rate=0.12, term_months=12) for i in range(n)]
+write_portfolio_xlsx(book(BULK_MAX_SHEETS), sys.argv[1] + "/sheets.xlsx", "sheets")
+write_portfolio_xlsx(book(5000), sys.argv[1] + "/long.xlsx", "long")
+"""
+
+
+def test_bulk_export_large_portfolio_fits_a_1024_descriptor_limit(
+    tmp_path: Path,
+) -> None:
+    pytest.importorskip("resource")
+    subprocess.run(
+        [sys.executable, "-c", _LOW_FD_SCRIPT, str(tmp_path)],
+        cwd=Path(__file__).resolve().parents[2],
+        check=True,
+        capture_output=True,
+    )
+    sheets = load_workbook(tmp_path / "sheets.xlsx", read_only=True)
+    assert len(sheets.sheetnames) == 1 + BULK_MAX_SHEETS
+    long = load_workbook(tmp_path / "long.xlsx", read_only=True)
+    assert long["Summary"].max_row == 1 + 5000
@@ -0,0 +1,65 @@
+import csv
+import io
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+import pytest
+
+from backend.core.calculations.ipa_engine.engine import (
+    Inputs,
+    iter_schedule,
+    pmt_with_balloon,
+    schedule_arrays,
+    schedule_rows,
+)
+
+
+@pytest.fixture
+def long_term() -> Dict[str, Any]:
+    return {
+        "principal": 2_500_000,
+        "rate": 0.11,
+        "term_months": 120,
+        "balloon": 100_000,
+    }
+
+
+def test_iter_schedule_chunks_match_full_term(long_term: Dict[str, Any]) -> None:
+    inp = Inputs(**long_term)
+    annuity = pmt_with_balloon(inp.principal, inp.rate, inp.term_months, fv=inp.balloon)
+    full = schedule_rows(schedule_arrays(inp, annuity), annuity)
+
+    chunked = list(iter_schedule(inp, chunk_months=7))
+    assert [r["month"] for r in chunked] == list(range(1, 121))
+    for got, want in zip(chunked, full):
+        assert got == pytest.approx(want, abs=0.01)
+
+
+def test_export_csv_streams_every_month(
+    api_client: TestClient, auth_headers: Dict[str, str], long_term: Dict[str, Any]
+) -> None:
+    resp = api_client.post("/export/csv", headers=auth_headers, json=long_term)
+    assert resp.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert len(rows) == 120
+    assert rows[-1]["month"] == "120"
+
+
+def test_export_xlsx_has_full_schedule(
+    api_client: TestClient, auth_headers: Dict[str, str], long_term: Dict[str, Any]
+) -> None:
+    resp = api_client.post("/export/xlsx", headers=auth_headers, json=long_term)
+    assert resp.status_code == 200
+    ws = load_workbook(io.BytesIO(resp.content), read_only=True)["Schedule"]
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0][0] == "month"
+    assert len(rows) == 121
+
+
+def test_export_pdf(
+    api_client: TestClient, auth_headers: Dict[str, str], long_term: Dict[str, Any]
+) -> None:
+    resp = api_client.post("/export/pdf", headers=auth_headers, json=long_term)
+    assert resp.status_code == 200
+    assert resp.content.startswith(b"%PDF")
@@ -0,0 +1,131 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+import pytest
+
+import backend.core.instrumentation as instrumentation
+from backend.core.instrumentation import Histogram, server_timing
+
+
+@pytest.fixture
+def payload() -> Dict[str, Any]:
+    return {"principal": 100_000, "rate": 0.12, "term_months": 24, "asset_vat": 25_000}
+
+
+def _timings(header: str) -> dict:
+    out = {}
+    for part in header.split(","):
+        name, _, rest = part.strip().partition(";dur=")
+        out[name] = float(rest.split(";")[0])
+    return out
+
+
+def test_server_timing_format() -> None:
+    header = server_timing({"engine": [0.002, 1], "solver_iter": [0.003, 7]}, 0.01)
+    assert header == 'total;dur=10.00, engine;dur=2.00, solver_iter;dur=3.00;desc="n=7"'
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    h = Histogram("x_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    h.observe(("/a",), 0.05)
+    h.observe(("/a",), 0.5)
+    text = h.render()
+    assert 'x_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'x_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'x_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'x_seconds_count{route="/a"} 2' in text
+
+
+def test_calculate_reports_server_timing(
+    api_client: TestClient, auth_headers: Dict[str, str], payload: Dict[str, Any]
+) -> None:
+    resp = api_client.post("/calculate?cache=false", headers=auth_headers, json=payload)
+    assert resp.status_code == 200
+    timings = _timings(resp.headers["server-timing"])
+    assert {"total", "engine"} <= set(timings)
+    assert timings["engine"] <= timings["total"]
+
+
+def test_solver_spans_propagate_from_worker(
+    api_client: TestClient, auth_headers: Dict[str, str], payload: Dict[str, Any]
+) -> None:
+    resp = api_client.post(
+        "/equilibrium/principal?cache=false", headers=auth_headers, json=payload
+    )
+    assert resp.status_code == 200
+    header = resp.headers["server-timing"]
+    assert "solver_iter" in header and "calc" in header
+
+
+def test_metrics_endpoint_exposes_route_histograms(
+    api_client: TestClient, auth_headers: Dict[str, str], payload: Dict[str, Any]
+) -> None:
+    api_client.post("/calculate", headers=auth_headers, json=payload)
+    resp = api_client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    labels = 'method="POST",route="/calculate",status="200"'
+    assert f"ipa_http_request_duration_seconds_count{{{labels}}}" in resp.text
+    assert (
+        'ipa_stage_duration_seconds_count{route="/calculate",stage="engine"}'
+        in resp.text
+    )
+
+
+def test_profile_query_returns_report(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    payload: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(instrumentation, "PROFILE_ALLOWED", True)
+    resp = api_client.post(
+        "/calculate?profile=1&cache=false", headers=auth_headers, json=payload
+    )
+    assert resp.status_code == 200
+    assert resp.headers["x-profiled-status"] == "200"
+    assert "run_calc" in resp.text
+
+
+def test_profile_disabled_serves_normal_response(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    payload: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(instrumentation, "PROFILE_ALLOWED", False)
+    resp = api_client.post("/calculate?profile=1", headers=auth_headers, json=payload)
+    assert resp.status_code == 200
+    assert "annuity" in resp.json()
+
+
+def test_profile_is_off_unless_explicitly_allowed() -> None:
+    env = {k: v for k, v in os.environ.items() if k != "IPA_ALLOW_PROFILE"}
+    env["APP_MODE"] = "dev"
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import backend.core.instrumentation as i; print(i.PROFILE_ALLOWED)",
+        ],
+        cwd=Path(__file__).resolve().parents[2],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_profile_passes_non_2xx_responses_through(
+    api_client: TestClient, payload: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(instrumentation, "PROFILE_ALLOWED", True)
+    resp = api_client.post("/calculate?profile=1", json=payload)
+    assert resp.status_code == 401
+    assert "x-profiled-status" not in resp.headers
+    assert "detail" in resp.json()
@@ -0,0 +1,54 @@
+import json
+from typing import Dict
+
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+
+import backend.apps.scenarios.routes as scenario_routes
+from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
+from backend.core.responses import FastJSONResponse, dumps
+
+
+def test_dumps_handles_numpy_and_calc_results() -> None:
+    res = run_calc(
+        Inputs(principal=100_000, rate=0.12, term_months=24), totals_only=True
+    )
+    payload = {
+        "x": np.array([0.5, np.nan, 2.0]),
+        "n": np.int64(3),
+        "f": np.float64(1.25),
+        "result": res,
+    }
+    out = json.loads(dumps(payload))
+    assert out["x"] == [0.5, None, 2.0]
+    assert out["n"] == 3 and out["f"] == 1.25
+    assert out["result"] == res.to_dict()
+
+
+def test_fast_response_renders_bytes() -> None:
+    resp = FastJSONResponse({"a": np.arange(3)})
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == {"a": [0, 1, 2]}
+
+
+def test_grid_fast_json_matches_default(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    body = {
+        "principal": [100_000, 250_000],
+        "rate": [0.08, 0.12],
+        "term_months": [24],
+        "asset_vat": 25_000,
+        "equilibrium": True,
+    }
+    default = api_client.post("/scenarios/grid", headers=auth_headers, json=body).json()
+    monkeypatch.setattr(scenario_routes, "FAST_JSON", True)
+    fast = api_client.post("/scenarios/grid", headers=auth_headers, json=body).json()
+    assert fast["shape"] == default["shape"]
+    for k, v in default["metrics"].items():
+        assert np.asarray(fast["metrics"][k], dtype=float) == pytest.approx(
+            np.asarray(v, dtype=float), nan_ok=True
+        )
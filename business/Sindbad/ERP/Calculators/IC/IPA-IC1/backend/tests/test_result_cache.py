@@ -0,0 +1,114 @@
+from typing import Dict, Iterator
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.core.calculations.ipa_engine.cache import (
+    RESULT_CACHE,
+    ResultCache,
+    cached_run_calc,
+    inputs_key,
+)
+from backend.core.calculations.ipa_engine.engine import Inputs
+from backend.core.executor import EngineExecutor
+import backend.core.routes as core_routes
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache() -> Iterator[None]:
+    RESULT_CACHE.clear()
+    yield
+    RESULT_CACHE.clear()
+
+
+def test_lru_eviction_and_counters() -> None:
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # "b" is now least recently used
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_ttl_expiry() -> None:
+    cache = ResultCache(maxsize=8, ttl=0)
+    cache.put("a", {"v": 1})
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_key_is_canonical_over_validated_inputs() -> None:
+    a = Inputs(principal=100_000, rate=0.12, term_months=24)
+    b = Inputs(term_months=24, rate=0.12, principal=100_000.0, balloon=0)
+    assert inputs_key(a) == inputs_key(b)
+    assert inputs_key(a) != inputs_key(a, totals_only=True)
+
+
+def test_cached_results_are_read_only() -> None:
+    inp = Inputs(principal=100_000, rate=0.12, term_months=24)
+    first = cached_run_calc(inp)
+    with pytest.raises(TypeError):
+        first["totals"] = {"tampered": True}  # type: ignore[index]
+    first["schedule"][0]["interest"] = -1
+    first.to_dict()["schedule"][0]["interest"] = -1
+
+    second = cached_run_calc(inp)
+    assert second is first
+    assert "totals" not in second
+    assert second["schedule"][0]["interest"] > 0
+    assert RESULT_CACHE.stats()["hits"] == 1
+
+
+def test_calculate_hits_cache_and_can_bypass(
+    api_client: TestClient, auth_headers: Dict[str, str]
+) -> None:
+    body = {"principal": 100_000, "rate": 0.12, "term_months": 24}
+    for _ in range(3):
+        assert (
+            api_client.post("/calculate", headers=auth_headers, json=body).status_code
+            == 200
+        )
+    resp = api_client.post("/calculate?cache=false", headers=auth_headers, json=body)
+    assert resp.status_code == 200
+
+    stats = api_client.get("/cache/stats", headers=auth_headers).json()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+def test_cache_clear_endpoint(
+    api_client: TestClient, auth_headers: Dict[str, str]
+) -> None:
+    body = {"principal": 100_000, "rate": 0.12, "term_months": 24}
+    api_client.post("/calculate", headers=auth_headers, json=body)
+    assert api_client.delete("/cache", headers=auth_headers).status_code == 200
+    assert api_client.get("/cache/stats", headers=auth_headers).json()["size"] == 0
+
+
+def test_process_mode_caches_in_the_parent(
+    api_client: TestClient,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    ex = EngineExecutor(mode="process", max_workers=1)
+    monkeypatch.setattr(core_routes, "ENGINE_EXECUTOR", ex)
+    body = {"principal": 100_000, "rate": 0.12, "term_months": 24, "vat_rate": 0.18}
+    try:
+        for _ in range(2):
+            resp = api_client.post("/calculate", headers=auth_headers, json=body)
+            assert resp.status_code == 200
+        # solver caches would live in the worker, so process mode runs them uncached
+        resp = api_client.post("/equilibrium/f", headers=auth_headers, json=body)
+        assert resp.status_code == 200
+    finally:
+        ex.shutdown()
+
+    stats = api_client.get("/cache/stats", headers=auth_headers).json()
+    assert (stats["size"], stats["misses"], stats["hits"]) == (1, 1, 1)
+    api_client.delete("/cache", headers=auth_headers)
+    assert api_client.get("/cache/stats", headers=auth_headers).json()["size"] == 0
@@ -0,0 +1,101 @@
+import io
+from typing import Any, Dict
+
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+
+from backend.core.calculations.equilibrium import solve_equilibrium_principal
+from backend.core.calculations.ipa_engine.engine import Inputs, run_calc
+import backend.core.calculations.scenarios as scenarios
+from backend.core.calculations.scenarios import ScenarioGridRequest, evaluate_grid
+
+
+@pytest.fixture
+def grid_payload() -> Dict[str, Any]:
+    return {
+        "principal": [100_000, 250_000],
+        "rate": {"start": 0.08, "stop": 0.14, "num": 3},
+        "term_months": [24, 60],
+        "balloon": [0, 20_000],
+        "asset_vat": 25_000,
+    }
+
+
+def test_grid_cells_match_run_calc(grid_payload: Dict[str, Any]) -> None:
+    grid = evaluate_grid(ScenarioGridRequest(**grid_payload))
+    assert grid["shape"] == (2, 3, 2, 2)
+
+    axes = grid["axes"]
+    for idx in np.ndindex(*grid["shape"]):
+        p, r, n, b = (axes[k][j] for k, j in zip(scenarios.GRID_AXES, idx))
+        single = run_calc(
+            Inputs(
+                principal=p, rate=r, term_months=int(n), balloon=b, asset_vat=25_000
+            ),
+            totals_only=True,
+        )
+        for k in ("annuity", "ipa_net", "ipa_vat", "vat_delta"):
+            assert round(float(grid["metrics"][k][idx]), 2) == pytest.approx(
+                single[k], abs=0.01
+            )
+
+
+def test_grid_equilibrium_matches_solver(grid_payload: Dict[str, Any]) -> None:
+    grid = evaluate_grid(ScenarioGridRequest(**grid_payload, equilibrium=True))
+    eq = grid["metrics"]["principal_equilibrium"]
+    solved = solve_equilibrium_principal(
+        {"principal": 100_000, "rate": 0.08, "term_months": 24, "asset_vat": 25_000},
+        solver="analytic",
+        use_cache=False,
+    )
+    assert eq[0, 0, 0, 0] == pytest.approx(
+        solved["equilibrium"]["principal_solved"], abs=0.1
+    )
+
+
+def test_grid_cell_limit(
+    grid_payload: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(scenarios, "MAX_GRID_CELLS", 10)
+    with pytest.raises(ValueError):
+        evaluate_grid(ScenarioGridRequest(**grid_payload))
+
+
+def test_grid_endpoint_json(
+    api_client: TestClient, auth_headers: Dict[str, str], grid_payload: Dict[str, Any]
+) -> None:
+    resp = api_client.post(
+        "/scenarios/grid",
+        headers=auth_headers,
+        json=dict(grid_payload, equilibrium=True),
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["shape"] == [2, 3, 2, 2]
+    assert np.asarray(data["metrics"]["annuity"]).shape == (2, 3, 2, 2)
+    assert "principal_equilibrium" in data["metrics"]
+
+
+def test_grid_endpoint_bad_format(
+    api_client: TestClient, auth_headers: Dict[str, str], grid_payload: Dict[str, Any]
+) -> None:
+    resp = api_client.post(
+        "/scenarios/grid?format=xml", headers=auth_headers, json=grid_payload
+    )
+    assert resp.status_code == 400
+
+
+def test_grid_endpoint_parquet(
+    api_client: TestClient, auth_headers: Dict[str, str], grid_payload: Dict[str, Any]
+) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    resp = api_client.post(
+        "/scenarios/grid?format=parquet", headers=auth_headers, json=grid_payload
+    )
+    assert resp.status_code == 200
+    table = pq.read_table(io.BytesIO(resp.content))
+    assert table.num_rows == 24
+    assert {"principal", "rate", "term_months", "balloon", "annuity"} <= set(
+        table.column_names
+    )